@@ -1,72 +1,223 @@
+import json
+import math
+import threading
+
 import pandas as pd
 import streamlit as st
-import plotly.express as px
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from streamlit_option_menu import option_menu
-from pyspark.sql import SparkSession
-from pyspark.sql.functions import from_unixtime, col, round, mean
-from datetime import date, time, datetime
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-
-# Inizializziamo la sessione Spark
-spark = SparkSession.builder.getOrCreate()
-
-# Carichiamo il file CSV
-df = spark.read.csv("Log.csv", header=True, inferSchema=True, sep=';')
-
-# Rimozione delle istanze duplicate
-df = df.dropDuplicates()
-
-# Ordiniamo le righe in ordine crescente rispetto al campo 'Datetime'
-df = df.orderBy(col('Datetime'))
-
-# Conversioni
-df = df.withColumn('Datetime', from_unixtime(col('Datetime')).cast('string'))
-df = df.withColumn('Sunrise', from_unixtime(col('Sunrise')).cast('string'))
-df = df.withColumn('Sunset', from_unixtime(col('Sunset')).cast('string'))
-df = df.withColumn('Temperature', round(col('Temperature') - 273.15, 2))
-df = df.withColumn('Feels_Like', round(col('Feels_Like') - 273.15, 2))
-df = df.withColumn('Temp_Min', round(col('Temp_Min') - 273.15, 2))
-df = df.withColumn('Temp_Max', round(col('Temp_Max') - 273.15, 2))
-
-# Dividiamo la colonna 'Datetime' in due nuove colonne denominate 'Date' e 'Time'
-df = df.withColumn('Date', df['Datetime'].substr(1, 10))
-df = df.withColumn('Time', df['Datetime'].substr(12, 8))
-
-# Dividiamo la colonne 'Sunrise' e 'Sunset' nelle nuove colonne denominate 'Time_Sunrise' e 'Time_Sunset'
-df = df.withColumn('Sunrise_Time', df['Sunrise'].substr(12, 8))
-df = df.withColumn('Sunset_Time', df['Sunset'].substr(12, 8))
-
-# Eliminazione delle colonne 'Datetime', 'Sunrise' e 'Sunset'
-df = df.drop('Datetime')
-df = df.drop('Sunrise')
-df = df.drop('Sunset')
-
-# Instanziamo delle variabili globali
-data_minima = date(2023, 5, 31)
-data_massima = date(2023, 6, 2)
-min_time = time(0, 0)
-max_time = time(23, 59)
-min_time_int = 0
-max_time_int = 0
+from datetime import time, timedelta
+from time import perf_counter
+from meteo.analitiche import VARIABILI, aerogrammi, grafico_direzioni, grafico_rosa, grafico_temporale, \
+    grafico_tendenza, istogramma, tabella_ore_di_luce, tabella_scostamenti, tabella_valori_medi
+from meteo.archivio import FORMATO_ARCHIVIO, archivio_aggiornato, citta_disponibili, firma_archivio, firma_file, \
+    formato_archivio
+from meteo.cache_figure import figura, statistiche, tabella
+from meteo.climatologia import CAMPI_CLIMATOLOGIA, leggi_normali, normale
+from meteo.compattazione import compatta, espandi
+from meteo.configurazione import CITTA, DIAGNOSTICA, FINESTRA_CLIMATOLOGIA, LOG_CITTA, MODALITA_INGESTIONE, \
+    PERCORSO_ARCHIVIO
+from meteo.diagnostica import formato_prometheus, misura, punti_figura, registra, righe, ultime_misure
+from meteo.indice import FINE_GIORNO, INIZIO_GIORNO, finestra_oraria
+from meteo.motori import scegli_motore
+from meteo.parallelo import in_parallelo, pool_spark
+from meteo.vento import media_circolare, punto_cardinale, rosa_dei_venti
 
 st.set_page_config(
-    page_title="Dashboard Analitiche Meteo (NA)",
+    page_title="Dashboard Analitiche Meteo",
     page_icon="🌤️",
     layout="wide"
 )
 
 
+@st.cache_resource(show_spinner=False)
+def motore_di_calcolo():
+    # Il motore di calcolo (Spark oppure pandas/pyarrow) viene scelto una sola volta per processo ed è
+    # condiviso da tutte le sessioni utente di Streamlit. La sessione Spark viene avviata solo con il motore Spark,
+    # ma subito: il pool FAIR di ogni sessione utente può essere assegnato solo a uno SparkContext già attivo
+    motore = scegli_motore()
+    if motore.__name__ == 'meteo.motore_spark':
+        from meteo.preprocessing import crea_sessione_spark
+        crea_sessione_spark()
+    return motore
+
+
+@st.cache_resource(show_spinner=False)
+def importa_log(citta, percorso_log, mtime_ns, dimensione):
+    # mtime_ns e dimensione del file di log fanno parte della chiave della cache: quando il log di una città
+    # cambia controlliamo se le sue partizioni sono da rigenerare, altrimenti ogni rerun non fa nulla
+    if not archivio_aggiornato(percorso_log, PERCORSO_ARCHIVIO, citta):
+        with misura(f'importa_log[{citta}]'):
+            motore_di_calcolo().importa_log(percorso_log, PERCORSO_ARCHIVIO, citta)
+
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def aggregati_giornalieri(citta, versione):
+    # Tabella degli aggregati giornalieri (medie, descrizioni, alba/tramonto) della città letta dall'archivio,
+    # ricaricata solo quando cambia la versione dei dati della città
+    with misura('aggregati_giornalieri') as dettagli:
+        risultato = motore_di_calcolo().aggregati_giornalieri(PERCORSO_ARCHIVIO, citta)
+        dettagli['righe'] = righe(risultato)
+    return risultato
+
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def normali_climatologiche(citta, versione):
+    # Normali climatologiche della città per giorno dell'anno, campo e ora: vengono scritte insieme agli aggregati
+    # e cambiano con la stessa versione dei dati. Ogni pagina vi accede con una lookup per giorno
+    with misura('normali_climatologiche') as dettagli:
+        risultato = leggi_normali(PERCORSO_ARCHIVIO, citta)
+        dettagli['righe'] = righe(risultato)
+    return risultato
+
+
+@st.cache_data(max_entries=366, show_spinner=False)
+def osservazioni_del_giorno(citta, giorno, versione):
+    # Rilevazioni di un singolo giorno: grazie al partizionamento viene letta soltanto la cartella di quel giorno
+    # all'interno di quella della città. In cache (e nella copia ricevuta da ogni sessione) restano in forma
+    # compatta, circa un quarto della memoria, così da poter conservare un anno di giorni per città
+    with misura('osservazioni_del_giorno') as dettagli:
+        risultato = motore_di_calcolo().osservazioni_dei_giorni([giorno], PERCORSO_ARCHIVIO, citta=citta)
+        dettagli['righe'] = righe(risultato)
+    return compatta(risultato)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def riepilogo_vento(citta, giorni, numero_settori, ore, versione):
+    # Media circolare e rosa dei venti di un intervallo di giorni, calcolate con un'unica lettura delle
+    # rilevazioni: in cache restano solo i risultati (pochi valori), non le righe dell'intervallo
+    with misura('riepilogo_vento') as dettagli:
+        osservazioni = motore_di_calcolo().osservazioni_dei_giorni(list(giorni), PERCORSO_ARCHIVIO, ore, citta)
+        dettagli['righe'] = righe(osservazioni)
+    direzione, costanza = media_circolare(osservazioni['Wind_Deg'])
+    return direzione, costanza, rosa_dei_venti(osservazioni, numero_settori)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def serie_temporali(citta, granularita, finestra, versione):
+    # Medie orarie o giornaliere (ed eventualmente mobili) dell'intero storico della città: vengono lette dai bucket
+    # già presenti nell'archivio, non dalle rilevazioni, e ogni finestra richiede un'unica scansione dei bucket.
+    # L'intervallo di giorni mostrato viene selezionato dopo, così le finestre comprendono anche i giorni precedenti
+    with misura('serie_temporali') as dettagli:
+        risultato = motore_di_calcolo().serie_temporali(granularita, finestra, PERCORSO_ARCHIVIO, citta)
+        dettagli['righe'] = righe(risultato)
+    return risultato
+
+
+contesto_sessione = get_script_run_ctx()
+
+
+def collega_sessione():
+    # I thread che eseguono le letture in parallelo vengono collegati alla sessione Streamlit corrente
+    add_script_run_ctx(threading.current_thread(), contesto_sessione)
+
+
+# Con Spark, i job di ogni sessione utente (compresa l'ingestione all'avvio) vengono eseguiti in un pool FAIR
+# dedicato: le letture lente di una sessione non bloccano quelle delle altre. Il motore viene creato prima di
+# assegnare il pool, perché il pool è una proprietà dello SparkContext
+motore_di_calcolo()
+if contesto_sessione is not None:
+    pool_spark(f'sessione-{contesto_sessione.session_id}')
+
+# In modalità streaming l'archivio viene alimentato dal job in meteo.streaming e non dai file di log.
+# Le città sono indipendenti tra loro: i controlli (ed eventualmente le ingestioni) vengono eseguiti in parallelo
+if MODALITA_INGESTIONE == 'batch':
+    with st.spinner("Aggiornamento dell'archivio dei dati meteo..."):
+        in_parallelo({citta_log: (lambda citta_log=citta_log, percorso_log=percorso_log:
+                                  importa_log(citta_log, percorso_log, *firma_file(percorso_log)))
+                      for citta_log, percorso_log in LOG_CITTA.items()}, collega_sessione)
+
+elenco_citta = citta_disponibili(PERCORSO_ARCHIVIO)
+if not elenco_citta:
+    st.warning("L'archivio dei dati meteo è ancora vuoto: nessuna rilevazione disponibile")
+    st.stop()
+if formato_archivio(PERCORSO_ARCHIVIO) != FORMATO_ARCHIVIO:
+    st.error("L'archivio dei dati meteo è stato scritto da una versione precedente: va rigenerato con "
+             "'python -m meteo.ingestione'")
+    st.stop()
+
+# Tutte le analitiche lavorano sulla città selezionata: letture e cache riguardano soltanto le sue partizioni
+with st.sidebar:
+    citta = st.selectbox('Città:', elenco_citta, index=elenco_citta.index(CITTA) if CITTA in elenco_citta else 0)
+
+# La versione dei dati della città cambia a ogni scrittura (batch o micro-batch): i nuovi giorni diventano visibili
+# al primo rerun successivo, senza rielaborare i dati già presenti
+versione = firma_archivio(PERCORSO_ARCHIVIO, citta)
+aggregati = aggregati_giornalieri(citta, versione)
+if not aggregati:
+    st.warning(f"Nessuna rilevazione disponibile per la città di {citta}")
+    st.stop()
+
+# Instanziamo delle variabili globali: l'intervallo di date selezionabili dipende dai giorni presenti nei dati
+giorni_disponibili = sorted(aggregati)
+data_minima = giorni_disponibili[0]
+data_massima = giorni_disponibili[-1]
+min_time = time(0, 0)
+max_time = time(23, 59)
+min_time_int = INIZIO_GIORNO
+max_time_int = FINE_GIORNO
+
+
 def elenco_bullet(testo_grassetto, testo_normale):
     st.markdown(f"- <span style='color:#FFA559'><b>{testo_grassetto}</b></span>: {testo_normale}",
                 unsafe_allow_html=True)
 
 
+def aggregati_del_giorno(giorno):
+    # Restituisce gli aggregati del giorno richiesto, interrompendo la pagina se non ci sono rilevazioni
+    if giorno not in aggregati:
+        st.warning(f"Nessuna rilevazione disponibile per il giorno {giorno}")
+        st.stop()
+    return aggregati[giorno]
+
+
+def fascia_oraria():
+    # Selezione della fascia oraria da analizzare, restituita in secondi dalla mezzanotte (estremi inclusi,
+    # l'ultimo minuto per intero). None se è selezionata l'intera giornata
+    inizio, fine = st.slider('Fascia oraria:', min_value=min_time, max_value=max_time, value=(min_time, max_time),
+                             step=timedelta(minutes=15), format='HH:mm')
+    ore = (inizio.hour * 3600 + inizio.minute * 60, fine.hour * 3600 + fine.minute * 60 + 59)
+    if ore == (min_time_int, max_time_int):
+        return None
+    return ore
+
+
+def rilevazioni_nella_fascia(osservazioni, giorno, ore):
+    # Righe della fascia oraria selezionata, individuate con una ricerca binaria sulle rilevazioni del giorno
+    if ore is not None:
+        osservazioni = finestra_oraria(osservazioni, giorno, *ore)
+    if osservazioni.empty:
+        st.info('Nessuna rilevazione disponibile nella fascia oraria selezionata.')
+        st.stop()
+    return osservazioni
+
+
+def mostra_grafico(nome, parametri, costruisci, **opzioni):
+    # La figura viene cercata nella cache dei grafici con il nome e i parametri della vista, la città e la versione
+    # dei dati: 'costruisci' (letture comprese) viene eseguita solo se manca. Vengono registrati separatamente la
+    # costruzione della figura e il suo invio al browser
+    def costruisci_e_registra():
+        inizio = perf_counter()
+        fig = costruisci()
+        registra(nome, 'costruzione grafico', perf_counter() - inizio, punti_figura(fig))
+        return fig
+
+    grafico = figura((nome, citta, versione) + parametri, costruisci_e_registra)
+    with misura(nome, 'rendering grafico') as dettagli:
+        dettagli['righe'] = grafico['punti']
+        st.plotly_chart(json.loads(grafico['spec']), **opzioni)
+
+
+def tabella_in_cache(nome, parametri, costruisci):
+    # Come per i grafici: la tabella della vista viene costruita solo se non è già nella cache
+    return tabella((nome, citta, versione) + parametri, costruisci)
+
+
 # Creiamo la barra laterale
 with st.sidebar:
     pagina_selezionata = option_menu(
         menu_title="Sezioni",
-        options=["Home", "Documentazione", "Analitica 1", "Analitica 2", "Analitica 3"],
+        options=["Home", "Documentazione", "Analitica 1", "Analitica 2", "Analitica 3", "Tendenze"],
     )
 
 if pagina_selezionata == "Home":
@@ -74,7 +225,7 @@ if pagina_selezionata == "Home":
     st.image('ImmagineCopertinaDashboardMeteoNapoliBordoArancio.jpg', use_column_width=True)
 
     st.title("HomePage - Dashboard analitiche meteo")
-    st.header("Analitiche meteorologiche - Città di Napoli ☀️ 🌦️ ⛈️️")
+    st.header(f"Analitiche meteorologiche - Città di {citta} ☀️ 🌦️ ⛈️️")
     st.write("""
       Questo progetto utilizza i dati generati dal sito '*Open Weather*', che offre informazioni meteorologiche
       globali. In particolare, abbiamo ottenuto accesso ai dati mediante l'API '*One Call API 3.0*', grazie alla quale
@@ -92,16 +243,20 @@ if pagina_selezionata == "Home":
                                      "Il giorno è selezionabile tramite un apposito form di input. Il risultato dell'analitica viene mostrato attraverso "
                                      "un grafico che riporta l'andamento di una serie di caratteristiche meteorologiche tra cui la temperatura "
                                      "(comprendendo anche minima, massima e percepita), pressione atmosferica, umidità, visibilità, velocità del vento, raffiche di vento, direzione del vento,"
-                                     " orario di alba e tramonto e nuvolosità. Inoltre, viene riportata anche una tabella che mostra i valori medi misurati durante il giorno selezionato.")
-    elenco_bullet("Seconda Analitica", "Permette di effettuare una serie di confronti tra 3 giorni specifici selezionabili tramite appositi form di input."
+                                     " orario di alba e tramonto e nuvolosità. È possibile limitare il grafico a una fascia oraria della giornata. Inoltre, viene riportata anche una tabella che mostra i valori medi misurati durante il giorno selezionato.")
+    elenco_bullet("Seconda Analitica", "Permette di effettuare una serie di confronti tra più giorni, selezionabili singolarmente oppure come intervallo di date."
                                        " I risultati dell'analitica vengono mostrati tramite diversi grafici. Il primo è un istogramma che permette di evidenziare le medie delle caratteristiche"
                                        " meteorologiche (Temperatura, Temperatura Percepita, Pressione, Umidità, Visibilità, Velocità del Vento, Nuvolosità) dei giorni selezionati in modo da "
-                                       "poter effettuare anche un semplice confronto visivo. Vengono riportati, inoltre, una serie di areogrammi (uno per ogni giorno selezionato) che "
+                                       "poter effettuare anche un semplice confronto visivo, insieme alla normale climatologica di ogni giorno (mediana e percentili delle rilevazioni dello stesso periodo dell'anno) e a una tabella con lo scostamento dalla norma delle medie di temperatura, pressione, umidità e velocità del vento. Vengono riportati, inoltre, una serie di areogrammi (uno per ogni giorno selezionato) che "
                                        "evidenziano (in percentuale) le condizioni meteorologiche verificatisi durante la giornata. Tra tali condizioni rientrano *clear sky*,"
                                        " *few clouds*, *scattered clouds*, *broken clouds*, *shower rain*, *rain*, *thunderstorm*,"
                                        " *snow* e *mist*. Infine, viene effettuato un confronto tra le ore di luce dei due giorni estremi dell'intervallo selezionato.")
     elenco_bullet("Terza Analitica", "Mostra, tramite l'apposita selezione di un giorno specifico, la direzione del vento in un determinato orario della giornata. "
-                                     "Il risultato di tale analitica viene mostrato attraverso un apposito grafo detto *Scatter Polar*. Di lato, inoltre, viene anche riportata la media della direzione del vento avuta durante la giornata.")
+                                     "Il risultato di tale analitica viene mostrato attraverso un apposito grafo detto *Scatter Polar*. Di lato, inoltre, viene anche riportata la media (circolare) della direzione del vento avuta durante la giornata. "
+                                     "Selezionando un intervallo di date, anche di più mesi, viene invece mostrata la *rosa dei venti* del periodo, a 8 o 16 settori e suddivisa per fasce di velocità. "
+                                     "In entrambi i casi l'analisi può essere limitata a una fascia oraria.")
+    elenco_bullet("Tendenze", "Mostra l'andamento di una caratteristica meteorologica su un intervallo di giorni anche di più mesi, "
+                              "tramite le medie orarie o giornaliere e la loro media mobile su una finestra a scelta (ad esempio 24 ore o 7 giorni).")
 
 elif pagina_selezionata == "Documentazione":
 
@@ -153,7 +308,7 @@ elif pagina_selezionata == "Documentazione":
 
         st.write("""
         Notiamo, inoltre, che per quanto riguarda i dati relativi alle temperature (in particolare, i campi *Temperature*, *Feels_Like*, *Temp_Min*, *Temp_Max*) è stata necessaria effettuare un'iniziale conversione da Kelvin a Gradi Celsius.
-        Infine, per quanto riguarda tutti i campi che presentavano informazioni relative a data ed ora (*Datetime*, *Sunrise* e *Sunset*) il formato impostato nella API di *Openweather* è il datetime UNIX. Per questo motivo, è stata necessaria, anche in questo caso, una conversione che ha portato alla realizzazione di due nuove colonne specifiche relative a data ed ora.      
+        Infine, per quanto riguarda tutti i campi che presentavano informazioni relative a data ed ora (*Datetime*, *Sunrise* e *Sunset*) il formato impostato nella API di *Openweather* è il datetime UNIX. Tali campi vengono mantenuti in questo formato e, a partire da *Datetime*, vengono ricavate due nuove colonne specifiche relative alla data (di tipo data) e all'ora (in secondi trascorsi dalla mezzanotte) di rilevazione; la conversione in testo di date e orari avviene soltanto al momento della visualizzazione.      
         """)
 
 elif pagina_selezionata == "Analitica 1":
@@ -166,124 +321,39 @@ elif pagina_selezionata == "Analitica 1":
     # aggiungi filtro per selezionare una specifica data
     selected_date = st.date_input('Seleziona una data:', value=data_minima, min_value=data_minima,
                                   max_value=data_massima)
+    ore_selezionate = fascia_oraria()
 
     st.header('Grafico Temporale Meteo')
 
-    # Utilizzo degli alias per visualizzare i valori in italiano su Streamlit
-    alias_map = {
-        'Temperatura': 'Temperature',
-        'Temperatura Percepita': 'Feels_Like',
-        'Pressione': 'Pressure',
-        'Umidità': 'Humidity',
-        'Visibilità': 'Visibility',
-        'Velocità del Vento': 'Wind_Speed',
-        'Nuvolosità': 'Clouds_Level'
-    }
+    # Alias in italiano delle variabili da visualizzare
+    alias_map = VARIABILI
 
     # Aggiungiamo il filtro per selezionare la variabile da visualizzare
     variabile_selezionata_visualizzata = st.selectbox('Seleziona la variabile da visualizzare:', list(alias_map.keys()))
 
     variabile_selezionata = alias_map[variabile_selezionata_visualizzata]
 
-    # Filtriamo i dati in base alla selezione di date
-    filtered_data = df.filter(df['Date'] == selected_date)
-
-    # Calcoliamo la media del campo 'Temperature' dai dati filtrati
-    average_temperature = filtered_data.agg(round(mean('Temperature'), 2)).first()[0]
-    average_feels_like = filtered_data.agg(round(mean('Feels_Like'), 2)).first()[0]
-    average_pressure = filtered_data.agg(round(mean('Pressure'), 2)).first()[0]
-    average_humidity = filtered_data.agg(round(mean('Humidity'), 2)).first()[0]
-    average_visibility = filtered_data.agg(round(mean('Visibility'), 2)).first()[0]
-    average_wind_speed = filtered_data.agg(round(mean('Wind_Speed'), 2)).first()[0]
-    average_clouds_level = filtered_data.agg(round(mean('Clouds_Level'), 2)).first()[0]
 
-    filtered_data_pd = filtered_data.toPandas()
+    # Interrompe la pagina se il giorno selezionato non ha rilevazioni
+    aggregati_giorno = aggregati_del_giorno(selected_date)
 
-    # Creaimao il grafico temporale
-    fig = px.line(filtered_data_pd, x='Time', y=variabile_selezionata)
+    def grafico_del_giorno():
+        osservazioni = espandi(osservazioni_del_giorno(citta, selected_date, versione))
+        return grafico_temporale(rilevazioni_nella_fascia(osservazioni, selected_date, ore_selezionate),
+                                 variabile_selezionata)
 
-    # Limitiamo il numero di etichette sull'asse x
-    num_labels = 6  # Specifica il numero di etichette desiderato
-
-    if len(filtered_data_pd) > num_labels:
-        interval = len(filtered_data_pd) // num_labels
-        tick_indices = list(range(0, len(filtered_data_pd), interval))
-    else:
-        tick_indices = [i for i in range(len(filtered_data_pd))]
-
-    tick_indices = [i for i in tick_indices if i < len(filtered_data_pd)]  # Rimuovi gli indici fuori dai limiti
-    tick_labels = [filtered_data_pd['Time'].str[:5].iloc[i] for i in
-                   tick_indices]  # Prendi i primi 5 caratteri dell'ora
-    # Aggiungi l'ultima etichetta solo se ci sono dati nel dataframe
-    if len(filtered_data_pd) > 0:
-        last_index = len(filtered_data_pd) - 1
-        tick_indices.append(last_index)  # Aggiungi l'indice dell'ultimo valore
-        tick_labels.append(filtered_data_pd['Time'].str[:5].iloc[last_index])  # Aggiungi l'etichetta dell'ultimo valore
-    fig.update_xaxes(tickmode='array', tickvals=tick_indices, ticktext=tick_labels)
-
-    if variabile_selezionata == 'Temperature' or variabile_selezionata == 'Feels_Like':
-        fig.add_trace(go.Scatter(
-            x=filtered_data_pd['Time'],
-            y=filtered_data_pd['Temp_Max'],
-            name='Temperatura Massima',
-            mode='lines',
-            line=dict(color='red')
-        ))
-        fig.add_trace(go.Scatter(
-            x=filtered_data_pd['Time'],
-            y=filtered_data_pd['Temp_Min'],
-            name='Temperatura Minima',
-            mode='lines',
-            line=dict(color='blue')
-        ))
-        fig.add_trace(go.Scatter(
-            x=filtered_data_pd['Time'],
-            y=filtered_data_pd['Temp_Max'],
-            fill='tonexty',
-            fillcolor='rgba(255,150,150,0.07)',
-            name='Intervallo Max-Min'
-        ))
-        fig.update_yaxes(title='Gradi (C°)')
-
-    elif variabile_selezionata == 'Pressure':
-        fig.update_yaxes(title='Atmosfere (hPa)')
-
-    elif variabile_selezionata == 'Humidity' or variabile_selezionata == 'Clouds_Level':
-        fig.update_yaxes(title='Percentuale (%)')
-
-    elif variabile_selezionata == 'Visibility':
-        fig.update_yaxes(title='Metri (m)')
-
-    elif variabile_selezionata == 'Wind_Speed':
-        fig.update_yaxes(title='Metri/Secondo (m/s)')
-
-    fig.update_xaxes(title='Ora del Giorno')
-
-    # Mostriamo il grafico
-    st.plotly_chart(fig, use_container_width=True)
+    # Mostriamo il grafico: le rilevazioni vengono lette e la figura costruita solo se la vista non è già nella
+    # cache dei grafici
+    mostra_grafico('Analitica 1: grafico temporale', (selected_date, ore_selezionate, variabile_selezionata),
+                   grafico_del_giorno, use_container_width=True)
 
     # Header Tabella
     st.header("Tabella Valori Medi - Giorno '*" + str(selected_date) + "*'")
 
-    # Creaiamo una lista di dizionari con il nome del campo e il valore corrispondente
-    table_data = [
-        {'Campo (Misura)': '🌡️ Temperatura (C°)', 'Valore Medio': "{:.2f}".format(average_temperature)},
-        {'Campo (Misura)': '🥵 Temperatura Percepita (C°)', 'Valore Medio': "{:.2f}".format(average_feels_like)},
-        {'Campo (Misura)': '🌫️ Pressione (hPa)', 'Valore Medio': "{:.2f}".format(average_pressure)},
-        {'Campo (Misura)': '💧 Umidità (%)', 'Valore Medio': "{:.2f}".format(average_humidity)},
-        {'Campo (Misura)': '️😶‍🌫️ Visibilità (m)', 'Valore Medio': "{:.2f}".format(average_visibility)},
-        {'Campo (Misura)': '🌬️ Velocità del Vento (m/s)', 'Valore Medio': "{:.2f}".format(average_wind_speed)},
-        {'Campo (Misura)': '☁️ Nuvolosità (%)', 'Valore Medio': "{:.2f}".format(average_clouds_level)},
-    ]
-
-    # Creaiamo un DataFrame con il dizionario
-    df_table = pd.DataFrame(table_data)
-
-    # Aggiungiamo l'header personalizzato
-    header = {'Campo (Misura)': 'Campo (Misura)', 'Valore Medio': 'Valore Medio'}
-
-    # Visualizziamo la tabella con gli header personalizzati
-    st.write(df_table.rename(columns=header).set_index('Campo (Misura)'))
+    # Visualizziamo la tabella
+    st.write(tabella_in_cache('Analitica 1: valori medi', (selected_date,),
+                              lambda: tabella_valori_medi(aggregati_giorno)))
+    st.caption(f"Statistiche calcolate su {aggregati_giorno['Rilevazioni']} rilevazioni del giorno")
 
 elif pagina_selezionata == "Analitica 2":
 
@@ -292,229 +362,87 @@ elif pagina_selezionata == "Analitica 2":
       è possibile confrontare i valori medi dei campi e visualizzare grafici e tabelle che evidenziano le differenze
       tra i vari giorni.''')
 
-    # Layout a tre colonne
-    col1, col2, col3 = st.columns(3)
+    # I giorni da confrontare possono essere scelti uno per uno oppure come intervallo di date
+    modalita_selezione = st.radio('Modalità di selezione dei giorni:', ['Giorni specifici', 'Intervallo di date'],
+                                  horizontal=True)
 
-    with col1:
-        # Aggiungiamo filtro per selezionare una specifica data
-        day_1 = st.date_input('Seleziona la data del primo giorno:', value=data_minima, min_value=data_minima,
-                              max_value=data_massima, key='date_input_1')
+    if modalita_selezione == 'Giorni specifici':
+        giorni_selezionati = st.multiselect('Seleziona i giorni da confrontare:', giorni_disponibili,
+                                            default=giorni_disponibili[:3],
+                                            format_func=lambda giorno: giorno.strftime("%d/%m/%Y"))
+    else:
+        intervallo = st.date_input('Seleziona l\'intervallo di date:', value=(data_minima, data_massima),
+                                   min_value=data_minima, max_value=data_massima)
 
-    with col2:
-        # Aggiungiamo filtro per selezionare una specifica data
-        day_2 = st.date_input('Seleziona la data del secondo giorno:', value=date(2023, 6, 1), min_value=data_minima,
-                              max_value=data_massima, key='date_input_2')
+        # Durante la selezione dell'intervallo Streamlit restituisce una sola data; i giorni senza rilevazioni
+        # vengono esclusi dal confronto
+        giorni_selezionati = [giorno for giorno in giorni_disponibili if intervallo[0] <= giorno <= intervallo[-1]]
 
-    with col3:
-        # Aggiungiamo filtro per selezionare una specifica data
-        day_3 = st.date_input('Seleziona la data del terzo giorno:', value=date(2023, 6, 2), min_value=data_minima,
-                              max_value=data_massima, key='date_input_3')
+    giorni_selezionati = sorted(giorni_selezionati)
+    if len(giorni_selezionati) < 2:
+        st.info('Seleziona almeno due giorni da confrontare.')
+        st.stop()
 
     st.header('Confronto tra valori medi giornalieri dei campi')
 
-    # Utilizziamo degli alias per visualizzare i valori in italiano su Streamlit
-    alias_map = {
-        'Temperatura': 'Temperature',
-        'Temperatura Percepita': 'Feels_Like',
-        'Pressione': 'Pressure',
-        'Umidità': 'Humidity',
-        'Visibilità': 'Visibility',
-        'Velocità del Vento': 'Wind_Speed',
-        'Nuvolosità': 'Clouds_Level'
-    }
+    # Alias in italiano delle variabili da visualizzare
+    alias_map = VARIABILI
 
     # Aggiungiamo il filtro per selezionare la variabile da visualizzare
     variabile_selezionata_visualizzata = st.selectbox('Seleziona la variabile da visualizzare:', list(alias_map.keys()))
     variabile_selezionata = alias_map[variabile_selezionata_visualizzata]
 
-    temperature_day_one = df.filter(df['Date'] == day_1).agg(round(mean('Temperature'), 2)).first()[0]
-    temperature_day_two = df.filter(df['Date'] == day_2).agg(round(mean('Temperature'), 2)).first()[0]
-    temperature_day_three = df.filter(df['Date'] == day_3).agg(round(mean('Temperature'), 2)).first()[0]
-    feels_like_day_one = df.filter(df['Date'] == day_1).agg(round(mean('Feels_Like'), 2)).first()[0]
-    feels_like_day_two = df.filter(df['Date'] == day_2).agg(round(mean('Feels_Like'), 2)).first()[0]
-    feels_like_day_three = df.filter(df['Date'] == day_3).agg(round(mean('Feels_Like'), 2)).first()[0]
-    pressure_day_one = df.filter(df['Date'] == day_1).agg(round(mean('Pressure'), 2)).first()[0]
-    pressure_day_two = df.filter(df['Date'] == day_2).agg(round(mean('Pressure'), 2)).first()[0]
-    pressure_day_three = df.filter(df['Date'] == day_3).agg(round(mean('Pressure'), 2)).first()[0]
-    humidity_day_one = df.filter(df['Date'] == day_1).agg(round(mean('Humidity'), 2)).first()[0]
-    humidity_day_two = df.filter(df['Date'] == day_2).agg(round(mean('Humidity'), 2)).first()[0]
-    humidity_day_three = df.filter(df['Date'] == day_3).agg(round(mean('Humidity'), 2)).first()[0]
-    visibility_day_one = df.filter(df['Date'] == day_1).agg(round(mean('Visibility'), 2)).first()[0]
-    visibility_day_two = df.filter(df['Date'] == day_2).agg(round(mean('Visibility'), 2)).first()[0]
-    visibility_day_three = df.filter(df['Date'] == day_3).agg(round(mean('Visibility'), 2)).first()[0]
-    wind_speed_day_one = df.filter(df['Date'] == day_1).agg(round(mean('Wind_Speed'), 2)).first()[0]
-    wind_speed_day_two = df.filter(df['Date'] == day_2).agg(round(mean('Wind_Speed'), 2)).first()[0]
-    wind_speed_day_three = df.filter(df['Date'] == day_3).agg(round(mean('Wind_Speed'), 2)).first()[0]
-    clouds_level_day_one = df.filter(df['Date'] == day_1).agg(round(mean('Clouds_Level'), 2)).first()[0]
-    clouds_level_day_two = df.filter(df['Date'] == day_2).agg(round(mean('Clouds_Level'), 2)).first()[0]
-    clouds_level_day_three = df.filter(df['Date'] == day_3).agg(round(mean('Clouds_Level'), 2)).first()[0]
-
-    #Formattiamo i giorni in formato stringa
-    day_1_str = day_1.strftime("%d/%m/%Y")
-    day_2_str = day_2.strftime("%d/%m/%Y")
-    day_3_str = day_3.strftime("%d/%m/%Y")
-
-    # Creiamo una lista di dizionari
-    data = [
-        {'Giorno': day_1_str, 'Temperature': temperature_day_one, 'Feels_Like': feels_like_day_one,
-         'Pressure': pressure_day_one, 'Humidity': humidity_day_one, 'Visibility': visibility_day_one,
-         'Wind_Speed': wind_speed_day_one, 'Clouds_Level': clouds_level_day_one},
-        {'Giorno': day_2_str, 'Temperature': temperature_day_two, 'Feels_Like': feels_like_day_two,
-         'Pressure': pressure_day_two, 'Humidity': humidity_day_two, 'Visibility': visibility_day_two,
-         'Wind_Speed': wind_speed_day_two, 'Clouds_Level': clouds_level_day_two},
-        {'Giorno': day_3_str, 'Temperature': temperature_day_three, 'Feels_Like': feels_like_day_three,
-         'Pressure': pressure_day_three, 'Humidity': humidity_day_three, 'Visibility': visibility_day_three,
-         'Wind_Speed': wind_speed_day_three, 'Clouds_Level': clouds_level_day_three}
-    ]
-
-    # Calcoliamo il valore massimo per l'asse y
-    max_value = max([item[variabile_selezionata] for item in data])
-    y_max = max_value + max_value * 0.25  # Imposta il valore massimo dell'asse y al 10% del valore massimo dei dati
-
-    # Creazione dell'istogramma
-    fig = go.Figure(
-        data=[go.Bar(x=[item['Giorno'] for item in data], y=[item[variabile_selezionata] for item in data],width=0.3)])
-
-    if variabile_selezionata == 'Temperature':
-        fig.update_yaxes(title='Temperatura (°C)')
-        fig.update_layout(
-            title='Variazione Temperatura',
-            yaxis_range=[0, y_max]
-        )
-
-    elif variabile_selezionata == 'Feels_Like':
-        fig.update_yaxes(title='Temperatura (°C)')
-        fig.update_layout(
-            title='Variazione Temperatura Percepita',
-            yaxis_range=[0, y_max]
-        )
+    # Tutte le statistiche dei giorni selezionati provengono dalla tabella degli aggregati giornalieri, calcolata
+    # con un'unica aggregazione per giorno: il confronto non richiede ulteriori job, qualunque sia il numero di giorni
+    aggregati_selezionati = [aggregati_del_giorno(giorno) for giorno in giorni_selezionati]
 
-    elif variabile_selezionata == 'Pressure':
-        fig.update_yaxes(title='Atmosfere (hPa)')
-        fig.update_layout(
-            title='Variazione Pressione',
-            yaxis_range=[0, y_max]
-        )
-
-    elif variabile_selezionata == 'Humidity':
-        fig.update_yaxes(title='Percentuale (%)')
-        fig.update_layout(
-            title='Variazione Umidità',
-            yaxis_range=[0, y_max]
-        )
-
-    elif variabile_selezionata == 'Clouds_Level':
-        fig.update_yaxes(title='Percentuale (%)')
-        fig.update_layout(
-            title='Variazione Nuvolosità',
-            yaxis_range=[0, y_max]
-        )
-
-    elif variabile_selezionata == 'Visibility':
-        fig.update_yaxes(title='Metri (m)')
-        fig.update_layout(
-            title='Variazione Visibilità',
-            yaxis_range=[0, y_max]
-        )
-
-    elif variabile_selezionata == 'Wind_Speed':
-        fig.update_yaxes(title='Metri/Secondo (m/s)')
-        fig.update_layout(
-            title='Variazione Velocità del Vento',
-            yaxis_range=[0, y_max]
-        )
-
-    fig.update_xaxes(title='Giorno')
-    fig.update_traces(marker_color='#FFA559')
+    # Normali climatologiche dei giorni selezionati (una lookup per giorno e variabile), per le variabili che ne hanno
+    normali = normali_climatologiche(citta, versione)
+    normali_selezionate = [{variabile: normale(normali, giorno, variabile) for variabile in CAMPI_CLIMATOLOGIA}
+                           for giorno in giorni_selezionati]
 
     # Visualizzazione dell'istogramma in Streamlit
-    st.plotly_chart(fig, use_container_width=True)
+    mostra_grafico('Analitica 2: istogramma', (tuple(giorni_selezionati), variabile_selezionata),
+                   lambda: istogramma(giorni_selezionati, aggregati_selezionati, variabile_selezionata,
+                                      [normali_giorno.get(variabile_selezionata)
+                                       for normali_giorno in normali_selezionate]),
+                   use_container_width=True)
+
+    # Confronto delle medie dei giorni con le normali del loro periodo dell'anno
+    if normali:
+        st.header('Scostamento dalla norma')
+        st.caption(f'Le normali climatologiche comprendono, per ogni giorno, le rilevazioni dei '
+                   f'{2 * FINESTRA_CLIMATOLOGIA + 1} giorni centrati sulla stessa data in tutti gli anni presenti '
+                   f'nell\'archivio.')
+        st.dataframe(tabella_in_cache('Analitica 2: scostamenti', (tuple(giorni_selezionati),),
+                                      lambda: tabella_scostamenti(giorni_selezionati, aggregati_selezionati,
+                                                                  normali_selezionate)),
+                     use_container_width=True)
 
     # AEROGRAMMI
 
     st.header('Confronto condizioni meteorologiche')
 
-    # Calcoliamo il conteggio dei valori nella colonna 'Description'
-    description_counts_1 = df.filter(df['Date'] == day_1).groupby('Description').count().select('Description',
-                                                                                                'count').toPandas()
-    # Calcoliamo il conteggio dei valori nella colonna 'Description'
-    description_counts_2 = df.filter(df['Date'] == day_2).groupby('Description').count().select('Description',
-                                                                                                'count').toPandas()
-    # Calcoliamo il conteggio dei valori nella colonna 'Description'
-    description_counts_3 = df.filter(df['Date'] == day_3).groupby('Description').count().select('Description',
-                                                                                                'count').toPandas()
-
-    # Creiamo un'unica legenda per tutti i grafici
-    legend_labels = description_counts_1['Description'].tolist() + description_counts_2['Description'].tolist() + \
-                    description_counts_3['Description'].tolist()
-
-    # Creiamo la figura con tre sottoplot di tipo pie
-    fig = make_subplots(rows=1, cols=3, specs=[[{'type': 'pie'}, {'type': 'pie'}, {'type': 'pie'}]],
-                        subplot_titles=(day_1_str, day_2_str, day_3_str))
-
-    # Aggiungiamo i grafici torta ai sottoplot
-    fig.add_trace(go.Pie(labels=description_counts_1['Description'], values=description_counts_1['count']), row=1,
-                  col=1)
-    fig.add_trace(go.Pie(labels=description_counts_2['Description'], values=description_counts_2['count']), row=1,
-                  col=2)
-    fig.add_trace(go.Pie(labels=description_counts_3['Description'], values=description_counts_3['count']), row=1,
-                  col=3)
-
-    # Impostiamo il titolo comune per la legenda
-    fig.update_layout(legend=dict(title="Description"))
-
     # Visualizziamo i grafici in Streamlit
-    st.plotly_chart(fig, use_container_width=True)
-
-    st.header("Differenza ore di luce tra il '" + str(day_1) + "' e il '" + str(day_3) + "'")
-
-    row_first_day = df.filter(df['Date'] == day_1).select("Sunrise_Time", "Sunset_Time").collect()[0]
-    sunrise_first_day = row_first_day["Sunrise_Time"]
-    sunset_first_day = row_first_day["Sunset_Time"]
-
-    row_second_day = df.filter(df['Date'] == day_3).select("Sunrise_Time", "Sunset_Time").collect()[0]
-    sunrise_second_day = row_second_day["Sunrise_Time"]
-    sunset_second_day = row_second_day["Sunset_Time"]
-
-    # Convertiamo le stringhe in oggetti datetime
-    datetime_sunrise_first_day = datetime.strptime(sunrise_first_day, "%H:%M:%S")
-    datetime_sunset_first_day = datetime.strptime(sunset_first_day, "%H:%M:%S")
-
-    # Calcoliamo la differenza tra i due tempi
-    diff_first_day = datetime_sunset_first_day - datetime_sunrise_first_day
+    mostra_grafico('Analitica 2: aerogrammi', (tuple(giorni_selezionati),),
+                   lambda: aerogrammi(giorni_selezionati, aggregati_selezionati), use_container_width=True)
 
-    # Convertiamo le stringhe in oggetti datetime
-    datetime_sunrise_second_day = datetime.strptime(sunrise_second_day, "%H:%M:%S")
-    datetime_sunset_second_day = datetime.strptime(sunset_second_day, "%H:%M:%S")
+    # Confrontiamo le ore di luce dei due giorni estremi dell'intervallo selezionato
+    day_1, day_3 = giorni_selezionati[0], giorni_selezionati[-1]
+    aggregati_day_1, aggregati_day_3 = aggregati_selezionati[0], aggregati_selezionati[-1]
 
-    # Calcoliamo la differenza tra i due tempi
-    diff_second_day = datetime_sunset_second_day - datetime_sunrise_second_day
-
-    diff_days = str(abs(diff_second_day - diff_first_day))
-    diff_first_day = str(diff_first_day)
-    diff_second_day = str(diff_second_day)
-
-    # Creiamo una lista di dizionari con il nome del campo e il valore corrispondente
-    table_data = [
-        {'Fasi del Giorno': 'Alba', 'Valori del ' + str(day_1): sunrise_first_day,
-         'Valore del ' + str(day_3): sunrise_second_day},
-        {'Fasi del Giorno': 'Tramonto', 'Valori del ' + str(day_1): sunset_first_day,
-         'Valore del ' + str(day_3): sunset_second_day},
-        {'Fasi del Giorno': 'Ore di Sole', 'Valori del ' + str(day_1): diff_first_day,
-         'Valore del ' + str(day_3): diff_second_day}
-    ]
-
-    df_table = pd.DataFrame(table_data)
+    st.header("Differenza ore di luce tra il '" + str(day_1) + "' e il '" + str(day_3) + "'")
 
-    # Aggiungiamo l'header personalizzato
-    header = {'Fasi del Giorno': 'Fasi del Giorno', 'Valori Medio': 'Valori Medio'}
+    tabella_luce, diff_days = tabella_in_cache('Analitica 2: ore di luce', (day_1, day_3),
+                                               lambda: tabella_ore_di_luce(day_1, day_3, aggregati_day_1,
+                                                                           aggregati_day_3))
 
     col1, col2 = st.columns(2)
 
     # Nella colonna 1, visualizziamo il grafico
     with col1:
         # Visualizziamo la tabella con gli header personalizzati
-        st.write(df_table.rename(columns=header).set_index('Fasi del Giorno'))
+        st.write(tabella_luce)
 
     # Nella colonna 2, visualizziamo la nota
     with col2:
@@ -534,65 +462,136 @@ elif pagina_selezionata == "Analitica 3":
     Nello specifico, l'analisi si concentra sulla distribuzione delle direzioni del vento registrate, 
     offrendo una visione del comportamento del vento durante il giorno preso in considerazione.''')
 
-    cardinal_points = {
-        "Nord": 0,
-        "Nord-Est": 45,
-        "Est": 90,
-        "Sud-Est": 135,
-        "Sud": 180,
-        "Sud-Ovest": 225,
-        "Ovest": 270,
-        "Nord-Ovest": 315
-    }
-
-    def punto_cardinale(angolo):
-        differenze = {punto: abs(angolo - valore) for punto, valore in cardinal_points.items()}
-        punto_più_vicino = min(differenze, key=differenze.get)
-        return punto_più_vicino
-
-
-    selected_day = st.date_input('Seleziona una data:', value=data_minima, min_value=data_minima,
-                                 max_value=data_massima)
-    row_selected_day = df.filter(df['Date'] == selected_day).select("Wind_Deg", "Time")
-    wind_deg_values = [row["Wind_Deg"] for row in row_selected_day.collect()]
-    wind_deg = row_selected_day.agg(round(mean('Wind_Deg'), 1)).first()[0]
-    time_values = [row["Time"] for row in row_selected_day.collect()]
-    r = list(range(1, len(wind_deg_values) + 1))
-
-    fig = go.Figure(data=go.Scatterpolar(
-        theta=wind_deg_values,
-        r=time_values,
-        mode='markers',
-        marker=dict(
-            symbol='circle',
-            size=10,
-            color='blue'
-        ),
-        showlegend=False
-    ))
-
-    fig.update_layout(
-        title='Grafico Scatter Polar',
-        polar=dict(
-            radialaxis=dict(
-                visible=True,
-                tickfont=dict(color='rgba(0, 0, 0, 0)'),
-            )
-        )
-    )
+    # L'analisi può riguardare un singolo giorno oppure un intervallo di date anche molto ampio
+    modalita_selezione = st.radio('Periodo da analizzare:', ['Giorno specifico', 'Intervallo di date'],
+                                  horizontal=True)
+    numero_settori = st.radio('Settori della rosa dei venti:', [8, 16], index=1, horizontal=True)
+    ore_selezionate = fascia_oraria()
+
+    if modalita_selezione == 'Giorno specifico':
+        selected_day = st.date_input('Seleziona una data:', value=data_minima, min_value=data_minima,
+                                     max_value=data_massima)
+        # Interrompe la pagina se il giorno selezionato non ha rilevazioni
+        aggregati_del_giorno(selected_day)
+
+        # Le rilevazioni del giorno vengono lette al più una volta e usate sia per il grafico sia per le statistiche,
+        # ma solo se l'uno o le altre non sono già nella cache
+        letture = {}
+
+        def rilevazioni_del_giorno():
+            if 'righe' not in letture:
+                osservazioni = espandi(osservazioni_del_giorno(citta, selected_day, versione))
+                letture['righe'] = rilevazioni_nella_fascia(osservazioni, selected_day, ore_selezionate)
+            return letture['righe']
+
+        def riepilogo_del_giorno():
+            row_selected_day = rilevazioni_del_giorno()
+            return media_circolare(row_selected_day["Wind_Deg"]) + (rosa_dei_venti(row_selected_day, numero_settori),)
+
+        wind_deg, costanza, rosa = tabella_in_cache('Analitica 3: riepilogo del giorno',
+                                                    (selected_day, ore_selezionate, numero_settori),
+                                                    riepilogo_del_giorno)
+        periodo = f"la giornata del {selected_day}"
+
+        def grafico_vento():
+            return grafico_direzioni(rilevazioni_del_giorno())
+
+        parametri_grafico = (selected_day, ore_selezionate)
+    else:
+        intervallo = st.date_input('Seleziona l\'intervallo di date:', value=(data_minima, data_massima),
+                                   min_value=data_minima, max_value=data_massima)
+        giorni_selezionati = tuple(giorno for giorno in giorni_disponibili
+                                   if intervallo[0] <= giorno <= intervallo[-1])
+        if not giorni_selezionati:
+            st.info('Nessuna rilevazione disponibile nell\'intervallo selezionato.')
+            st.stop()
+
+        # La fascia oraria viene applicata dal motore di calcolo durante la lettura
+        wind_deg, costanza, rosa = riepilogo_vento(citta, giorni_selezionati, numero_settori, ore_selezionate,
+                                                   versione)
+        if math.isnan(wind_deg):
+            st.info('Nessuna rilevazione disponibile nella fascia oraria selezionata.')
+            st.stop()
+        periodo = f"il periodo dal {giorni_selezionati[0]} al {giorni_selezionati[-1]}"
+
+        # Rosa dei venti: frequenza delle direzioni per fascia di velocità
+        def grafico_vento():
+            return grafico_rosa(rosa)
+
+        parametri_grafico = (giorni_selezionati, ore_selezionate, numero_settori)
 
     # Imposta la larghezza delle colonne
     col1, col2 = st.columns([2, 1])
 
     # Nella colonna 1, visualizziamo il grafico
     with col1:
-        st.plotly_chart(fig)
+        mostra_grafico('Analitica 3: direzione del vento', parametri_grafico, grafico_vento)
 
-    # Nella colonna 2, visualizziamo la nota
+    # Nella colonna 2, visualizziamo la nota: la direzione prevalente è la media circolare delle direzioni e la
+    # costanza è la lunghezza del vettore risultante medio (1 = direzione sempre uguale, 0 = direzione variabile)
     with col2:
         st.markdown(
             f'<br><br><br><br><div style="background-color: #FFA559; padding: 15px; border-radius: 5px;width: 60%;">'
-            f'<p style="color: white;"><b>Interpretazione dei valori del grafico: </b>Durante la giornata del {selected_day}, il vento ha puntato prevalentemente verso {punto_cardinale(wind_deg)} 🧭</p>'
+            f'<p style="color: white;"><b>Interpretazione dei valori del grafico: </b>Durante {periodo}, il vento ha puntato prevalentemente verso {punto_cardinale(wind_deg, numero_settori)} 🧭 '
+            f'(direzione media {wind_deg:.1f}°, costanza {costanza:.2f})</p>'
             f'</div>',
             unsafe_allow_html=True
         )
+
+    st.header('Distribuzione delle direzioni per velocità del vento')
+    st.write(rosa.style.format('{:.1f}%'))
+
+elif pagina_selezionata == "Tendenze":
+
+    st.title('Tendenze su più giorni')
+
+    st.write('''In questa sezione è possibile seguire l'andamento di un campo su un intervallo di giorni, anche di
+    più mesi, tramite le medie orarie o giornaliere delle rilevazioni e la loro media mobile su una finestra a
+    scelta.''')
+
+    # Per default vengono mostrati gli ultimi tre mesi di rilevazioni
+    intervallo = st.date_input('Seleziona l\'intervallo di date:',
+                               value=(max(data_minima, data_massima - timedelta(days=90)), data_massima),
+                               min_value=data_minima, max_value=data_massima)
+    variabile_selezionata = VARIABILI[st.selectbox('Seleziona la variabile da visualizzare:', list(VARIABILI))]
+    granularita = {'Orarie': 'ora', 'Giornaliere': 'giorno'}[st.radio('Medie:', ['Orarie', 'Giornaliere'],
+                                                                       horizontal=True)]
+
+    # Ampiezza della media mobile in secondi: le finestre predefinite oppure un numero di ore a scelta
+    finestre = {'Nessuna': None, '24 ore': 24 * 3600, '7 giorni': 7 * 86400, '30 giorni': 30 * 86400}
+    nome_finestra = st.selectbox('Media mobile:', list(finestre) + ['Personalizzata'], index=1)
+    if nome_finestra == 'Personalizzata':
+        ore_finestra = st.number_input('Ampiezza della finestra (ore):', min_value=1, max_value=366 * 24, value=72)
+        nome_finestra, finestra = f'{ore_finestra} ore', int(ore_finestra) * 3600
+    else:
+        finestra = finestre[nome_finestra]
+        if finestra is None:
+            nome_finestra = None
+
+    if not any(intervallo[0] <= giorno <= intervallo[-1] for giorno in giorni_disponibili):
+        st.info('Nessuna rilevazione disponibile nell\'intervallo selezionato.')
+        st.stop()
+
+    def grafico_delle_tendenze():
+        serie = serie_temporali(citta, granularita, finestra, versione)
+        serie = serie[(serie['Date'] >= intervallo[0]) & (serie['Date'] <= intervallo[-1])]
+        return grafico_tendenza(serie, variabile_selezionata, granularita, nome_finestra)
+
+    mostra_grafico('Tendenze: medie e medie mobili',
+                   (intervallo[0], intervallo[-1], variabile_selezionata, granularita, finestra),
+                   grafico_delle_tendenze, use_container_width=True)
+
+# Sezione di diagnostica, nascosta se non richiesta: ultime misure delle letture e dei grafici del processo
+if DIAGNOSTICA or st.query_params.get('diagnostica') == '1':
+    with st.sidebar.expander('Diagnostica'):
+        misure = pd.DataFrame(ultime_misure()[::-1])
+        if not misure.empty:
+            misure['istante'] = pd.to_datetime(misure['istante'], unit='s').dt.strftime('%H:%M:%S')
+        st.dataframe(misure, hide_index=True)
+        occupazione = statistiche()
+        st.caption(f"Cache dei grafici: {occupazione['voci']} voci, {occupazione['byte'] / 2 ** 20:.1f} MB su "
+                   f"{occupazione['limite'] / 2 ** 20:.0f} MB; {occupazione['successi']} successi, "
+                   f"{occupazione['fallimenti']} fallimenti, {occupazione['scartate']} scartate")
+        st.download_button('Esporta in JSON', json.dumps(ultime_misure(), indent=2), 'diagnostica.json',
+                           mime='application/json')
+        st.download_button('Esporta per Prometheus', formato_prometheus(), 'diagnostica.prom', mime='text/plain')
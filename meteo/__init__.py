@@ -0,0 +1 @@
+# Moduli di supporto alla dashboard: caricamento, preprocessing e analitiche dei dati meteo
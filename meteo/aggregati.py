@@ -0,0 +1,204 @@
+from pyspark.sql import Window
+from pyspark.sql.functions import col, cos, count, degrees, hypot, lit, map_from_entries, collect_list, struct, \
+    atan2, min, min_by, pmod, radians, round, sin, sum, array, arrays_zip, avg, coalesce, create_map, datediff, \
+    element_at, explode, expr, floor, greatest, least, max, sort_array, sqrt, to_date, var_pop, when
+
+from meteo.climatologia import CAMPI_CLIMATOLOGIA, INTERA_GIORNATA, SCHEMA_SINTESI
+from meteo.configurazione import CAMPI_NUMERICI, CIFRE_DECIMALI
+from meteo.serie import SCHEMA_SERIE
+from meteo.statistiche import SCHEMA_STATISTICHE
+
+
+def calcola_statistiche_giornaliere(df):
+    # Statistiche incrementali di ogni giorno (vedi meteo.statistiche). Primo livello: un'unica scansione dei dati
+    # raggruppati per giorno e descrizione. Per ogni gruppo teniamo conteggi, somme, M2, minimi e massimi dei campi
+    # numerici, così da poter ricomporre le statistiche giornaliere esatte senza dover rileggere le righe.
+    parziali = df.groupBy('Date', 'Description').agg(
+        count(lit(1)).alias('Rilevazioni'),
+        min('Datetime').alias('Prima_Rilevazione'),
+        min_by('Sunrise', 'Datetime').alias('Sunrise'),
+        min_by('Sunset', 'Datetime').alias('Sunset'),
+        *[espressione for campo in CAMPI_NUMERICI for espressione in (
+            count(col(campo)).alias('conteggio_' + campo),
+            sum(col(campo).cast('double')).alias('somma_' + campo),
+            (coalesce(var_pop(col(campo).cast('double')), lit(0.0)) * count(col(campo))).alias('m2_' + campo),
+            min(col(campo).cast('double')).alias('minimo_' + campo),
+            max(col(campo).cast('double')).alias('massimo_' + campo)
+        )],
+        # La direzione del vento viene sommata come versore (seno e coseno), per la media circolare
+        sum(sin(radians('Wind_Deg'))).alias('somma_sin_vento'),
+        sum(cos(radians('Wind_Deg'))).alias('somma_cos_vento'),
+        count(col('Wind_Deg')).alias('conteggio_vento')
+    )
+
+    # Secondo livello: i gruppi parziali (pochi per giorno) vengono fusi in un'unica riga per giorno. Le rilevazioni
+    # senza descrizione contano tra le rilevazioni del giorno ma non nell'istogramma (come in meteo.statistiche)
+    descrizioni = when(col('Description').isNotNull(), create_map('Description', 'Rilevazioni'))
+    return fondi_statistiche(parziali.withColumn('Descrizioni', descrizioni).drop('Description'))
+
+
+def fondi_statistiche(stati):
+    # Fonde gli stati con lo stesso giorno (come meteo.statistiche.fondi_statistiche): l'istogramma delle
+    # descrizioni somma i conteggi, alba e tramonto sono quelli della prima rilevazione
+    descrizioni = stati.select('Date', explode('Descrizioni').alias('Description', 'count')) \
+        .groupBy('Date', 'Description').agg(sum('count').alias('count')) \
+        .groupBy('Date').agg(map_from_entries(collect_list(struct('Description', 'count'))).alias('Descrizioni'))
+
+    # M2 = somma degli M2 + somma di S_i^2 / n_i - S^2 / N, dove S e N sono somme e conteggi
+    momenti = stati.groupBy('Date').agg(
+        *[espressione for campo in CAMPI_NUMERICI for espressione in (
+            sum('conteggio_' + campo).alias('conteggio_' + campo),
+            sum('somma_' + campo).alias('somma_' + campo),
+            greatest(lit(0.0), sum('m2_' + campo) + sum(when(col('conteggio_' + campo) > 0, col('somma_' + campo) ** 2 /
+                                                             col('conteggio_' + campo)).otherwise(0.0)) -
+                     sum('somma_' + campo) ** 2 / sum('conteggio_' + campo)).alias('m2_' + campo),
+            min('minimo_' + campo).alias('minimo_' + campo),
+            max('massimo_' + campo).alias('massimo_' + campo)
+        )],
+        sum('somma_sin_vento').alias('somma_sin_vento'),
+        sum('somma_cos_vento').alias('somma_cos_vento'),
+        sum('conteggio_vento').alias('conteggio_vento'),
+        sum('Rilevazioni').alias('Rilevazioni'),
+        min('Prima_Rilevazione').alias('Prima_Rilevazione'),
+        min_by('Sunrise', 'Prima_Rilevazione').alias('Sunrise'),
+        min_by('Sunset', 'Prima_Rilevazione').alias('Sunset')
+    )
+    # I giorni senza alcuna descrizione hanno un istogramma vuoto
+    return momenti.join(descrizioni, 'Date', 'left') \
+        .withColumn('Descrizioni', coalesce('Descrizioni', create_map().cast('map<string,bigint>'))) \
+        .select(*SCHEMA_STATISTICHE.names)
+
+
+def aggregati_da_statistiche(stati):
+    # Aggregati giornalieri a partire dallo stato di ogni giorno: le medie sono le somme divise per i conteggi
+    return stati.select(
+        *[round(col('somma_' + campo) / col('conteggio_' + campo), CIFRE_DECIMALI[campo]).alias(campo)
+          for campo in CAMPI_NUMERICI],
+        # Direzione media del vento (media circolare, come meteo.vento.media_da_componenti) e lunghezza del
+        # vettore risultante medio, che misura quanto la direzione è rimasta costante durante il giorno
+        pmod(round(degrees(atan2('somma_sin_vento', 'somma_cos_vento')), CIFRE_DECIMALI['Wind_Deg']), lit(360.0))
+        .alias('Wind_Deg'),
+        round(hypot('somma_sin_vento', 'somma_cos_vento') / col('conteggio_vento'), CIFRE_DECIMALI['Costanza_Vento'])
+        .alias('Costanza_Vento'),
+        'Descrizioni', 'Sunrise', 'Sunset',
+        # Durata del giorno (ore di luce) espressa in secondi
+        (col('Sunset') - col('Sunrise')).alias('Durata_Luce'),
+        'Rilevazioni',
+        # Deviazione standard (di popolazione), minimo e massimo di ogni campo
+        *[espressione for campo in CAMPI_NUMERICI for espressione in (
+            round(sqrt(col('m2_' + campo) / col('conteggio_' + campo)), CIFRE_DECIMALI[campo])
+            .alias('Deviazione_' + campo),
+            col('minimo_' + campo).alias('Minimo_' + campo),
+            col('massimo_' + campo).alias('Massimo_' + campo)
+        )],
+        'Date'
+    )
+
+
+def parametro_classi(indice):
+    # Mappa campo -> inizio, ampiezza o numero delle classi dell'istogramma (vedi meteo.climatologia)
+    return create_map(*[valore for campo, parametri in CAMPI_CLIMATOLOGIA.items()
+                        for valore in (lit(campo), lit(parametri[indice]))])
+
+
+def calcola_sintesi_orarie(df):
+    # Sintesi di ogni giorno, campo e ora per le normali climatologiche (come
+    # meteo.climatologia.calcola_sintesi_orarie): ogni rilevazione conta sia per la propria ora sia per l'intera
+    # giornata
+    campi = ', '.join(f"'{campo}', double({campo})" for campo in CAMPI_CLIMATOLOGIA)
+    valori = df.select('Date', explode(array(floor(col('Secondi') / 3600).cast('int'), lit(INTERA_GIORNATA)))
+                       .alias('Ora'), *CAMPI_CLIMATOLOGIA) \
+        .select('Date', 'Ora', expr(f'stack({len(CAMPI_CLIMATOLOGIA)}, {campi}) as (Campo, Valore)')) \
+        .filter(col('Valore').isNotNull())
+
+    momenti = valori.groupBy('Date', 'Campo', 'Ora').agg(
+        count('Valore').alias('Conteggio'),
+        avg('Valore').alias('Media'),
+        (var_pop('Valore') * count('Valore')).alias('M2'),
+        min('Valore').alias('Minimo'),
+        max('Valore').alias('Massimo')
+    )
+
+    # Istogramma a classi fisse, come lista ordinata delle classi non vuote e delle loro frequenze
+    classe = greatest(lit(0), least(element_at(parametro_classi(2), col('Campo')) - 1, floor(
+        (col('Valore') - element_at(parametro_classi(0), col('Campo'))) / element_at(parametro_classi(1), col('Campo')))
+    )).cast('int')
+    return unisci_sintesi(momenti, valori.groupBy('Date', 'Campo', 'Ora', classe.alias('Classe'))
+                          .agg(count(lit(1)).alias('Frequenza')))
+
+
+def unisci_sintesi(momenti, frequenze):
+    # Sintesi a partire dai momenti e dalle frequenze delle classi di ogni giorno, campo e ora
+    istogrammi = frequenze.groupBy('Date', 'Campo', 'Ora') \
+        .agg(sort_array(collect_list(struct('Classe', 'Frequenza'))).alias('Coppie'))
+    return momenti.join(istogrammi, ['Date', 'Campo', 'Ora']).select(
+        'Campo', 'Ora', 'Conteggio', 'Media', 'M2', 'Minimo', 'Massimo',
+        col('Coppie.Classe').alias('Classi'), col('Coppie.Frequenza').alias('Frequenze'), 'Date'
+    )
+
+
+def fondi_sintesi(sintesi):
+    # Fonde le sintesi con lo stesso giorno, campo e ora (come meteo.climatologia.fondi_sintesi)
+    momenti = sintesi.groupBy('Date', 'Campo', 'Ora').agg(
+        sum('Conteggio').alias('Conteggio'),
+        (sum(col('Media') * col('Conteggio')) / sum('Conteggio')).alias('Media'),
+        greatest(lit(0.0), sum(col('M2') + col('Conteggio') * col('Media') ** 2) -
+                 sum(col('Media') * col('Conteggio')) ** 2 / sum('Conteggio')).alias('M2'),
+        min('Minimo').alias('Minimo'),
+        max('Massimo').alias('Massimo')
+    )
+    frequenze = sintesi.select('Date', 'Campo', 'Ora', explode(arrays_zip('Classi', 'Frequenze')).alias('Coppia')) \
+        .groupBy('Date', 'Campo', 'Ora', col('Coppia.Classi').alias('Classe')) \
+        .agg(sum('Coppia.Frequenze').alias('Frequenza'))
+    return unisci_sintesi(momenti, frequenze).select(*SCHEMA_SINTESI.names)
+
+
+def calcola_serie_orarie(df):
+    # Bucket orari delle rilevazioni (vedi meteo.serie): l'inizio dell'ora locale è l'istante della rilevazione meno
+    # i secondi trascorsi dall'inizio dell'ora
+    return df.groupBy('Date', (col('Datetime') - col('Secondi') % 3600).alias('Inizio')).agg(
+        *[espressione for campo in CAMPI_NUMERICI for espressione in (
+            count(col(campo)).alias('conteggio_' + campo),
+            sum(col(campo).cast('double')).alias('somma_' + campo)
+        )]
+    ).select(*SCHEMA_SERIE.names)
+
+
+def fondi_serie(serie):
+    # Fonde i bucket con lo stesso inizio (come meteo.serie.fondi_serie)
+    return serie.groupBy('Date', 'Inizio') \
+        .agg(*[sum(colonna).alias(colonna) for colonna in SCHEMA_SERIE.names if colonna not in ('Date', 'Inizio')]) \
+        .select(*SCHEMA_SERIE.names)
+
+
+def serie_giornaliere(stati):
+    # Bucket giornalieri dalle statistiche giornaliere, con inizio alla mezzanotte UTC del giorno (come
+    # meteo.serie.serie_giornaliere)
+    return stati.withColumn('Inizio', datediff(col('Date'), to_date(lit('1970-01-01'))).cast('long') * 86400) \
+        .select(*SCHEMA_SERIE.names)
+
+
+def medie_serie(serie, finestra=None):
+    # Media di ogni bucket e, con 'finestra' (in secondi), media mobile dei bucket con inizio in (t - finestra, t]
+    # (come meteo.serie.medie_serie): somme e conteggi della finestra sono accumulati da una funzione finestra
+    # ordinata per inizio, che scorre i bucket una sola volta. I bucket di una città sono poche migliaia all'anno,
+    # per cui la finestra non viene partizionata
+    colonne = [(col('somma_' + campo) / col('conteggio_' + campo)).alias(campo) for campo in CAMPI_NUMERICI]
+    if finestra is not None:
+        intervallo = Window.orderBy('Inizio').rangeBetween(-finestra + 1, Window.currentRow)
+        colonne += [(sum('somma_' + campo).over(intervallo) / sum('conteggio_' + campo).over(intervallo))
+                    .alias('Mobile_' + campo) for campo in CAMPI_NUMERICI]
+    return serie.select('Inizio', 'Date', *colonne)
+
+
+def aggregati_per_giorno(aggregati):
+    # Materializziamo la tabella degli aggregati nel driver come dizionario indicizzato per data:
+    # le pagine della dashboard accedono ai valori di un giorno con una semplice lookup
+    risultato = {}
+    for riga in aggregati.collect():
+        aggregati_giorno = riga.asDict()
+
+        # L'ordine delle voci della mappa dipende dall'esecuzione: lo rendiamo deterministico
+        aggregati_giorno['Descrizioni'] = dict(sorted(aggregati_giorno['Descrizioni'].items()))
+        risultato[riga['Date']] = aggregati_giorno
+    return risultato
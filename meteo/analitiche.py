@@ -0,0 +1,379 @@
+import math
+from datetime import timedelta
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from meteo.campionamento import indici_etichette, riduci
+from meteo.configurazione import PUNTI_MASSIMI_GRAFICO
+from meteo.orari import NON_DISPONIBILE, istanti_locali, orari, orario_locale
+
+# Grafici e tabelle delle tre analitiche, costruiti a partire dalle rilevazioni e dagli aggregati giornalieri già
+# letti dall'archivio. Sono usati sia dalla dashboard sia dai report statici di meteo.report
+
+# Utilizzo degli alias per visualizzare i valori in italiano
+VARIABILI = {
+    'Temperatura': 'Temperature',
+    'Temperatura Percepita': 'Feels_Like',
+    'Pressione': 'Pressure',
+    'Umidità': 'Humidity',
+    'Visibilità': 'Visibility',
+    'Velocità del Vento': 'Wind_Speed',
+    'Nuvolosità': 'Clouds_Level'
+}
+
+
+# Titolo dell'asse y dei grafici di tendenza per ogni variabile
+UNITA = {
+    'Temperature': 'Gradi (C°)',
+    'Feels_Like': 'Gradi (C°)',
+    'Pressure': 'Atmosfere (hPa)',
+    'Humidity': 'Percentuale (%)',
+    'Visibility': 'Metri (m)',
+    'Wind_Speed': 'Metri/Secondo (m/s)',
+    'Clouds_Level': 'Percentuale (%)'
+}
+
+
+def grafico_temporale(osservazioni, variabile_selezionata, punti_massimi=PUNTI_MASSIMI_GRAFICO):
+    # Analitica 1: andamento della variabile nelle rilevazioni di un giorno (già limitate alla fascia oraria)
+    # Le rilevazioni vengono ridotte al numero massimo di punti per traccia (con LTTB, che conserva picchi e minimi)
+    # prima di costruire il grafico
+    colonne_grafico = [variabile_selezionata]
+    if variabile_selezionata == 'Temperature' or variabile_selezionata == 'Feels_Like':
+        colonne_grafico += ['Temp_Max', 'Temp_Min']
+    filtered_data_pd = riduci(osservazioni, colonne_grafico, punti_massimi)
+
+    # Gli orari da mostrare sull'asse x vengono formattati soltanto per i punti del grafico
+    filtered_data_pd = filtered_data_pd.assign(Time=orari(filtered_data_pd['Secondi']))
+
+    # Creaimao il grafico temporale
+    fig = px.line(filtered_data_pd, x='Time', y=variabile_selezionata)
+
+    # Limitiamo il numero di etichette sull'asse x
+    num_labels = 6  # Specifica il numero di etichette desiderato
+
+    # Etichette equidistanti più l'ultima, con i primi 5 caratteri dell'ora
+    tick_indices = indici_etichette(len(filtered_data_pd), num_labels)
+    tick_labels = filtered_data_pd['Time'].str[:5].to_numpy()[tick_indices]
+    fig.update_xaxes(tickmode='array', tickvals=tick_indices.tolist(), ticktext=tick_labels.tolist())
+
+    if variabile_selezionata == 'Temperature' or variabile_selezionata == 'Feels_Like':
+        fig.add_trace(go.Scatter(
+            x=filtered_data_pd['Time'],
+            y=filtered_data_pd['Temp_Max'],
+            name='Temperatura Massima',
+            mode='lines',
+            line=dict(color='red')
+        ))
+        fig.add_trace(go.Scatter(
+            x=filtered_data_pd['Time'],
+            y=filtered_data_pd['Temp_Min'],
+            name='Temperatura Minima',
+            mode='lines',
+            line=dict(color='blue')
+        ))
+        fig.add_trace(go.Scatter(
+            x=filtered_data_pd['Time'],
+            y=filtered_data_pd['Temp_Max'],
+            fill='tonexty',
+            fillcolor='rgba(255,150,150,0.07)',
+            name='Intervallo Max-Min'
+        ))
+        fig.update_yaxes(title='Gradi (C°)')
+
+    elif variabile_selezionata == 'Pressure':
+        fig.update_yaxes(title='Atmosfere (hPa)')
+
+    elif variabile_selezionata == 'Humidity' or variabile_selezionata == 'Clouds_Level':
+        fig.update_yaxes(title='Percentuale (%)')
+
+    elif variabile_selezionata == 'Visibility':
+        fig.update_yaxes(title='Metri (m)')
+
+    elif variabile_selezionata == 'Wind_Speed':
+        fig.update_yaxes(title='Metri/Secondo (m/s)')
+
+    fig.update_xaxes(title='Ora del Giorno')
+    return fig
+
+
+def grafico_tendenza(serie, variabile_selezionata, granularita, nome_finestra=None,
+                     punti_massimi=PUNTI_MASSIMI_GRAFICO):
+    # Tendenze: medie orarie o giornaliere della variabile in un intervallo di giorni e, se richiesta, la loro media
+    # mobile (vedi meteo.serie). Come nell'Analitica 1, le serie lunghe vengono ridotte con LTTB prima di costruire
+    # il grafico
+    colonne_grafico = [variabile_selezionata]
+    if nome_finestra is not None:
+        colonne_grafico.append('Mobile_' + variabile_selezionata)
+    serie = riduci(serie, colonne_grafico, punti_massimi)
+
+    # I bucket orari sono indicati dall'istante di inizio, quelli giornalieri dal giorno
+    asse_x = istanti_locali(serie['Inizio']) if granularita == 'ora' else pd.to_datetime(serie['Date'])
+
+    fig = go.Figure(go.Scatter(
+        x=asse_x,
+        y=serie[variabile_selezionata],
+        name='Media oraria' if granularita == 'ora' else 'Media giornaliera',
+        mode='lines',
+        line=dict(color='#FFA559', width=1)
+    ))
+    if nome_finestra is not None:
+        fig.add_trace(go.Scatter(
+            x=asse_x,
+            y=serie['Mobile_' + variabile_selezionata],
+            name=f'Media mobile ({nome_finestra})',
+            mode='lines',
+            line=dict(color='blue', width=2)
+        ))
+
+    fig.update_xaxes(title='Giorno')
+    fig.update_yaxes(title=UNITA[variabile_selezionata])
+    return fig
+
+
+def tabella_valori_medi(aggregati_giorno):
+    # Analitica 1: medie, deviazioni standard, minimi e massimi dei campi del giorno, dalla tabella degli aggregati
+    # giornalieri (che li ricava dalle statistiche incrementali, vedi meteo.statistiche)
+    campi = {
+        '🌡️ Temperatura (C°)': 'Temperature',
+        '🥵 Temperatura Percepita (C°)': 'Feels_Like',
+        '🌫️ Pressione (hPa)': 'Pressure',
+        '💧 Umidità (%)': 'Humidity',
+        '️😶‍🌫️ Visibilità (m)': 'Visibility',
+        '🌬️ Velocità del Vento (m/s)': 'Wind_Speed',
+        '☁️ Nuvolosità (%)': 'Clouds_Level',
+    }
+
+    # Creaiamo una lista di dizionari con il nome del campo e i valori corrispondenti
+    table_data = [
+        {'Campo (Misura)': nome,
+         'Valore Medio': "{:.2f}".format(aggregati_giorno[campo]),
+         'Deviazione Standard': "{:.2f}".format(aggregati_giorno['Deviazione_' + campo]),
+         'Minimo': "{:.2f}".format(aggregati_giorno['Minimo_' + campo]),
+         'Massimo': "{:.2f}".format(aggregati_giorno['Massimo_' + campo])}
+        for nome, campo in campi.items()
+    ]
+
+    # Creaiamo un DataFrame con il dizionario, indicizzato per campo
+    return pd.DataFrame(table_data).set_index('Campo (Misura)')
+
+
+def istogramma(giorni_selezionati, aggregati_selezionati, variabile_selezionata, normali_selezionate=None):
+    # Analitica 2: confronto tra le medie giornaliere della variabile nei giorni selezionati, con la normale
+    # climatologica di ciascun giorno se disponibile (vedi meteo.climatologia)
+    giorni_selezionati_str = [giorno.strftime("%d/%m/%Y") for giorno in giorni_selezionati]
+
+    # Creiamo una lista di dizionari
+    data = [
+        {'Giorno': giorno_str, **{campo: aggregati_giorno[campo] for campo in VARIABILI.values()}}
+        for giorno_str, aggregati_giorno in zip(giorni_selezionati_str, aggregati_selezionati)
+    ]
+
+    # Calcoliamo il valore massimo per l'asse y
+    max_value = max([item[variabile_selezionata] for item in data])
+
+    # Creazione dell'istogramma
+    fig = go.Figure(
+        data=[go.Bar(x=[item['Giorno'] for item in data], y=[item[variabile_selezionata] for item in data],width=0.3,
+                     name='Media del giorno')])
+
+    # Normale di ogni giorno: mediana delle rilevazioni dello stesso periodo dell'anno, con l'intervallo tra il
+    # 5° e il 95° percentile e quello tra il 25° e il 75°
+    if normali_selezionate is not None and any(normale is not None for normale in normali_selezionate):
+        normali = [normale or {} for normale in normali_selezionate]
+        mediane = [normale.get('P50') for normale in normali]
+        for nome, basso, alto, spessore in (('Normale (5°-95° percentile)', 'P05', 'P95', 1),
+                                            ('Normale (25°-75° percentile)', 'P25', 'P75', 4)):
+            fig.add_trace(go.Scatter(
+                x=giorni_selezionati_str, y=mediane, mode='markers', name=nome,
+                marker=dict(color='#3D5A80', size=8, symbol='line-ew-open'),
+                error_y=dict(type='data', symmetric=False, thickness=spessore, width=6, color='#3D5A80',
+                             array=[normale[alto] - normale['P50'] if normale else None for normale in normali],
+                             arrayminus=[normale['P50'] - normale[basso] if normale else None
+                                         for normale in normali])
+            ))
+        max_value = max([max_value] + [normale['P95'] for normale in normali if normale])
+
+    y_max = max_value + max_value * 0.25  # Imposta il valore massimo dell'asse y al 10% del valore massimo dei dati
+
+    if variabile_selezionata == 'Temperature':
+        fig.update_yaxes(title='Temperatura (°C)')
+        fig.update_layout(
+            title='Variazione Temperatura',
+            yaxis_range=[0, y_max]
+        )
+
+    elif variabile_selezionata == 'Feels_Like':
+        fig.update_yaxes(title='Temperatura (°C)')
+        fig.update_layout(
+            title='Variazione Temperatura Percepita',
+            yaxis_range=[0, y_max]
+        )
+
+    elif variabile_selezionata == 'Pressure':
+        fig.update_yaxes(title='Atmosfere (hPa)')
+        fig.update_layout(
+            title='Variazione Pressione',
+            yaxis_range=[0, y_max]
+        )
+
+    elif variabile_selezionata == 'Humidity':
+        fig.update_yaxes(title='Percentuale (%)')
+        fig.update_layout(
+            title='Variazione Umidità',
+            yaxis_range=[0, y_max]
+        )
+
+    elif variabile_selezionata == 'Clouds_Level':
+        fig.update_yaxes(title='Percentuale (%)')
+        fig.update_layout(
+            title='Variazione Nuvolosità',
+            yaxis_range=[0, y_max]
+        )
+
+    elif variabile_selezionata == 'Visibility':
+        fig.update_yaxes(title='Metri (m)')
+        fig.update_layout(
+            title='Variazione Visibilità',
+            yaxis_range=[0, y_max]
+        )
+
+    elif variabile_selezionata == 'Wind_Speed':
+        fig.update_yaxes(title='Metri/Secondo (m/s)')
+        fig.update_layout(
+            title='Variazione Velocità del Vento',
+            yaxis_range=[0, y_max]
+        )
+
+    fig.update_xaxes(title='Giorno')
+    fig.update_traces(marker_color='#FFA559', selector=dict(type='bar'))
+    return fig
+
+
+def tabella_scostamenti(giorni_selezionati, aggregati_selezionati, normali_selezionate):
+    # Analitica 2: scarto della media di ogni giorno dalla media normale del suo periodo dell'anno, per le variabili
+    # che hanno una normale climatologica. 'normali_selezionate' associa a ogni giorno un dizionario
+    # variabile -> normale (None se mancano i dati)
+    righe_tabella = []
+    for giorno, aggregati_giorno, normali_giorno in zip(giorni_selezionati, aggregati_selezionati,
+                                                        normali_selezionate):
+        for nome, variabile in VARIABILI.items():
+            normale = normali_giorno.get(variabile)
+            if normale is None:
+                continue
+            righe_tabella.append({
+                'Giorno': giorno.strftime("%d/%m/%Y"),
+                'Campo': nome,
+                'Media del Giorno': "{:.2f}".format(aggregati_giorno[variabile]),
+                'Media Normale': "{:.2f}".format(normale['Media']),
+                'Scarto': "{:+.2f}".format(aggregati_giorno[variabile] - normale['Media']),
+                'Intervallo Normale (5°-95°)': "{:.2f} - {:.2f}".format(normale['P05'], normale['P95']),
+                'Giorni di Riferimento': normale['Giorni']
+            })
+    return pd.DataFrame(righe_tabella, columns=['Giorno', 'Campo', 'Media del Giorno', 'Media Normale', 'Scarto',
+                                                'Intervallo Normale (5°-95°)', 'Giorni di Riferimento']) \
+        .set_index(['Giorno', 'Campo'])
+
+
+def aerogrammi(giorni_selezionati, aggregati_selezionati):
+    # Analitica 2: condizioni meteorologiche (in percentuale) di ciascuno dei giorni selezionati
+    giorni_selezionati_str = [giorno.strftime("%d/%m/%Y") for giorno in giorni_selezionati]
+
+    # Disponiamo gli aerogrammi su più righe, al massimo quattro per riga
+    num_colonne = min(len(giorni_selezionati), 4)
+    num_righe = math.ceil(len(giorni_selezionati) / num_colonne)
+
+    # Creiamo la figura con un sottoplot di tipo pie per ogni giorno selezionato
+    fig = make_subplots(rows=num_righe, cols=num_colonne, specs=[[{'type': 'pie'}] * num_colonne] * num_righe,
+                        subplot_titles=giorni_selezionati_str)
+
+    # Aggiungiamo i grafici torta ai sottoplot: il conteggio dei valori nella colonna 'Description' è già
+    # presente negli aggregati giornalieri
+    for indice, aggregati_giorno in enumerate(aggregati_selezionati):
+        fig.add_trace(go.Pie(labels=list(aggregati_giorno['Descrizioni'].keys()),
+                             values=list(aggregati_giorno['Descrizioni'].values())),
+                      row=indice // num_colonne + 1, col=indice % num_colonne + 1)
+
+    # Impostiamo il titolo comune per la legenda
+    fig.update_layout(legend=dict(title="Description"), height=max(450, 350 * num_righe))
+    return fig
+
+
+def durata(secondi):
+    # Secondi -> 'H:MM:SS' ('n/d' se la durata manca)
+    return NON_DISPONIBILE if secondi is None else str(timedelta(seconds=secondi))
+
+
+def tabella_ore_di_luce(day_1, day_3, aggregati_day_1, aggregati_day_3):
+    # Analitica 2: alba, tramonto e ore di luce dei due giorni estremi, con la differenza tra le ore di luce
+    sunrise_first_day = orario_locale(aggregati_day_1["Sunrise"])
+    sunset_first_day = orario_locale(aggregati_day_1["Sunset"])
+
+    sunrise_second_day = orario_locale(aggregati_day_3["Sunrise"])
+    sunset_second_day = orario_locale(aggregati_day_3["Sunset"])
+
+    # Le ore di luce di ciascun giorno sono già presenti negli aggregati (in secondi); mancano se alba o tramonto
+    # non sono stati rilevati
+    luce_first_day, luce_second_day = aggregati_day_1["Durata_Luce"], aggregati_day_3["Durata_Luce"]
+    diff_first_day = durata(luce_first_day)
+    diff_second_day = durata(luce_second_day)
+    diff_days = durata(abs(luce_second_day - luce_first_day)
+                       if luce_first_day is not None and luce_second_day is not None else None)
+
+    # Creiamo una lista di dizionari con il nome del campo e il valore corrispondente
+    table_data = [
+        {'Fasi del Giorno': 'Alba', 'Valori del ' + str(day_1): sunrise_first_day,
+         'Valore del ' + str(day_3): sunrise_second_day},
+        {'Fasi del Giorno': 'Tramonto', 'Valori del ' + str(day_1): sunset_first_day,
+         'Valore del ' + str(day_3): sunset_second_day},
+        {'Fasi del Giorno': 'Ore di Sole', 'Valori del ' + str(day_1): diff_first_day,
+         'Valore del ' + str(day_3): diff_second_day}
+    ]
+
+    df_table = pd.DataFrame(table_data)
+
+    # Aggiungiamo l'header personalizzato
+    header = {'Fasi del Giorno': 'Fasi del Giorno', 'Valori Medio': 'Valori Medio'}
+    return df_table.rename(columns=header).set_index('Fasi del Giorno'), diff_days
+
+
+def grafico_direzioni(osservazioni):
+    # Analitica 3: direzione del vento di ogni rilevazione del giorno rispetto all'orario
+    fig = go.Figure(data=go.Scatterpolar(
+        theta=osservazioni["Wind_Deg"],
+        r=orari(osservazioni["Secondi"]),
+        mode='markers',
+        marker=dict(
+            symbol='circle',
+            size=10,
+            color='blue'
+        ),
+        showlegend=False
+    ))
+
+    fig.update_layout(
+        title='Grafico Scatter Polar',
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                tickfont=dict(color='rgba(0, 0, 0, 0)'),
+            )
+        )
+    )
+    return fig
+
+
+def grafico_rosa(rosa):
+    # Analitica 3: rosa dei venti, cioè frequenza delle direzioni per fascia di velocità
+    fig = go.Figure(data=[
+        go.Barpolar(r=rosa[fascia], theta=rosa.index, name=fascia) for fascia in rosa.columns
+    ])
+
+    fig.update_layout(
+        title='Rosa dei venti (% delle rilevazioni)',
+        polar=dict(angularaxis=dict(direction='clockwise', rotation=90))
+    )
+    return fig
@@ -0,0 +1,143 @@
+import os
+import shutil
+import threading
+
+from meteo.configurazione import CITTA, PERCORSO_ARCHIVIO
+
+# Versione del formato dei dati nell'archivio (3: partizioni per città e per giorno, istanti come timestamp UNIX e
+# giorni di tipo data; 4: sintesi orarie e normali climatologiche; 5: statistiche giornaliere incrementali e
+# aggregati con deviazione standard, minimo e massimo; 6: serie orarie per i grafici di tendenza): un archivio
+# scritto con un formato diverso non è leggibile e va rigenerato dal file di log
+FORMATO_ARCHIVIO = 6
+
+# Le ingestioni di città diverse possono essere eseguite in parallelo: la verifica del formato e l'eventuale
+# eliminazione dei dati di un formato precedente avvengono una sola volta, in mutua esclusione
+BLOCCO_FORMATO = threading.Lock()
+
+# Le scritture della stessa città (ingestione completa o accodamento) riscrivono le sue partizioni e vanno invece
+# eseguite una alla volta: ogni città ha il proprio blocco, creato al primo uso
+BLOCCHI_CITTA = {}
+BLOCCO_CITTA = threading.Lock()
+
+# Ogni città ha le proprie cartelle 'Citta=<nome>', a loro volta partizionate per giorno: le letture di una città
+# accedono direttamente alle sue cartelle, senza elencare né filtrare quelle delle altre città
+CARTELLA_OSSERVAZIONI = 'osservazioni'
+CARTELLA_AGGREGATI = 'aggregati_giornalieri'
+
+# Sintesi orarie di ogni giorno (momenti e istogrammi, vedi meteo.climatologia) e normali climatologiche per giorno
+# dell'anno che ne derivano
+CARTELLA_SINTESI = 'sintesi_orarie'
+CARTELLA_NORMALI = 'normali'
+
+# Stato incrementale di ogni giorno (vedi meteo.statistiche), da cui derivano gli aggregati giornalieri
+CARTELLA_STATISTICHE = 'statistiche_giornaliere'
+
+# Somme e conteggi dei campi numerici per ogni ora (vedi meteo.serie), per le serie ricampionate e le medie mobili
+CARTELLA_SERIE = 'serie_orarie'
+
+
+def cartella_citta(cartella, citta):
+    if not citta or '/' in citta or '=' in citta or citta.startswith('.'):
+        raise ValueError(f"Nome di città non valido: '{citta}'")
+    return os.path.join(cartella, f'Citta={citta}')
+
+
+def blocco_citta(citta):
+    # Blocco delle scritture di una città
+    with BLOCCO_CITTA:
+        return BLOCCHI_CITTA.setdefault(citta, threading.Lock())
+
+
+def percorso_osservazioni(archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    return cartella_citta(os.path.join(archivio, CARTELLA_OSSERVAZIONI), citta)
+
+
+def percorso_aggregati(archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    return cartella_citta(os.path.join(archivio, CARTELLA_AGGREGATI), citta)
+
+
+def percorso_sintesi(archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    return cartella_citta(os.path.join(archivio, CARTELLA_SINTESI), citta)
+
+
+def percorso_statistiche(archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    return cartella_citta(os.path.join(archivio, CARTELLA_STATISTICHE), citta)
+
+
+def percorso_serie(archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    return cartella_citta(os.path.join(archivio, CARTELLA_SERIE), citta)
+
+
+def percorso_normali(archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    return os.path.join(cartella_citta(os.path.join(archivio, CARTELLA_NORMALI), citta), 'normali.parquet')
+
+
+def giorni_scritti(cartella):
+    # Vero se la cartella della città contiene almeno una partizione giornaliera
+    return any(nome.startswith('Date=') for nome in os.listdir(cartella))
+
+
+def citta_disponibili(archivio=PERCORSO_ARCHIVIO):
+    # Città di cui l'archivio contiene aggregati completi di almeno un giorno, in ordine alfabetico: le città il cui
+    # log è vuoto (o contiene solo l'intestazione) risultano importate ma non vengono mostrate
+    cartella = os.path.join(archivio, CARTELLA_AGGREGATI)
+    if not os.path.isdir(cartella):
+        return []
+    return sorted(nome.split('=', 1)[1] for nome in os.listdir(cartella)
+                  if nome.startswith('Citta=') and os.path.exists(os.path.join(cartella, nome, '_SUCCESS')) and
+                  giorni_scritti(os.path.join(cartella, nome)))
+
+
+def formato_archivio(archivio=PERCORSO_ARCHIVIO):
+    # Gli archivi scritti prima dell'introduzione del file '_FORMATO' hanno il formato 1
+    try:
+        with open(os.path.join(archivio, '_FORMATO')) as file:
+            return int(file.read())
+    except FileNotFoundError:
+        return 1
+
+
+def segna_formato(archivio=PERCORSO_ARCHIVIO):
+    with open(os.path.join(archivio, '_FORMATO'), 'w') as file:
+        file.write(str(FORMATO_ARCHIVIO))
+
+
+def prepara_archivio(archivio=PERCORSO_ARCHIVIO):
+    # Prima di un'ingestione batch, i dati scritti in un formato precedente (non più leggibili) vengono eliminati.
+    # Il formato corrente viene segnato subito, così le ingestioni delle altre città non eliminano i dati scritti
+    with BLOCCO_FORMATO:
+        if formato_archivio(archivio) != FORMATO_ARCHIVIO:
+            for cartella in (CARTELLA_OSSERVAZIONI, CARTELLA_AGGREGATI, CARTELLA_SINTESI, CARTELLA_NORMALI,
+                             CARTELLA_STATISTICHE, CARTELLA_SERIE):
+                shutil.rmtree(os.path.join(archivio, cartella), ignore_errors=True)
+            os.makedirs(archivio, exist_ok=True)
+            segna_formato(archivio)
+
+
+def firma_file(percorso):
+    # La coppia (mtime, dimensione) identifica la versione del file di log: se cambia, i dati vanno ricaricati
+    stato = os.stat(percorso)
+    return stato.st_mtime_ns, stato.st_size
+
+
+def firma_archivio(archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    # Al termine di ogni scrittura completata viene creato il file '_SUCCESS': il suo mtime identifica
+    # la versione dei dati della città (None se non sono mai stati scritti)
+    marcatore = os.path.join(percorso_aggregati(archivio, citta), '_SUCCESS')
+    if not os.path.exists(marcatore):
+        return None
+    return os.stat(marcatore).st_mtime_ns
+
+
+def archivio_aggiornato(sorgente, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    # I dati della città sono aggiornati se sono stati scritti, nel formato corrente, dopo l'ultima modifica
+    # del suo file di log
+    versione = firma_archivio(archivio, citta)
+    return versione is not None and formato_archivio(archivio) == FORMATO_ARCHIVIO and \
+        versione >= os.stat(sorgente).st_mtime_ns
+
+
+def dimensione_cartella(cartella):
+    # Dimensione complessiva (in byte) dei file contenuti nella cartella
+    return sum(os.path.getsize(os.path.join(radice, nome))
+               for radice, _, nomi in os.walk(cartella) for nome in nomi)
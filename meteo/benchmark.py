@@ -0,0 +1,259 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from meteo.configurazione import PUNTI_MASSIMI_GRAFICO
+from meteo.motori import MOTORI, scegli_motore
+
+# Benchmark riproducibile della pipeline: genera log sintetici nello stesso formato di Log.csv, misura le fasi di
+# ingestione e le interrogazioni delle tre analitiche con ciascun motore di calcolo e salva i risultati in JSON.
+# Ogni combinazione (dimensione, motore) viene eseguita in un processo separato, così che la memoria e i contatori
+# dei job Spark si riferiscano soltanto a quella misura. All'interno del processo le fasi si susseguono: per ogni
+# fase vengono riportate la memoria residente al suo termine e il picco raggiunto fino a quel momento (dall'inizio
+# del processo, non della sola fase).
+
+DIMENSIONI = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+
+# Condizioni meteo (Weather, Description) usate per le rilevazioni sintetiche
+CONDIZIONI = [('Clear', 'clear sky'), ('Clouds', 'few clouds'), ('Clouds', 'scattered clouds'),
+              ('Clouds', 'broken clouds'), ('Clouds', 'overcast clouds'), ('Rain', 'light rain'),
+              ('Thunderstorm', 'thunderstorm'), ('Mist', 'mist')]
+
+# Prima rilevazione di Log.csv e mezzanotte (ora di Roma) dello stesso giorno
+INIZIO = 1685516096
+MEZZANOTTE = 1685484000
+
+CAMPI_LOG = ['Weather', 'Description', 'Temperature', 'Feels_Like', 'Temp_Min', 'Temp_Max', 'Pressure', 'Humidity',
+             'Visibility', 'Wind_Speed', 'Wind_Gust', 'Wind_Deg', 'Clouds_Level', 'Datetime', 'Sunrise', 'Sunset']
+
+# Le righe del log vengono generate e scritte a blocchi, così la memoria occupata non dipende dalla dimensione
+RIGHE_PER_BLOCCO = 10 ** 6
+
+
+def blocco_sintetico(inizio, fine, passo, generatore):
+    # Rilevazioni distinte di indice [inizio, fine), con andamenti giornalieri plausibili
+    istanti = INIZIO + (np.arange(inizio, fine) * passo).astype('int64')
+    giorni = (istanti - MEZZANOTTE) // 86400
+    ore = (istanti - MEZZANOTTE) % 86400 / 3600
+    stagione = np.sin(2 * np.pi * giorni / 365)
+    n = fine - inizio
+
+    temperatura = 293 + 4 * np.sin(2 * np.pi * (ore - 9) / 24) + 6 * stagione + generatore.normal(0, 0.5, n)
+    raffiche = np.where(generatore.random(n) < 0.97, 0, generatore.uniform(1, 8, n)).round(2)
+    condizioni = generatore.integers(0, len(CONDIZIONI), n)
+
+    return pd.DataFrame({
+        'Weather': np.array([' ' + meteo for meteo, _ in CONDIZIONI])[condizioni],
+        'Description': np.array([' ' + descrizione for _, descrizione in CONDIZIONI])[condizioni],
+        'Temperature': temperatura.round(2),
+        'Feels_Like': (temperatura + generatore.normal(0, 0.3, n)).round(2),
+        'Temp_Min': (temperatura - generatore.uniform(0, 3, n)).round(2),
+        'Temp_Max': (temperatura + generatore.uniform(0, 3, n)).round(2),
+        'Pressure': (1013 + generatore.normal(0, 3, n)).round().astype('int64'),
+        'Humidity': generatore.integers(40, 91, n),
+        'Visibility': np.where(generatore.random(n) < 0.9, 10000, generatore.integers(2000, 10000, n)),
+        'Wind_Speed': generatore.gamma(2, 1.2, n).round(2),
+        # Come nel log originale, le raffiche nulle sono scritte come '0' e le altre con due decimali
+        'Wind_Gust': np.where(raffiche == 0, '0', np.char.mod(' %.2f', raffiche)),
+        'Wind_Deg': generatore.integers(0, 36, n) * 10,
+        'Clouds_Level': generatore.integers(0, 101, n),
+        'Datetime': istanti,
+        'Sunrise': MEZZANOTTE + giorni * 86400 + (20074 - 4000 * stagione).astype('int64'),
+        'Sunset': MEZZANOTTE + giorni * 86400 + (73622 + 4000 * stagione).astype('int64')
+    })
+
+
+def genera_log(percorso, righe, giorni=30, frazione_duplicati=0.5, seme=0):
+    # Scrive un log di 'righe' righe distribuite su 'giorni' giorni: come in Log.csv, una parte delle rilevazioni
+    # compare più volte in righe consecutive
+    righe_uniche = max(int(righe * (1 - frazione_duplicati)), 1)
+    passo = giorni * 86400 / righe_uniche
+
+    with open(percorso, 'w', encoding='utf-8', newline='') as file:
+        file.write('\ufeff' + ';'.join(CAMPI_LOG) + '\n')
+        for numero_blocco, inizio in enumerate(range(0, righe_uniche, RIGHE_PER_BLOCCO)):
+            fine = min(inizio + RIGHE_PER_BLOCCO, righe_uniche)
+
+            # Ogni blocco ha il proprio generatore, derivato dal seme: il contenuto del log non dipende dalla
+            # dimensione dei blocchi
+            blocco = blocco_sintetico(inizio, fine, passo, np.random.default_rng([seme, numero_blocco]))
+
+            # Ripetizioni di ciascuna rilevazione, in modo da ottenere esattamente 'righe' righe
+            limiti = -(-np.arange(inizio, fine + 1) * righe // righe_uniche)
+            blocco = blocco.loc[blocco.index.repeat(np.diff(limiti))]
+            blocco.to_csv(file, sep=';', header=False, index=False, float_format=' %.2f', lineterminator='\n')
+
+
+def memoria_rss_mb(spark=None):
+    # Memoria residente attuale e picco finora del processo Python e, con Spark, della JVM del driver
+    with open('/proc/self/statm') as statm:
+        pagine_residenti = int(statm.read().split()[1])
+    memoria = {'rss_mb': round(pagine_residenti * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2, 1),
+               'rss_picco_finora_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    if spark is not None:
+        pid = spark.sparkContext._jvm.java.lang.ProcessHandle.current().pid()
+        with open(f'/proc/{pid}/status') as stato:
+            for riga in stato:
+                if riga.startswith('VmRSS:'):
+                    memoria['rss_jvm_mb'] = round(int(riga.split()[1]) / 1024, 1)
+                elif riga.startswith('VmHWM:'):
+                    memoria['rss_picco_finora_jvm_mb'] = round(int(riga.split()[1]) / 1024, 1)
+    return memoria
+
+
+def esegui_fase(nome, funzione, spark=None):
+    # Con Spark, i job lanciati durante la fase vengono raccolti in un gruppo che porta il nome della fase
+    if spark is not None:
+        spark.sparkContext.setJobGroup(nome, nome)
+
+    inizio = time.perf_counter()
+    funzione()
+    misura = {'fase': nome, 'secondi': round(time.perf_counter() - inizio, 4)}
+    misura.update(memoria_rss_mb(spark))
+
+    if spark is not None:
+        tracker = spark.sparkContext.statusTracker()
+        job = tracker.getJobIdsForGroup(nome)
+        misura['job_spark'] = len(job)
+        misura['stage_spark'] = sum(len(informazioni.stageIds) for informazioni in map(tracker.getJobInfo, job)
+                                    if informazioni is not None)
+    return misura
+
+
+def fasi_ingestione_spark(spark, sorgente):
+    from meteo.preprocessing import SCHEMA_LOG, deduplica, prepara_dati
+
+    # La valutazione di Spark è pigra: ogni fase viene materializzata con il sink 'noop' e comprende le
+    # precedenti, per cui i tempi delle fasi di preprocessing sono cumulativi
+    def materializza(df):
+        df.write.format('noop').mode('overwrite').save()
+
+    def leggi(**opzioni):
+        return spark.read.csv(sorgente, header=True, sep=';', ignoreLeadingWhiteSpace=True,
+                              ignoreTrailingWhiteSpace=True, **opzioni)
+
+    return [
+        ('lettura_schema_inferito', lambda: materializza(leggi(inferSchema=True))),
+        ('lettura', lambda: materializza(leggi(schema=SCHEMA_LOG))),
+        ('deduplica_ordina', lambda: materializza(deduplica(leggi(schema=SCHEMA_LOG)).orderBy('Datetime'))),
+        ('conversioni', lambda: materializza(prepara_dati(spark, sorgente)))
+    ]
+
+
+def fasi_ingestione_pandas(sorgente):
+    import pyarrow.csv as csv
+    from meteo.motore_pandas import deduplica, leggi_log, prepara_dati
+
+    # Stesse fasi (cumulative) del motore Spark
+    return [
+        ('lettura_schema_inferito',
+         lambda: csv.read_csv(sorgente, parse_options=csv.ParseOptions(delimiter=';')).to_pandas()),
+        ('lettura', lambda: leggi_log(sorgente)),
+        ('deduplica_ordina',
+         lambda: deduplica(leggi_log(sorgente)).sort_values('Datetime', kind='stable', ignore_index=True)),
+        ('conversioni', lambda: prepara_dati(sorgente))
+    ]
+
+
+def fasi_analitiche(motore, archivio):
+    from meteo.campionamento import riduci
+    from meteo.vento import media_circolare, rosa_dei_venti
+
+    # Le stesse letture eseguite dalle pagine della dashboard, attraverso l'interfaccia comune dei motori
+    def analitica_1():
+        aggregati = motore.aggregati_giornalieri(archivio)
+        osservazioni = motore.osservazioni_dei_giorni([min(aggregati)], archivio)
+        riduci(osservazioni, ['Temperature', 'Temp_Max', 'Temp_Min'], PUNTI_MASSIMI_GRAFICO)
+
+    def analitica_2():
+        aggregati = motore.aggregati_giornalieri(archivio)
+        [aggregati[giorno] for giorno in sorted(aggregati)]
+
+    def analitica_3():
+        osservazioni = motore.osservazioni_dei_giorni(sorted(motore.aggregati_giornalieri(archivio)), archivio)
+        media_circolare(osservazioni['Wind_Deg'])
+        rosa_dei_venti(osservazioni)
+
+    return [
+        ('analitica_1', analitica_1),
+        ('analitica_2', analitica_2),
+        ('analitica_3', analitica_3)
+    ]
+
+
+def misura(nome_motore, sorgente, archivio):
+    # Esegue tutte le fasi con un solo motore, nel processo corrente
+    motore = scegli_motore(nome_motore)
+    spark = None
+    if nome_motore == 'spark':
+        from meteo.preprocessing import crea_sessione_spark
+        spark = crea_sessione_spark({'spark.ui.showConsoleProgress': 'false'})
+        fasi = fasi_ingestione_spark(spark, sorgente)
+    else:
+        fasi = fasi_ingestione_pandas(sorgente)
+
+    fasi += [('importazione', lambda: motore.importa_log(sorgente, archivio))] + fasi_analitiche(motore, archivio)
+    return [esegui_fase(nome, funzione, spark) for nome, funzione in fasi]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark dell'ingestione e delle analitiche su log sintetici nel formato di Log.csv")
+    parser.add_argument('--righe', type=int, nargs='+', default=DIMENSIONI,
+                        help="numero di righe dei log generati (default: %(default)s)")
+    parser.add_argument('--motori', nargs='+', choices=MOTORI, default=MOTORI,
+                        help="motori di calcolo da misurare (default: %(default)s)")
+    parser.add_argument('--giorni', type=int, default=30,
+                        help="giorni coperti dalle rilevazioni di ogni log (default: %(default)s)")
+    parser.add_argument('--seme', type=int, default=0, help="seme dei dati sintetici (default: %(default)s)")
+    parser.add_argument('--cartella', default='benchmark',
+                        help="cartella dei log generati e degli archivi di prova (default: %(default)s)")
+    parser.add_argument('--risultati', default=None,
+                        help="file JSON dei risultati (default: <cartella>/risultati.json)")
+    parser.add_argument('--misura', nargs=3, metavar=('MOTORE', 'SORGENTE', 'ARCHIVIO'), help=argparse.SUPPRESS)
+    argomenti = parser.parse_args()
+
+    # Processo figlio: esegue le misure di un solo motore e le stampa in JSON
+    if argomenti.misura:
+        print(json.dumps(misura(*argomenti.misura)))
+        return
+
+    os.makedirs(argomenti.cartella, exist_ok=True)
+    risultati = []
+    for righe in argomenti.righe:
+        # I log vengono rigenerati solo se mancano: a parità di parametri il contenuto è identico
+        sorgente = os.path.join(argomenti.cartella, f'log_{righe}_{argomenti.giorni}g_{argomenti.seme}.csv')
+        if not os.path.exists(sorgente):
+            genera_log(sorgente, righe, argomenti.giorni, seme=argomenti.seme)
+
+        for nome_motore in argomenti.motori:
+            archivio = os.path.join(argomenti.cartella, f'archivio_{nome_motore}_{righe}')
+            esecuzione = subprocess.run([sys.executable, '-m', 'meteo.benchmark', '--misura', nome_motore, sorgente,
+                                         archivio], stdout=subprocess.PIPE, check=True, text=True)
+            for misura_fase in json.loads(esecuzione.stdout.strip().splitlines()[-1]):
+                risultati.append(dict(motore=nome_motore, righe=righe, **misura_fase))
+                print(f"{nome_motore:>6} {righe:>10} {misura_fase['fase']:<24} {misura_fase['secondi']:>9.3f} s "
+                      f"{misura_fase['rss_mb']:>9.1f} MB (picco finora {misura_fase['rss_picco_finora_mb']:.1f} MB)",
+                      flush=True)
+
+    with open(argomenti.risultati or os.path.join(argomenti.cartella, 'risultati.json'), 'w') as file:
+        json.dump({
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'ambiente': {'python': platform.python_version(), 'piattaforma': platform.platform(),
+                         'processori': os.cpu_count()},
+            'parametri': {'giorni': argomenti.giorni, 'seme': argomenti.seme},
+            'risultati': risultati
+        }, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
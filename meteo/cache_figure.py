@@ -0,0 +1,94 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.io as pio
+
+from meteo.configurazione import DIMENSIONE_CACHE_FIGURE
+from meteo.diagnostica import CONTATORI, conta, punti_figura
+
+# Cache dei grafici e delle tabelle già costruiti dalla dashboard, condivisa da tutte le sessioni del processo.
+# La chiave comprende la pagina e i parametri selezionati (città, giorni, variabile, fascia oraria, ...) insieme alla
+# versione dei dati, per cui una nuova scrittura nell'archivio rende inutilizzabili le voci precedenti, che vengono
+# poi scartate. Le figure sono conservate già serializzate in JSON: le viste più richieste vengono mostrate senza
+# rileggere le rilevazioni e senza ricostruire gli oggetti Plotly. La memoria occupata è limitata da
+# DIMENSIONE_CACHE_FIGURE: oltre il limite vengono scartate le voci usate meno di recente.
+# I valori restituiti sono condivisi tra le sessioni e non vanno modificati
+VOCI = OrderedDict()
+BLOCCO = threading.Lock()
+OCCUPAZIONE = {'byte': 0}
+
+
+def dimensione(valore):
+    # Memoria approssimativa (in byte) di un valore in cache: stringhe, DataFrame e loro combinazioni
+    if isinstance(valore, str):
+        return len(valore.encode())
+    if isinstance(valore, pd.DataFrame):
+        return int(valore.memory_usage(deep=True).sum())
+    if isinstance(valore, pd.Series):
+        return int(valore.memory_usage(deep=True))
+    if isinstance(valore, dict):
+        return sum(dimensione(chiave) + dimensione(elemento) for chiave, elemento in valore.items())
+    if isinstance(valore, (list, tuple)):
+        return sum(dimensione(elemento) for elemento in valore)
+    return sys.getsizeof(valore)
+
+
+def recupera(chiave):
+    # Il valore in cache (che diventa il più recente) oppure None
+    with BLOCCO:
+        voce = VOCI.get(chiave)
+        if voce is not None:
+            VOCI.move_to_end(chiave)
+    conta('cache_figure_successi' if voce is not None else 'cache_figure_fallimenti')
+    return None if voce is None else voce[0]
+
+
+def memorizza(chiave, valore, limite=DIMENSIONE_CACHE_FIGURE):
+    # Conserva il valore scartando le voci usate meno di recente finché l'occupazione non rientra nel limite.
+    # I valori più grandi del limite non vengono conservati
+    byte = dimensione(valore)
+    if byte > limite:
+        return
+    scartate = 0
+    with BLOCCO:
+        if chiave in VOCI:
+            OCCUPAZIONE['byte'] -= VOCI.pop(chiave)[1]
+        VOCI[chiave] = (valore, byte)
+        OCCUPAZIONE['byte'] += byte
+        while OCCUPAZIONE['byte'] > limite:
+            _, (_, byte_scartati) = VOCI.popitem(last=False)
+            OCCUPAZIONE['byte'] -= byte_scartati
+            scartate += 1
+    if scartate:
+        conta('cache_figure_scartate', scartate)
+
+
+def figura(chiave, costruisci):
+    # Figura serializzata in JSON ('spec') con il numero di punti disegnati ('punti'): 'costruisci' restituisce
+    # la figura Plotly e viene chiamata solo se la vista non è in cache
+    grafico = recupera(chiave)
+    if grafico is None:
+        fig = costruisci()
+        grafico = {'spec': pio.to_json(fig, validate=False), 'punti': punti_figura(fig)}
+        memorizza(chiave, grafico)
+    return grafico
+
+
+def tabella(chiave, costruisci):
+    # Tabella (o tupla di tabelle e valori) restituita da 'costruisci', chiamata solo se la vista non è in cache
+    risultato = recupera(chiave)
+    if risultato is None:
+        risultato = costruisci()
+        memorizza(chiave, risultato)
+    return risultato
+
+
+def statistiche():
+    # Occupazione della cache e contatori dei successi, dei fallimenti e delle voci scartate
+    with BLOCCO:
+        risultato = {'voci': len(VOCI), 'byte': OCCUPAZIONE['byte'], 'limite': DIMENSIONE_CACHE_FIGURE}
+    for contatore in ('successi', 'fallimenti', 'scartate'):
+        risultato[contatore] = CONTATORI.get(f'cache_figure_{contatore}', 0)
+    return risultato
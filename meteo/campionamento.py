@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+# Riduzione lato server delle serie temporali da disegnare: il browser riceve al più un numero prefissato di punti
+# per traccia, indipendentemente dalla frequenza delle rilevazioni o dall'ampiezza dell'intervallo mostrato
+
+
+def lttb(valori, punti):
+    # Largest-Triangle-Three-Buckets: mantiene il primo e l'ultimo punto e, per ognuno dei bucket intermedi, il
+    # punto che forma il triangolo di area massima con il punto scelto in precedenza e la media del bucket
+    # successivo. In questo modo picchi e minimi della serie vengono conservati. Le ascisse sono le posizioni dei
+    # punti, come sull'asse per categorie dei grafici della dashboard. Restituisce gli indici dei punti scelti
+    n = len(valori)
+    if punti >= n or punti < 3:
+        return np.arange(n)
+
+    # I valori mancanti vengono interpolati solo ai fini della scelta dei punti
+    y = pd.Series(np.asarray(valori, dtype='float64')).interpolate(limit_direction='both').fillna(0).to_numpy()
+    x = np.arange(n, dtype='float64')
+
+    # punti - 2 bucket di ampiezza (quasi) uguale tra il secondo e il penultimo punto
+    limiti = np.linspace(1, n - 1, punti - 1).astype('int64')
+    indici = np.empty(punti, dtype='int64')
+    indici[0], indici[-1] = 0, n - 1
+
+    precedente = 0
+    for bucket in range(punti - 2):
+        inizio, fine = limiti[bucket], limiti[bucket + 1]
+        fine_successivo = limiti[bucket + 2] if bucket + 2 < len(limiti) else n
+        media_x = x[fine:fine_successivo].mean()
+        media_y = y[fine:fine_successivo].mean()
+
+        # Aree (a meno del fattore 1/2) dei triangoli calcolate in blocco per tutti i punti del bucket
+        aree = np.abs((x[precedente] - media_x) * (y[inizio:fine] - y[precedente]) -
+                      (x[precedente] - x[inizio:fine]) * (media_y - y[precedente]))
+        precedente = inizio + int(np.argmax(aree))
+        indici[bucket + 1] = precedente
+
+    return indici
+
+
+def riduci(df, colonne, punti_massimi):
+    # Riduce le righe del DataFrame in modo che ogni traccia abbia al più 'punti_massimi' punti. Le righe mantenute
+    # sono l'unione dei punti scelti da LTTB per ciascuna colonna, così che tutte le tracce condividano le stesse
+    # ascisse (e l'ordine delle categorie sull'asse x resti quello temporale)
+    if len(df) <= punti_massimi:
+        return df
+    quota = max(punti_massimi // len(colonne), 3)
+    indici = np.unique(np.concatenate([lttb(df[colonna], quota) for colonna in colonne]))
+    return df.iloc[indici].reset_index(drop=True)
+
+
+def indici_etichette(numero_punti, numero_etichette):
+    # Posizioni (equidistanti, più l'ultima) dei punti di cui mostrare l'etichetta sull'asse x
+    if numero_punti == 0:
+        return np.arange(0)
+    passo = max(numero_punti // numero_etichette, 1)
+    return np.unique(np.append(np.arange(0, numero_punti, passo), numero_punti - 1))
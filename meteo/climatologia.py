@@ -0,0 +1,242 @@
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from meteo.archivio import percorso_normali, percorso_sintesi
+from meteo.configurazione import CITTA, FINESTRA_CLIMATOLOGIA, PERCORSO_ARCHIVIO
+
+# Normali climatologiche: per ogni giorno dell'anno (e per ogni ora del giorno) la distribuzione storica delle
+# rilevazioni dei campi principali, con cui le pagine confrontano i valori di un giorno con quelli "normali".
+# Ogni giorno archiviato ha una sintesi per campo e per ora (più una per l'intera giornata) composta da momenti
+# (conteggio, media, somma dei quadrati degli scarti, minimo e massimo) e da un istogramma a classi fisse: entrambi
+# si fondono esattamente e nello stesso modo con qualunque motore, per cui la normale di un giorno dell'anno si
+# ottiene fondendo le sintesi dei giorni che cadono nella sua finestra (FINESTRA_CLIMATOLOGIA giorni prima e dopo)
+# in tutti gli anni presenti. Quando arrivano nuovi giorni vengono ricalcolate soltanto le normali dei giorni
+# dell'anno a essi vicini, rileggendo le sole sintesi che vi contribuiscono. Le normali sono una tabella di poche
+# decine di migliaia di righe, letta una volta e consultata per chiave
+
+# Inizio, ampiezza e numero delle classi dell'istogramma di ogni campo: i valori fuori dall'intervallo finiscono
+# nella prima o nell'ultima classe (i quantili restano comunque compresi tra il minimo e il massimo)
+CAMPI_CLIMATOLOGIA = {
+    'Temperature': (-50.0, 0.1, 1100),
+    'Pressure': (850.0, 0.5, 600),
+    'Humidity': (0.0, 1.0, 101),
+    'Wind_Speed': (0.0, 0.1, 750)
+}
+
+# Quantili delle normali, con il nome della colonna corrispondente
+QUANTILI = {'P05': 0.05, 'P25': 0.25, 'P50': 0.5, 'P75': 0.75, 'P95': 0.95}
+
+# Valore della colonna 'Ora' delle sintesi e delle normali dell'intera giornata
+INTERA_GIORNATA = -1
+
+# I giorni dell'anno sono numerati come in un anno bisestile (1-366), così il 29 febbraio ha una propria normale e
+# gli altri giorni hanno lo stesso numero in tutti gli anni
+ANNO_RIFERIMENTO = 2000
+GIORNI_ANNO = 366
+
+# Schema delle sintesi orarie di ogni giorno, partizionate per giorno come le rilevazioni
+SCHEMA_SINTESI = pa.schema([
+    ('Campo', pa.string()),
+    ('Ora', pa.int32()),
+    ('Conteggio', pa.int64()),
+    ('Media', pa.float64()),
+    ('M2', pa.float64()),
+    ('Minimo', pa.float64()),
+    ('Massimo', pa.float64()),
+    ('Classi', pa.list_(pa.int32())),
+    ('Frequenze', pa.list_(pa.int64())),
+    ('Date', pa.date32())
+])
+
+PARTIZIONAMENTO = ds.partitioning(pa.schema([('Date', pa.date32())]), flavor='hive')
+
+
+def giorno_anno(giorno):
+    return date(ANNO_RIFERIMENTO, giorno.month, giorno.day).timetuple().tm_yday
+
+
+def giorni_vicini(giorni_anno, distanza):
+    # Giorni dell'anno che distano al più 'distanza' da uno di quelli indicati (l'anno è circolare)
+    return {(giorno - 1 + spostamento) % GIORNI_ANNO + 1 for giorno in giorni_anno
+            for spostamento in range(-distanza, distanza + 1)}
+
+
+def classi(valori, campo):
+    # Classe dell'istogramma di ogni valore (stesso calcolo di meteo.aggregati.calcola_sintesi_orarie)
+    inizio, passo, numero = CAMPI_CLIMATOLOGIA[campo]
+    return np.clip(np.floor((valori - inizio) / passo), 0, numero - 1).astype('int32')
+
+
+def calcola_sintesi_orarie(osservazioni):
+    # Sintesi di ogni giorno, campo e ora delle rilevazioni, calcolate con numpy: ogni valore viene assegnato al
+    # gruppo (giorno, campo, ora) e i momenti e gli istogrammi di tutti i gruppi si ottengono con pochi passaggi
+    # sugli array, qualunque sia il numero dei gruppi
+    codici_giorni, giorni = pd.factorize(osservazioni['Date'], sort=True)
+    ore = osservazioni['Secondi'].to_numpy() // 3600
+    numero_ore = 25
+    gruppi, valori, classi_valori = [], [], []
+    for indice, campo in enumerate(CAMPI_CLIMATOLOGIA):
+        valori_campo = osservazioni[campo].to_numpy(dtype='float64')
+        presenti = ~np.isnan(valori_campo)
+        for ora in (ore[presenti] + 1, np.zeros(presenti.sum(), dtype=ore.dtype)):
+            gruppi.append((codici_giorni[presenti] * len(CAMPI_CLIMATOLOGIA) + indice) * numero_ore + ora)
+            valori.append(valori_campo[presenti])
+            classi_valori.append(classi(valori_campo[presenti], campo))
+    gruppi, valori, classi_valori = np.concatenate(gruppi), np.concatenate(valori), np.concatenate(classi_valori)
+    if not len(gruppi):
+        return pd.DataFrame(columns=SCHEMA_SINTESI.names)
+
+    # Valori ordinati per gruppo e classe: i gruppi e le classi non vuote diventano intervalli contigui
+    ordine = np.lexsort((classi_valori, gruppi))
+    gruppi, valori, classi_valori = gruppi[ordine], valori[ordine], classi_valori[ordine]
+    chiavi, inizi, conteggi = np.unique(gruppi, return_index=True, return_counts=True)
+    medie = np.add.reduceat(valori, inizi) / conteggi
+    m2 = np.add.reduceat((valori - np.repeat(medie, conteggi)) ** 2, inizi)
+
+    coppie, inizi_coppie, frequenze = np.unique(gruppi.astype('int64') * 2048 + classi_valori, return_index=True,
+                                                return_counts=True)
+    confini = np.searchsorted(gruppi[inizi_coppie], chiavi[1:])
+
+    giorno, resto = np.divmod(chiavi, len(CAMPI_CLIMATOLOGIA) * numero_ore)
+    return pd.DataFrame({
+        'Campo': np.array(list(CAMPI_CLIMATOLOGIA), dtype=object)[resto // numero_ore],
+        'Ora': (resto % numero_ore - 1).astype('int32'),
+        'Conteggio': conteggi.astype('int64'),
+        'Media': medie,
+        'M2': m2,
+        'Minimo': np.minimum.reduceat(valori, inizi),
+        'Massimo': np.maximum.reduceat(valori, inizi),
+        'Classi': np.split(classi_valori[inizi_coppie], confini),
+        'Frequenze': np.split(frequenze.astype('int64'), confini),
+        'Date': np.asarray(giorni, dtype=object)[giorno]
+    })
+
+
+def leggi_sintesi(archivio=PERCORSO_ARCHIVIO, giorni_anno=None, citta=CITTA):
+    # Sintesi dei giorni che cadono nei giorni dell'anno indicati (di tutti gli anni), oppure di tutti i giorni
+    percorso = percorso_sintesi(archivio, citta)
+    if not os.path.isdir(percorso):
+        return None
+    file = []
+    for cartella in sorted(os.scandir(percorso), key=lambda voce: voce.name):
+        if not cartella.name.startswith('Date=') or not cartella.is_dir():
+            continue
+        if giorni_anno is not None and giorno_anno(date.fromisoformat(cartella.name[5:])) not in giorni_anno:
+            continue
+        file += sorted(voce.path for voce in os.scandir(cartella.path)
+                       if voce.name.endswith('.parquet') and not voce.name.startswith(('.', '_')))
+    if not file:
+        return None
+    return ds.dataset(file, schema=SCHEMA_SINTESI, format='parquet', partitioning=PARTIZIONAMENTO,
+                      partition_base_dir=percorso).to_table().to_pandas()
+
+
+def fondi_momenti(sintesi, chiavi):
+    # Fusione dei momenti delle sintesi con le stesse chiavi (Chan et al.): la media è la media pesata delle medie e
+    # la somma dei quadrati degli scarti è la somma di quelle parziali più gli scarti delle medie parziali dalla
+    # media complessiva
+    sintesi = sintesi.assign(Somma=sintesi['Media'] * sintesi['Conteggio'])
+    gruppi = sintesi.groupby(chiavi)
+    fusi = gruppi.agg(Conteggio=('Conteggio', 'sum'), Somma=('Somma', 'sum'), M2=('M2', 'sum'),
+                      Minimo=('Minimo', 'min'), Massimo=('Massimo', 'max'))
+    fusi['Media'] = fusi['Somma'] / fusi['Conteggio']
+    scarti = sintesi['Conteggio'] * (sintesi['Media'] - gruppi['Somma'].transform('sum') /
+                                     gruppi['Conteggio'].transform('sum')) ** 2
+    fusi['M2'] += scarti.groupby([sintesi[chiave] for chiave in chiavi]).sum()
+    return fusi.drop(columns='Somma')
+
+
+def fondi_istogrammi(sintesi, chiavi):
+    # Fusione degli istogrammi: somma delle frequenze di ogni classe, una riga per chiavi e classe
+    istogrammi = sintesi[chiavi + ['Classi', 'Frequenze']].explode(['Classi', 'Frequenze']) \
+        .astype({'Classi': 'int32', 'Frequenze': 'int64'})
+    return istogrammi.groupby(chiavi + ['Classi'])['Frequenze'].sum().reset_index()
+
+
+def fondi_sintesi(sintesi):
+    # Fonde le sintesi con lo stesso giorno, campo e ora (ad esempio quella archiviata e quella delle nuove
+    # rilevazioni dello stesso giorno)
+    chiavi = ['Date', 'Campo', 'Ora']
+    istogrammi = fondi_istogrammi(sintesi, chiavi).groupby(chiavi).agg(Classi=('Classi', list),
+                                                                      Frequenze=('Frequenze', list))
+    return fondi_momenti(sintesi, chiavi).join(istogrammi).reset_index()[SCHEMA_SINTESI.names]
+
+
+def calcola_normali(sintesi, giorni_anno=None, finestra=FINESTRA_CLIMATOLOGIA):
+    # Ogni sintesi contribuisce alle normali dei giorni dell'anno entro la finestra dal proprio
+    spostamenti = np.arange(-finestra, finestra + 1)
+    propri = np.array([giorno_anno(giorno) for giorno in sintesi['Date']])
+    indici = np.repeat(np.arange(len(sintesi)), len(spostamenti))
+    bersagli = (propri[indici] - 1 + np.tile(spostamenti, len(sintesi))) % GIORNI_ANNO + 1
+    if giorni_anno is not None:
+        scelti = np.isin(bersagli, sorted(giorni_anno))
+        indici, bersagli = indici[scelti], bersagli[scelti]
+    contributi = sintesi.iloc[indici].reset_index(drop=True)
+    contributi['Giorno_Anno'] = bersagli.astype('int16')
+    chiavi = ['Giorno_Anno', 'Campo', 'Ora']
+
+    normali = fondi_momenti(contributi, chiavi)
+    normali['Giorni'] = contributi.groupby(chiavi)['Date'].nunique()
+    normali['Deviazione'] = np.sqrt(normali['M2'] / normali['Conteggio'])
+    istogrammi = fondi_istogrammi(contributi, chiavi)
+
+    # Quantili: interpolazione lineare all'interno della classe in cui la frequenza cumulata raggiunge il quantile
+    cumulate = istogrammi.groupby(chiavi)['Frequenze'].cumsum()
+    precedenti = cumulate - istogrammi['Frequenze']
+    totali = istogrammi.groupby(chiavi)['Frequenze'].transform('sum')
+    inizi = istogrammi['Campo'].map({campo: valori[0] for campo, valori in CAMPI_CLIMATOLOGIA.items()})
+    passi = istogrammi['Campo'].map({campo: valori[1] for campo, valori in CAMPI_CLIMATOLOGIA.items()})
+    for nome, quantile in QUANTILI.items():
+        soglie = totali * quantile
+        raggiunti = (precedenti < soglie) & (cumulate >= soglie)
+        valori = inizi + passi * (istogrammi['Classi'] + (soglie - precedenti) / istogrammi['Frequenze'])
+        normali[nome] = valori[raggiunti].set_axis(pd.MultiIndex.from_frame(istogrammi.loc[raggiunti, chiavi]))
+        normali[nome] = normali[nome].clip(normali['Minimo'], normali['Massimo'])
+
+    return normali.reset_index()[chiavi + ['Giorni', 'Conteggio', 'Media', 'Deviazione', 'Minimo', 'Massimo'] +
+                                 list(QUANTILI)]
+
+
+def aggiorna_normali(giorni=None, archivio=PERCORSO_ARCHIVIO, citta=CITTA, finestra=FINESTRA_CLIMATOLOGIA):
+    # Ricalcola le normali dei giorni dell'anno influenzati dai giorni indicati (tutte, se 'giorni' è None) a
+    # partire dalle sintesi già scritte nell'archivio, e sostituisce soltanto quelle righe della tabella
+    percorso = percorso_normali(archivio, citta)
+    bersagli = None if giorni is None else giorni_vicini({giorno_anno(giorno) for giorno in giorni}, finestra)
+    if bersagli is not None and not bersagli:
+        return
+    sintesi = leggi_sintesi(archivio, None if bersagli is None else giorni_vicini(bersagli, finestra), citta)
+    normali = calcola_normali(sintesi, bersagli, finestra) if sintesi is not None else None
+
+    if bersagli is not None and os.path.exists(percorso):
+        precedenti = pd.read_parquet(percorso)
+        precedenti = precedenti[~precedenti['Giorno_Anno'].isin(bersagli)]
+        normali = precedenti if normali is None else pd.concat([precedenti, normali], ignore_index=True)
+    if normali is None:
+        return
+
+    # La tabella viene sostituita in un'unica operazione: chi la legge trova sempre la versione precedente o quella
+    # nuova, mai una scrittura parziale
+    normali = normali.sort_values(['Giorno_Anno', 'Campo', 'Ora'], ignore_index=True)
+    os.makedirs(os.path.dirname(percorso), exist_ok=True)
+    temporaneo = f'{percorso}.{os.getpid()}.tmp'
+    pq.write_table(pa.Table.from_pandas(normali, preserve_index=False), temporaneo)
+    os.replace(temporaneo, percorso)
+
+
+def leggi_normali(archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    # Normali indicizzate per (giorno dell'anno, campo, ora); un dizionario vuoto se non sono ancora state calcolate
+    percorso = percorso_normali(archivio, citta)
+    if not os.path.exists(percorso):
+        return {}
+    return {(riga['Giorno_Anno'], riga['Campo'], riga['Ora']): riga for riga in pq.read_table(percorso).to_pylist()}
+
+
+def normale(normali, giorno, campo, ora=INTERA_GIORNATA):
+    # Normale di un campo nel giorno dell'anno di 'giorno' (None se il campo non ha normali o mancano i dati)
+    return normali.get((giorno_anno(giorno), campo, ora))
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+from meteo.configurazione import CIFRE_DECIMALI
+
+# Rappresentazione compatta delle rilevazioni conservate nella cache della dashboard. Rispetto alle colonne
+# restituite dai motori di calcolo:
+#   - i campi testuali e il giorno diventano categorie (codici di un byte più il dizionario dei valori distinti);
+#   - i campi interi e gli istanti usano il tipo più stretto compatibile con i valori (ad esempio un byte per
+#     umidità e nuvolosità, 32 bit per i timestamp UNIX fino al 2038);
+#   - i campi decimali diventano float32 se i valori, riportati a float64 e arrotondati alle cifre configurate,
+#     restano identici;
+#   - alba e tramonto, se uguali per tutte le rilevazioni di un giorno, vengono conservati una sola volta per giorno.
+# 'espandi' ricostruisce esattamente il DataFrame originale
+
+CAMPI_CATEGORICI = ['Weather', 'Description', 'Date']
+CAMPI_GIORNALIERI = ['Sunrise', 'Sunset']
+
+# Tipi interi compatti, usati solo se tutti i valori vi rientrano (e non ci sono valori mancanti)
+TIPI_INTERI = {
+    'Pressure': 'int16',
+    'Humidity': 'int8',
+    'Visibility': 'int16',
+    'Wind_Deg': 'int16',
+    'Clouds_Level': 'int8',
+    'Datetime': 'int32',
+    'Secondi': 'int32'
+}
+
+
+def intero_compatto(colonna, tipo):
+    limiti = np.iinfo(tipo)
+    if colonna.isna().any() or colonna.min() < limiti.min or colonna.max() > limiti.max:
+        return colonna
+    return colonna.astype(tipo)
+
+
+def decimale_compatto(colonna, cifre):
+    compatta = colonna.astype('float32')
+    if compatta.astype('float64').round(cifre).equals(colonna):
+        return compatta
+    return colonna
+
+
+def compatta(osservazioni):
+    # Restituisce le rilevazioni compatte, la tabella giornaliera di alba e tramonto e i tipi originali
+    tipi = osservazioni.dtypes.to_dict()
+    per_giorno = osservazioni.groupby('Date', sort=False)[CAMPI_GIORNALIERI]
+    giornaliere = per_giorno.first()
+    righe = osservazioni
+    if (per_giorno.nunique(dropna=False) <= 1).all(axis=None):
+        righe = osservazioni.drop(columns=CAMPI_GIORNALIERI)
+
+    colonne = {}
+    for campo in righe.columns:
+        if campo in CAMPI_CATEGORICI:
+            colonne[campo] = righe[campo].astype('category')
+        elif campo in TIPI_INTERI:
+            colonne[campo] = intero_compatto(righe[campo], TIPI_INTERI[campo])
+        elif campo in CIFRE_DECIMALI and pd.api.types.is_float_dtype(righe[campo]):
+            colonne[campo] = decimale_compatto(righe[campo], CIFRE_DECIMALI[campo])
+        else:
+            colonne[campo] = righe[campo]
+    return {'righe': pd.DataFrame(colonne), 'giornaliere': giornaliere, 'tipi': tipi}
+
+
+def espandi(compatte):
+    # DataFrame con le stesse colonne, gli stessi tipi e gli stessi valori di quello passato a 'compatta'
+    righe, tipi = compatte['righe'], compatte['tipi']
+    colonne = {}
+    for campo, tipo in tipi.items():
+        if campo not in righe:
+            valori = compatte['giornaliere'][campo].reindex(righe['Date'].astype(tipi['Date'])).to_numpy()
+            colonne[campo] = pd.Series(valori, index=righe.index).astype(tipo)
+        elif righe[campo].dtype == 'float32':
+            colonne[campo] = righe[campo].astype(tipo).round(CIFRE_DECIMALI[campo])
+        else:
+            colonne[campo] = righe[campo].astype(tipo)
+    return pd.DataFrame(colonne)
+
+
+def byte_occupati(dati):
+    # Memoria occupata da un DataFrame o da rilevazioni compatte, comprese le stringhe
+    if isinstance(dati, dict):
+        return sum(byte_occupati(parte) for parte in (dati['righe'], dati['giornaliere']))
+    return int(dati.memory_usage(deep=True).sum())
@@ -0,0 +1,81 @@
+import os
+
+# Percorso di default del file di log generato dalla pipeline Kafka -> HDFS
+PERCORSO_LOG = os.environ.get("METEO_PERCORSO_LOG", "Log.csv")
+
+# Città (o stazione) a cui appartengono le rilevazioni del file di log predefinito
+CITTA = os.environ.get("METEO_CITTA", "Napoli")
+
+# File di log delle città monitorate, nel formato 'Napoli=Log.csv,Roma=roma.csv' (default: il file di log predefinito
+# per la città predefinita)
+LOG_CITTA = dict(voce.split('=', 1) for voce in os.environ.get("METEO_LOG_CITTA", f"{CITTA}={PERCORSO_LOG}").split(',')
+                 if voce)
+
+# Cartella dell'archivio colonnare (Parquet) dei dati puliti
+PERCORSO_ARCHIVIO = os.environ.get("METEO_PERCORSO_ARCHIVIO", "dati")
+
+# Modalità di alimentazione dell'archivio: 'batch' (dal file di log) oppure 'streaming' (job in meteo.streaming)
+MODALITA_INGESTIONE = os.environ.get("METEO_MODALITA_INGESTIONE", "batch")
+
+# Fuso orario in cui vengono espressi date e orari delle rilevazioni (uguale per tutti i motori di calcolo)
+FUSO_ORARIO = os.environ.get("METEO_FUSO_ORARIO", "Europe/Rome")
+
+# Motore di calcolo: 'spark', 'pandas', 'auto' (scelto in base alla dimensione dei dati) oppure 'remoto' (le
+# interrogazioni vengono inoltrate al servizio di meteo.servizio)
+MOTORE = os.environ.get("METEO_MOTORE", "auto")
+
+# Con il motore 'auto', sotto questa dimensione (in byte) i dati vengono elaborati con pandas/pyarrow
+SOGLIA_MOTORE_PANDAS = int(os.environ.get("METEO_SOGLIA_MOTORE_PANDAS", 256 * 1024 * 1024))
+
+# Dimensione (in byte) dei blocchi in cui il motore pandas legge il file di log: limita la memoria usata
+# dall'ingestione indipendentemente dalla dimensione del file
+DIMENSIONE_BLOCCO_LOG = int(os.environ.get("METEO_DIMENSIONE_BLOCCO_LOG", 4 * 1024 * 1024))
+
+# Numero massimo di città i cui log vengono controllati (ed eventualmente importati) in parallelo all'avvio della
+# dashboard (con Spark, ogni sessione utente ha il proprio pool dello scheduler FAIR)
+THREAD_LETTURE = int(os.environ.get("METEO_THREAD_LETTURE", 4))
+
+# Indirizzo del servizio di interrogazione usato dal motore 'remoto': 'http://host:porta' oppure 'unix:<percorso del
+# socket>'. Il servizio e le dashboard che lo usano condividono la stessa cartella dell'archivio
+INDIRIZZO_SERVIZIO = os.environ.get("METEO_INDIRIZZO_SERVIZIO", "http://127.0.0.1:8765")
+
+# Cartella dei file di log che il servizio di interrogazione accetta di importare: le richieste di ingestione con un
+# file al di fuori di questa cartella vengono rifiutate (default: la cartella del file di log predefinito)
+CARTELLA_INGESTIONE = os.environ.get("METEO_CARTELLA_INGESTIONE", os.path.dirname(os.path.abspath(PERCORSO_LOG)))
+
+# Numero massimo di risposte (rilevazioni di un insieme di giorni) conservate in cache dal servizio di interrogazione
+RISPOSTE_CACHE_SERVIZIO = int(os.environ.get("METEO_RISPOSTE_CACHE_SERVIZIO", 1024))
+
+# Numero massimo di punti per traccia inviati al browser nei grafici temporali (le serie più lunghe vengono ridotte)
+PUNTI_MASSIMI_GRAFICO = int(os.environ.get("METEO_PUNTI_MASSIMI_GRAFICO", 1000))
+
+# Memoria massima (in byte) della cache dei grafici e delle tabelle già costruiti, condivisa da tutte le sessioni:
+# oltre questo limite vengono scartati quelli usati meno di recente (0 disattiva la cache)
+DIMENSIONE_CACHE_FIGURE = int(os.environ.get("METEO_DIMENSIONE_CACHE_FIGURE", 64 * 1024 * 1024))
+
+# Sezione di diagnostica (durate delle letture e dei grafici) nella barra laterale: è nascosta e si attiva con
+# questa variabile oppure aggiungendo '?diagnostica=1' all'indirizzo della dashboard
+DIAGNOSTICA = os.environ.get("METEO_DIAGNOSTICA", "0") == "1"
+
+# File in cui esportare le misure: '.json' per le ultime misure, altrimenti i totali per operazione nel formato
+# testuale di Prometheus (nessuna esportazione se vuoto). Il file viene riscritto al più una volta ogni
+# INTERVALLO_DIAGNOSTICA secondi e all'uscita del processo
+FILE_DIAGNOSTICA = os.environ.get("METEO_FILE_DIAGNOSTICA", "")
+INTERVALLO_DIAGNOSTICA = float(os.environ.get("METEO_INTERVALLO_DIAGNOSTICA", 10))
+
+# Campi numerici di cui calcoliamo la media aritmetica giornaliera. La direzione del vento ('Wind_Deg') è un
+# angolo e ha invece una media circolare (vedi meteo.vento)
+CAMPI_NUMERICI = ['Temperature', 'Feels_Like', 'Temp_Min', 'Temp_Max', 'Pressure', 'Humidity', 'Visibility',
+                  'Wind_Speed', 'Wind_Gust', 'Clouds_Level']
+
+# Cifre decimali con cui vengono arrotondate le medie (la direzione del vento viene mostrata con un solo decimale)
+CIFRE_DECIMALI = {campo: 2 for campo in CAMPI_NUMERICI}
+CIFRE_DECIMALI['Wind_Deg'] = 1
+CIFRE_DECIMALI['Costanza_Vento'] = 2
+
+# Semiampiezza (in giorni) della finestra di giorni dell'anno su cui vengono calcolate le normali climatologiche: la
+# normale del 15 marzo, ad esempio, comprende le rilevazioni dall'8 al 22 marzo di tutti gli anni presenti
+FINESTRA_CLIMATOLOGIA = int(os.environ.get("METEO_FINESTRA_CLIMATOLOGIA", 7))
+
+# Campi delle temperature, convertiti da Kelvin a gradi Celsius durante il preprocessing
+CAMPI_TEMPERATURA = ['Temperature', 'Feels_Like', 'Temp_Min', 'Temp_Max']
@@ -0,0 +1,141 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+from meteo.configurazione import FILE_DIAGNOSTICA, INTERVALLO_DIAGNOSTICA
+
+# Registro delle misure di durata delle operazioni della dashboard (letture tramite il motore di calcolo,
+# costruzione e invio dei grafici). È condiviso da tutte le sessioni del processo Streamlit: le ultime misure
+# vengono conservate per la sezione di diagnostica, i totali per operazione per l'esportazione in formato Prometheus
+ULTIME_MISURE = deque(maxlen=500)
+TOTALI = {}
+CONTATORI = {}
+BLOCCO = threading.RLock()
+
+# Istante dell'ultima esportazione su file: il file viene riscritto fuori dal blocco e al più una volta ogni
+# INTERVALLO_DIAGNOSTICA secondi, non a ogni misura
+ULTIMA_ESPORTAZIONE = {'istante': 0.0}
+
+
+def contesto_spark():
+    # Lo SparkContext attivo, se il motore Spark è in uso (senza importare PySpark quando non serve)
+    if 'pyspark' not in sys.modules:
+        return None
+    from pyspark import SparkContext
+    return SparkContext._active_spark_context
+
+
+def registra(operazione, tipo, secondi, righe=None, job_spark=None):
+    misura = {'istante': time.time(), 'operazione': operazione, 'tipo': tipo, 'secondi': round(secondi, 4),
+              'righe': righe, 'job_spark': job_spark or []}
+    with BLOCCO:
+        ULTIME_MISURE.append(misura)
+        totale = TOTALI.setdefault((operazione, tipo), {'esecuzioni': 0, 'secondi': 0.0, 'righe': 0})
+        totale['esecuzioni'] += 1
+        totale['secondi'] += secondi
+        totale['righe'] += righe or 0
+        da_esportare = bool(FILE_DIAGNOSTICA) and \
+            misura['istante'] - ULTIMA_ESPORTAZIONE['istante'] >= INTERVALLO_DIAGNOSTICA
+        if da_esportare:
+            ULTIMA_ESPORTAZIONE['istante'] = misura['istante']
+    if da_esportare:
+        esporta(FILE_DIAGNOSTICA)
+
+
+def conta(contatore, quantita=1):
+    # Incrementa un contatore generico (ad esempio i successi e i fallimenti di una cache)
+    with BLOCCO:
+        CONTATORI[contatore] = CONTATORI.get(contatore, 0) + quantita
+
+
+@contextmanager
+def misura(operazione, tipo='azione'):
+    # Misura il blocco di codice: il chiamante può indicare le righe trasferite impostando dettagli['righe'].
+    # Con Spark, i job lanciati dal blocco vengono assegnati a un job group dedicato per recuperarne gli ID
+    # (le proprietà locali di Spark valgono per il solo thread corrente, cioè per la sessione che esegue il blocco).
+    # Se la sessione Spark non era ancora attiva all'inizio del blocco, i suoi job non hanno un gruppo e non possono
+    # essere distinti da quelli delle altre sessioni: in questo caso non vengono riportati
+    dettagli = {'righe': None}
+    spark = contesto_spark()
+    gruppo = f'meteo-{uuid.uuid4().hex}'
+    if spark is not None:
+        gruppo_precedente = spark.getLocalProperty('spark.jobGroup.id')
+        spark.setLocalProperty('spark.jobGroup.id', gruppo)
+
+    inizio = time.perf_counter()
+    try:
+        yield dettagli
+    finally:
+        durata = time.perf_counter() - inizio
+        job_spark = None
+        if spark is not None:
+            spark.setLocalProperty('spark.jobGroup.id', gruppo_precedente)
+            job_spark = sorted(spark.statusTracker().getJobIdsForGroup(gruppo))
+        registra(operazione, tipo, durata, dettagli['righe'], job_spark)
+
+
+def ultime_misure():
+    # Copia delle ultime misure, dalla più vecchia alla più recente
+    with BLOCCO:
+        return list(ULTIME_MISURE)
+
+
+def righe(risultato):
+    # Numero di righe (o di giorni) restituite da una lettura
+    return len(risultato) if hasattr(risultato, '__len__') else None
+
+
+def punti_figura(fig):
+    # Numero di punti inviati al browser con una figura Plotly
+    totale = 0
+    for traccia in fig.data:
+        lunghezze = [len(getattr(traccia, campo)) for campo in ('x', 'y', 'r', 'theta', 'values')
+                     if getattr(traccia, campo, None) is not None]
+        totale += max(lunghezze, default=0)
+    return totale
+
+
+def formato_prometheus():
+    # Totali per operazione nel formato testuale di Prometheus
+    righe_testo = ['# HELP meteo_operazione_secondi_totali Tempo complessivo speso in ogni operazione',
+                   '# TYPE meteo_operazione_secondi_totali counter',
+                   '# HELP meteo_operazione_esecuzioni_totali Numero di esecuzioni di ogni operazione',
+                   '# TYPE meteo_operazione_esecuzioni_totali counter',
+                   '# HELP meteo_operazione_righe_totali Righe trasferite o punti disegnati da ogni operazione',
+                   '# TYPE meteo_operazione_righe_totali counter']
+    with BLOCCO:
+        totali = sorted((chiave, dict(totale)) for chiave, totale in TOTALI.items())
+        contatori = sorted(CONTATORI.items())
+    for (operazione, tipo), totale in totali:
+        etichette = '{operazione="%s",tipo="%s"}' % (operazione.replace('\\', '\\\\').replace('"', '\\"'), tipo)
+        righe_testo.append(f'meteo_operazione_secondi_totali{etichette} {totale["secondi"]:.6f}')
+        righe_testo.append(f'meteo_operazione_esecuzioni_totali{etichette} {totale["esecuzioni"]}')
+        righe_testo.append(f'meteo_operazione_righe_totali{etichette} {totale["righe"]}')
+    for contatore, valore in contatori:
+        righe_testo.append(f'# TYPE meteo_{contatore}_totali counter')
+        righe_testo.append(f'meteo_{contatore}_totali {valore}')
+    return '\n'.join(righe_testo) + '\n'
+
+
+def esporta(percorso):
+    # Il formato dipende dall'estensione del file: '.json' per le ultime misure, altrimenti testo Prometheus
+    if percorso.endswith('.json'):
+        contenuto = json.dumps(ultime_misure(), indent=2)
+    else:
+        contenuto = formato_prometheus()
+    # Il file viene sostituito in un'unica operazione, così chi lo legge non vede mai un'esportazione a metà
+    temporaneo = f'{percorso}.{uuid.uuid4().hex}.tmp'
+    with open(temporaneo, 'w') as file:
+        file.write(contenuto)
+    os.replace(temporaneo, percorso)
+
+
+# Le misure successive all'ultima esportazione vengono scritte all'uscita del processo
+if FILE_DIAGNOSTICA:
+    atexit.register(esporta, FILE_DIAGNOSTICA)
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from meteo.configurazione import FUSO_ORARIO
+
+# Le rilevazioni di ogni giorno sono memorizzate (e restituite dai motori) in ordine di istante: le righe di una
+# fascia oraria formano quindi un blocco contiguo, che si individua con due ricerche binarie sulla colonna
+# 'Datetime' senza scorrere le altre righe
+
+# Estremi di una giornata in secondi dalla mezzanotte (estremi inclusi)
+INIZIO_GIORNO = 0
+FINE_GIORNO = 24 * 3600 - 1
+
+
+def istanti_finestra(giorno, inizio, fine):
+    # Timestamp UNIX corrispondenti agli orari locali 'inizio' e 'fine' (secondi dalla mezzanotte) del giorno.
+    # Nei cambi d'ora l'orario iniziale ambiguo è preso alla prima occorrenza e quello finale all'ultima
+    mezzanotte = pd.Timestamp(giorno)
+    limiti = pd.DatetimeIndex([mezzanotte + pd.Timedelta(seconds=inizio), mezzanotte + pd.Timedelta(seconds=fine)]) \
+        .tz_localize(FUSO_ORARIO, ambiguous=np.array([True, False]), nonexistent='shift_forward')
+    return ((limiti - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)).to_numpy()
+
+
+def finestra_oraria(osservazioni, giorno, inizio, fine):
+    # Righe di un giorno con orario compreso tra 'inizio' e 'fine' (secondi dalla mezzanotte, estremi inclusi)
+    if inizio <= INIZIO_GIORNO and fine >= FINE_GIORNO:
+        return osservazioni
+    istante_inizio, istante_fine = istanti_finestra(giorno, inizio, fine)
+    istanti = osservazioni['Datetime'].to_numpy()
+    return osservazioni.iloc[np.searchsorted(istanti, istante_inizio, 'left'):
+                             np.searchsorted(istanti, istante_fine, 'right')]
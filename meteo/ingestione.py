@@ -0,0 +1,30 @@
+import argparse
+
+from meteo.configurazione import CITTA, MOTORE, PERCORSO_ARCHIVIO, PERCORSO_LOG
+from meteo.motori import MOTORI, scegli_motore
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ingestione del file di log di una città nell'archivio Parquet partizionato per città "
+                    "e per giorno")
+    parser.add_argument('--sorgente', default=PERCORSO_LOG, help="file di log da importare (default: %(default)s)")
+    parser.add_argument('--archivio', default=PERCORSO_ARCHIVIO, help="cartella dell'archivio (default: %(default)s)")
+    parser.add_argument('--citta', default=CITTA, help="città delle rilevazioni (default: %(default)s)")
+    parser.add_argument('--incrementale', action='store_true',
+                        help="accoda le sole rilevazioni non ancora presenti invece di riscrivere la città")
+    parser.add_argument('--motore', choices=['auto'] + MOTORI, default=MOTORE,
+                        help="motore di calcolo (default: %(default)s)")
+    argomenti = parser.parse_args()
+
+    motore = scegli_motore(argomenti.motore, [argomenti.sorgente], argomenti.archivio)
+    if argomenti.incrementale:
+        # Un nuovo segmento del log costa in proporzione ai giorni che contiene, non all'intero storico
+        giorni = motore.accoda_log(argomenti.sorgente, argomenti.archivio, argomenti.citta)
+        print(f"Giorni aggiornati: {', '.join(str(giorno) for giorno in sorted(giorni)) or 'nessuno'}")
+    else:
+        motore.importa_log(argomenti.sorgente, argomenti.archivio, argomenti.citta)
+
+
+if __name__ == '__main__':
+    main()
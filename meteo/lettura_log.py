@@ -0,0 +1,54 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as csv
+
+from meteo.configurazione import DIMENSIONE_BLOCCO_LOG, PERCORSO_LOG
+
+# Lettura a blocchi del file di log grezzo senza Spark: il file viene letto in blocchi di dimensione fissa e ogni
+# blocco diventa un RecordBatch di Arrow già tipizzato, per cui la memoria occupata non dipende dalla dimensione
+# del file ma da quella dei blocchi
+
+# Schema del file di log grezzo (corrispondente a meteo.preprocessing.SCHEMA_LOG)
+SCHEMA_LOG = pa.schema([
+    ('Weather', pa.string()),
+    ('Description', pa.string()),
+    ('Temperature', pa.float64()),
+    ('Feels_Like', pa.float64()),
+    ('Temp_Min', pa.float64()),
+    ('Temp_Max', pa.float64()),
+    ('Pressure', pa.int32()),
+    ('Humidity', pa.int32()),
+    ('Visibility', pa.int32()),
+    ('Wind_Speed', pa.float64()),
+    ('Wind_Gust', pa.float64()),
+    ('Wind_Deg', pa.int32()),
+    ('Clouds_Level', pa.int32()),
+    ('Datetime', pa.int64()),
+    ('Sunrise', pa.int64()),
+    ('Sunset', pa.int64())
+])
+
+CAMPI_TESTUALI = [campo.name for campo in SCHEMA_LOG if pa.types.is_string(campo.type)]
+
+
+def blocchi_log(percorso=PERCORSO_LOG, dimensione_blocco=DIMENSIONE_BLOCCO_LOG):
+    # Il lettore CSV di pyarrow salta il BOM dell'intestazione e converte i campi numerici (preceduti da spazi)
+    # direttamente nei tipi dello schema, senza creare oggetti Python. Ai campi testuali vengono tolti gli spazi
+    # con le funzioni di calcolo di Arrow. I campi vuoti (anche con un solo spazio) diventano nulli, come nel
+    # lettore CSV di Spark, anziché interrompere l'importazione. Il file viene passato già aperto: a partire da un
+    # percorso, pyarrow legge in anticipo l'intero file e la memoria occupata crescerebbe con la sua dimensione
+    with open(percorso, 'rb') as file:
+        lettore = csv.open_csv(file, read_options=csv.ReadOptions(block_size=dimensione_blocco),
+                               parse_options=csv.ParseOptions(delimiter=';'),
+                               convert_options=csv.ConvertOptions(column_types=SCHEMA_LOG,
+                                                                  include_columns=SCHEMA_LOG.names,
+                                                                  null_values=['', ' '], strings_can_be_null=True))
+        for blocco in lettore:
+            colonne = [pc.utf8_trim_whitespace(blocco.column(campo)) if campo in CAMPI_TESTUALI
+                       else blocco.column(campo) for campo in SCHEMA_LOG.names]
+            yield pa.RecordBatch.from_arrays(colonne, schema=SCHEMA_LOG)
+
+
+def leggi_log(percorso=PERCORSO_LOG, dimensione_blocco=DIMENSIONE_BLOCCO_LOG):
+    # L'intero file di log in un'unica tabella Arrow
+    return pa.Table.from_batches(blocchi_log(percorso, dimensione_blocco), schema=SCHEMA_LOG)
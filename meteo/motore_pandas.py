@@ -0,0 +1,340 @@
+import os
+import shutil
+import uuid
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from meteo.archivio import percorso_aggregati, percorso_normali, percorso_osservazioni, percorso_serie, \
+    percorso_sintesi, percorso_statistiche, prepara_archivio, segna_formato
+from meteo.climatologia import SCHEMA_SINTESI, aggiorna_normali, calcola_sintesi_orarie, fondi_sintesi
+from meteo.configurazione import CAMPI_NUMERICI, CAMPI_TEMPERATURA, CIFRE_DECIMALI, CITTA, FUSO_ORARIO, \
+    PERCORSO_ARCHIVIO, PERCORSO_LOG
+from meteo.lettura_log import SCHEMA_LOG, blocchi_log, leggi_log as leggi_tabella_log
+from meteo.serie import SCHEMA_SERIE, aggiorna_serie_orarie, medie_serie, serie_giornaliere
+from meteo.statistiche import SCHEMA_STATISTICHE, aggiorna_statistiche
+
+# Motore di calcolo vettoriale basato su pandas/pyarrow: non richiede la JVM e importa il file di log a blocchi,
+# con una memoria che dipende dalla dimensione dei blocchi e di un singolo giorno di rilevazioni e non da quella
+# del file. Legge e scrive lo stesso archivio Parquet del motore Spark e produce gli stessi risultati.
+
+# Schema dei dati puliti memorizzati nell'archivio (corrispondente a meteo.preprocessing.SCHEMA_OSSERVAZIONI)
+SCHEMA_OSSERVAZIONI = pa.schema(
+    list(SCHEMA_LOG) + [
+        ('Secondi', pa.int32()),
+        ('Date', pa.date32())
+    ]
+)
+
+# Schema della tabella degli aggregati giornalieri, con le colonne nello stesso ordine prodotto da Spark
+SCHEMA_AGGREGATI = pa.schema(
+    [(campo, pa.float64()) for campo in CAMPI_NUMERICI] + [
+        ('Wind_Deg', pa.float64()),
+        ('Costanza_Vento', pa.float64()),
+        ('Descrizioni', pa.map_(pa.string(), pa.int64())),
+        ('Sunrise', pa.int64()),
+        ('Sunset', pa.int64()),
+        ('Durata_Luce', pa.int64()),
+        ('Rilevazioni', pa.int64())
+    ] + [
+        (f'{statistica}_{campo}', pa.float64()) for campo in CAMPI_NUMERICI
+        for statistica in ('Deviazione', 'Minimo', 'Massimo')
+    ] + [
+        ('Date', pa.date32())
+    ]
+)
+
+# Partizionamento 'Date=AAAA-MM-GG' (all'interno della cartella di ogni città) compatibile con quello scritto da Spark
+PARTIZIONAMENTO = ds.partitioning(pa.schema([('Date', pa.date32())]), flavor='hive')
+
+
+def arrotonda(valore, cifre):
+    # Stesso arrotondamento della funzione round() di Spark: HALF_UP sulla rappresentazione decimale del double
+    return float(Decimal(repr(float(valore))).quantize(Decimal(1).scaleb(-cifre), rounding=ROUND_HALF_UP))
+
+
+def arrotonda_colonna(valori, cifre):
+    # 'arrotonda' applicata a un'intera colonna: ogni valore distinto (poche migliaia per le temperature) viene
+    # arrotondato una sola volta, i valori mancanti restano tali
+    distinti = valori.dropna().unique()
+    return valori.map(dict(zip(distinti, (arrotonda(valore, cifre) for valore in distinti))))
+
+
+def converti_istanti(timestamp):
+    # Timestamp UNIX -> data e ora locali nel fuso orario configurato (come from_unixtime di Spark)
+    return pd.to_datetime(timestamp, unit='s', utc=True).dt.tz_convert(FUSO_ORARIO)
+
+
+def leggi_log(percorso=PERCORSO_LOG):
+    # L'intero file di log in un DataFrame (vedi meteo.lettura_log per la lettura a blocchi)
+    return leggi_tabella_log(percorso).to_pandas()
+
+
+def prepara_dati(percorso=PERCORSO_LOG):
+    df = leggi_log(percorso)
+
+    # Rimozione delle istanze duplicate (confrontando il solo istante 'Datetime') e ordinamento rispetto al
+    # campo 'Datetime'
+    df = deduplica(df).sort_values('Datetime', kind='stable', ignore_index=True)
+
+    return pulisci(df)
+
+
+def deduplica(df):
+    # Stessa deduplicazione di meteo.preprocessing.deduplica: una sola rilevazione per istante
+    return df[df['Datetime'].notna()].drop_duplicates('Datetime')
+
+
+def pulisci(df):
+    # Stesse trasformazioni di meteo.preprocessing.pulisci, eseguite colonna per colonna
+    df = df.copy()
+
+    # Rimozione degli spazi attorno ai campi testuali
+    df['Weather'] = df['Weather'].str.strip()
+    df['Description'] = df['Description'].str.strip()
+
+    # Conversione delle temperature da Kelvin a gradi Celsius, arrotondate come in Spark (HALF_UP e non al pari
+    # più vicino come la round() di numpy)
+    for campo in CAMPI_TEMPERATURA:
+        df[campo] = arrotonda_colonna(df[campo] - 273.15, 2)
+
+    # Giorno e secondi dalla mezzanotte della rilevazione, nel fuso orario configurato
+    istanti = converti_istanti(df['Datetime'])
+    df['Secondi'] = (istanti.dt.hour * 3600 + istanti.dt.minute * 60 + istanti.dt.second).astype('int32')
+    df['Date'] = istanti.dt.date
+
+    return df[SCHEMA_OSSERVAZIONI.names]
+
+
+def aggregati_da_statistiche(stati):
+    # Stessi aggregati di meteo.aggregati.aggregati_da_statistiche, a partire dallo stato incrementale di ogni giorno
+    # (vedi meteo.statistiche)
+    righe = []
+    for stato in stati.to_dict('records'):
+        riga = {campo: arrotonda(stato[f'somma_{campo}'] / stato[f'conteggio_{campo}'], CIFRE_DECIMALI[campo])
+                if stato[f'conteggio_{campo}'] else None for campo in CAMPI_NUMERICI}
+
+        # Media circolare della direzione del vento (come meteo.vento.media_da_componenti): l'angolo restituito da
+        # arctan2, in (-180, 180], viene arrotondato prima di riportarlo in [0, 360), come in Spark. Senza
+        # direzioni valide nel giorno mancano sia la direzione sia la costanza
+        if stato['conteggio_vento']:
+            direzione = np.degrees(np.arctan2(stato['somma_sin_vento'], stato['somma_cos_vento']))
+            riga['Wind_Deg'] = arrotonda(direzione, CIFRE_DECIMALI['Wind_Deg']) % 360
+            riga['Costanza_Vento'] = arrotonda(np.hypot(stato['somma_sin_vento'], stato['somma_cos_vento']) /
+                                               stato['conteggio_vento'], CIFRE_DECIMALI['Costanza_Vento'])
+        else:
+            riga['Wind_Deg'] = riga['Costanza_Vento'] = None
+        riga['Descrizioni'] = dict(sorted(stato['Descrizioni']))
+        # Alba e tramonto mancano (come in Spark) se la prima rilevazione del giorno non li riporta
+        riga['Sunrise'] = None if pd.isna(stato['Sunrise']) else int(stato['Sunrise'])
+        riga['Sunset'] = None if pd.isna(stato['Sunset']) else int(stato['Sunset'])
+        riga['Durata_Luce'] = riga['Sunset'] - riga['Sunrise'] \
+            if riga['Sunrise'] is not None and riga['Sunset'] is not None else None
+        riga['Rilevazioni'] = int(stato['Rilevazioni'])
+
+        # Deviazione standard (di popolazione), minimo e massimo di ogni campo
+        for campo in CAMPI_NUMERICI:
+            presenti = stato[f'conteggio_{campo}'] > 0
+            riga[f'Deviazione_{campo}'] = arrotonda(np.sqrt(stato[f'm2_{campo}'] / stato[f'conteggio_{campo}']),
+                                                    CIFRE_DECIMALI[campo]) if presenti else None
+            riga[f'Minimo_{campo}'] = stato[f'minimo_{campo}'] if presenti else None
+            riga[f'Massimo_{campo}'] = stato[f'massimo_{campo}'] if presenti else None
+        riga['Date'] = stato['Date']
+        righe.append(riga)
+    return righe
+
+
+def file_dei_giorni(percorso, giorni):
+    # File Parquet delle partizioni dei giorni indicati: vengono elencate soltanto le loro cartelle
+    file = []
+    for giorno in giorni:
+        cartella = os.path.join(percorso, f'Date={giorno}')
+        if os.path.isdir(cartella):
+            file += sorted(voce.path for voce in os.scandir(cartella)
+                           if voce.name.endswith('.parquet') and not voce.name.startswith(('.', '_')))
+    return file
+
+
+def dataset_partizionato(percorso, schema, giorni=None):
+    # Dataset dell'intera tabella oppure, se indicati, dei soli giorni richiesti
+    if giorni is None:
+        return ds.dataset(percorso, schema=schema, format='parquet', partitioning=PARTIZIONAMENTO)
+    return ds.dataset(file_dei_giorni(percorso, giorni), schema=schema, format='parquet',
+                      partitioning=PARTIZIONAMENTO, partition_base_dir=percorso)
+
+
+def segna_completamento(percorso):
+    # File '_SUCCESS' che segnala il completamento di una scrittura, come in Spark
+    os.makedirs(percorso, exist_ok=True)
+    open(os.path.join(percorso, '_SUCCESS'), 'w').close()
+
+
+def tabella_aggregati(stati):
+    # La mappa delle descrizioni viene passata a pyarrow come lista di coppie (chiave, valore)
+    aggregati = [dict(riga, Descrizioni=list(riga['Descrizioni'].items())) for riga in aggregati_da_statistiche(stati)]
+    return pa.Table.from_pylist(aggregati, schema=SCHEMA_AGGREGATI)
+
+
+def leggi_partizioni(percorso, schema, giorni):
+    # Righe delle partizioni dei giorni indicati (nessuna se non sono ancora state scritte)
+    return dataset_partizionato(percorso, schema, giorni).to_table().to_pandas()
+
+
+def scrivi_partizioni(tabella, percorso):
+    # Con 'delete_matching' vengono sostituite soltanto le partizioni dei giorni presenti nella tabella
+    ds.write_dataset(tabella, percorso, format='parquet', partitioning=PARTIZIONAMENTO,
+                     basename_template='part-{i}.parquet', existing_data_behavior='delete_matching')
+
+
+def aggiorna_stati(nuove_osservazioni, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    # Le statistiche giornaliere, le sintesi orarie e i bucket orari dei giorni delle nuove rilevazioni vengono fusi
+    # con quelli già archiviati per gli stessi giorni: si leggono soltanto le loro partizioni (poche righe per giorno),
+    # mai le rilevazioni già presenti
+    giorni = sorted(set(nuove_osservazioni['Date']))
+    precedenti = leggi_partizioni(percorso_statistiche(archivio, citta), SCHEMA_STATISTICHE, giorni)
+    stati = aggiorna_statistiche(precedenti, nuove_osservazioni)
+    scrivi_partizioni(pa.Table.from_pandas(stati, schema=SCHEMA_STATISTICHE, preserve_index=False),
+                      percorso_statistiche(archivio, citta))
+
+    sintesi = calcola_sintesi_orarie(nuove_osservazioni)
+    precedenti = leggi_partizioni(percorso_sintesi(archivio, citta), SCHEMA_SINTESI, giorni)
+    if not precedenti.empty:
+        sintesi = fondi_sintesi(pd.concat([precedenti, sintesi], ignore_index=True))
+    scrivi_partizioni(pa.Table.from_pandas(sintesi, schema=SCHEMA_SINTESI, preserve_index=False),
+                      percorso_sintesi(archivio, citta))
+
+    precedenti = leggi_partizioni(percorso_serie(archivio, citta), SCHEMA_SERIE, giorni)
+    serie = aggiorna_serie_orarie(precedenti, nuove_osservazioni)
+    scrivi_partizioni(pa.Table.from_pandas(serie, schema=SCHEMA_SERIE, preserve_index=False),
+                      percorso_serie(archivio, citta))
+
+
+def istanti_presenti(archivio=PERCORSO_ARCHIVIO, giorni=(), citta=CITTA):
+    # Chiavi ('Datetime') già presenti nell'archivio per i giorni indicati: viene letta soltanto la colonna
+    # 'Datetime' delle partizioni di quei giorni, per cui il costo non dipende dalla lunghezza dello storico
+    dataset = dataset_partizionato(percorso_osservazioni(archivio, citta), SCHEMA_OSSERVAZIONI, giorni)
+    return dataset.to_table(columns=['Datetime'])['Datetime']
+
+
+def accoda_osservazioni(nuove_osservazioni, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    # Le rilevazioni (già pulite) non ancora archiviate vengono accodate come nuovi file, ordinati per istante,
+    # nelle partizioni dei loro giorni. Restituisce i giorni a cui sono state aggiunte rilevazioni
+    nuove_osservazioni = deduplica(nuove_osservazioni)
+    presenti = istanti_presenti(archivio, nuove_osservazioni['Date'].unique(), citta)
+    nuove_osservazioni = nuove_osservazioni[~nuove_osservazioni['Datetime'].isin(presenti.to_numpy())]
+    if nuove_osservazioni.empty:
+        return set()
+
+    nuove_osservazioni = nuove_osservazioni.sort_values('Datetime', kind='stable')
+    ds.write_dataset(pa.Table.from_pandas(nuove_osservazioni, schema=SCHEMA_OSSERVAZIONI, preserve_index=False),
+                     percorso_osservazioni(archivio, citta), format='parquet', partitioning=PARTIZIONAMENTO,
+                     basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+                     existing_data_behavior='overwrite_or_ignore')
+    aggiorna_stati(nuove_osservazioni, archivio, citta)
+    return set(nuove_osservazioni['Date'])
+
+
+def aggiorna_aggregati(giorni, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    # Gli aggregati dei giorni indicati derivano dalle loro statistiche incrementali, già aggiornate con le nuove
+    # rilevazioni: il costo non dipende dal numero di rilevazioni dei giorni. Le normali climatologiche vengono
+    # ricalcolate prima di scrivere gli aggregati, il cui '_SUCCESS' segna la nuova versione dei dati
+    if giorni:
+        stati = leggi_partizioni(percorso_statistiche(archivio, citta), SCHEMA_STATISTICHE, sorted(giorni))
+        aggiorna_normali(giorni, archivio, citta)
+        scrivi_partizioni(tabella_aggregati(stati), percorso_aggregati(archivio, citta))
+    segna_completamento(percorso_aggregati(archivio, citta))
+
+
+def accoda_blocchi(sorgente, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    # Il log viene letto, pulito e accodato un blocco alla volta: i duplicati vengono riconosciuti sia all'interno
+    # del blocco sia rispetto alle rilevazioni già scritte per gli stessi giorni
+    giorni = set()
+    for blocco in blocchi_log(sorgente):
+        giorni |= accoda_osservazioni(pulisci(blocco.to_pandas()), archivio, citta)
+    return giorni
+
+
+def scrivi_archivio(sorgente=PERCORSO_LOG, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    # Vengono riscritte soltanto le cartelle della città, lasciando intatte quelle delle altre città
+    prepara_archivio(archivio)
+    shutil.rmtree(percorso_osservazioni(archivio, citta), ignore_errors=True)
+    shutil.rmtree(percorso_aggregati(archivio, citta), ignore_errors=True)
+    shutil.rmtree(percorso_sintesi(archivio, citta), ignore_errors=True)
+    shutil.rmtree(percorso_statistiche(archivio, citta), ignore_errors=True)
+    shutil.rmtree(percorso_serie(archivio, citta), ignore_errors=True)
+    shutil.rmtree(os.path.dirname(percorso_normali(archivio, citta)), ignore_errors=True)
+    giorni = accoda_blocchi(sorgente, archivio, citta)
+    segna_completamento(percorso_osservazioni(archivio, citta))
+    aggiorna_aggregati(giorni, archivio, citta)
+    segna_formato(archivio)
+
+
+def aggiorna_giorni(nuove_osservazioni, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    # Stessa ingestione incrementale di meteo.motore_spark.aggiorna_giorni: le nuove rilevazioni vengono accodate
+    # e gli aggregati vengono riscritti soltanto per i giorni che le contengono
+    giorni = accoda_osservazioni(nuove_osservazioni, archivio, citta)
+    if not giorni:
+        return []
+    aggiorna_aggregati(giorni, archivio, citta)
+    segna_formato(archivio)
+    return sorted(giorni)
+
+
+def leggi_osservazioni(archivio=PERCORSO_ARCHIVIO, giorni=None, ore=None, citta=CITTA):
+    # Il dataset viene aperto sulla cartella della città (i file delle altre città non vengono elencati) e, se
+    # indicati, sui soli file dei giorni richiesti
+    dataset = dataset_partizionato(percorso_osservazioni(archivio, citta), SCHEMA_OSSERVAZIONI, giorni)
+
+    # Fascia oraria (secondi dalla mezzanotte, estremi inclusi), valutata anche sulle statistiche dei file Parquet
+    filtro = None
+    if ore is not None:
+        filtro = (ds.field('Secondi') >= ore[0]) & (ds.field('Secondi') <= ore[1])
+
+    return dataset.to_table(filter=filtro).to_pandas().sort_values('Datetime', kind='stable', ignore_index=True)
+
+
+def leggi_serie(granularita, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    # Bucket dell'intero storico della città: quelli orari sono già nell'archivio, quelli giornalieri derivano dalle
+    # sole colonne di somme e conteggi delle statistiche giornaliere
+    if granularita == 'ora':
+        return dataset_partizionato(percorso_serie(archivio, citta), SCHEMA_SERIE).to_table().to_pandas()
+    if granularita == 'giorno':
+        colonne = [colonna for colonna in SCHEMA_SERIE.names if colonna != 'Inizio']
+        stati = dataset_partizionato(percorso_statistiche(archivio, citta), SCHEMA_STATISTICHE).to_table(colonne)
+        return serie_giornaliere(stati.to_pandas())
+    raise ValueError(f"Granularità sconosciuta: '{granularita}'")
+
+
+# Interfaccia comune dei motori di calcolo (vedi meteo.motori)
+
+def importa_log(sorgente, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    scrivi_archivio(sorgente, archivio, citta)
+
+
+def accoda_log(sorgente, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    prepara_archivio(archivio)
+    giorni = accoda_blocchi(sorgente, archivio, citta)
+    if giorni:
+        aggiorna_aggregati(giorni, archivio, citta)
+        segna_formato(archivio)
+    return sorted(giorni)
+
+
+def aggregati_giornalieri(archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    dataset = ds.dataset(percorso_aggregati(archivio, citta), format='parquet', partitioning=PARTIZIONAMENTO)
+    risultato = {}
+    for riga in dataset.to_table().to_pylist():
+        riga['Descrizioni'] = dict(sorted(riga['Descrizioni']))
+        risultato[riga['Date']] = riga
+    return risultato
+
+
+def osservazioni_dei_giorni(giorni, archivio=PERCORSO_ARCHIVIO, ore=None, citta=CITTA):
+    return leggi_osservazioni(archivio, giorni, ore, citta)
+
+
+def serie_temporali(granularita, finestra=None, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    return medie_serie(leggi_serie(granularita, archivio, citta), finestra)
@@ -0,0 +1,83 @@
+import http.client
+import json
+import os
+import socket
+import threading
+from datetime import date
+from urllib.parse import urlencode
+
+from meteo.configurazione import CITTA, INDIRIZZO_SERVIZIO, PERCORSO_ARCHIVIO
+from meteo.servizio import decodifica_aggregati, decodifica_osservazioni, indirizzo
+
+# Motore di calcolo che inoltra le interrogazioni al servizio di meteo.servizio: la dashboard non avvia né Spark né
+# letture dell'archivio, per cui più dashboard possono condividere un unico motore già avviato. L'archivio
+# interrogato è quello del servizio (il parametro 'archivio' viene ignorato) e i file di log vengono indicati con il
+# percorso assoluto, letto dal servizio. Ogni thread riusa la propria connessione al servizio, riaperta
+# automaticamente se viene chiusa
+
+CONNESSIONI = threading.local()
+
+
+class ConnessioneUnix(http.client.HTTPConnection):
+    # Connessione HTTP su un socket Unix
+    def __init__(self, percorso):
+        super().__init__('localhost')
+        self.percorso = percorso
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.percorso)
+
+
+def connessione():
+    if getattr(CONNESSIONI, 'connessione', None) is None:
+        famiglia, destinazione = indirizzo(INDIRIZZO_SERVIZIO)
+        if famiglia == 'unix':
+            CONNESSIONI.connessione = ConnessioneUnix(destinazione)
+        else:
+            CONNESSIONI.connessione = http.client.HTTPConnection(*destinazione)
+    return CONNESSIONI.connessione
+
+
+def richiesta(metodo, percorso, **parametri):
+    url = percorso + '?' + urlencode({nome: valore for nome, valore in parametri.items() if valore is not None})
+    for tentativo in range(2):
+        try:
+            collegamento = connessione()
+            collegamento.request(metodo, url)
+            risposta = collegamento.getresponse()
+            corpo = risposta.read()
+            break
+        except (ConnectionError, http.client.HTTPException):
+            # Connessione chiusa dal servizio (ad esempio perché riavviato): ne apriamo una nuova, una sola volta
+            collegamento.close()
+            CONNESSIONI.connessione = None
+            if tentativo:
+                raise
+    if risposta.status != 200:
+        raise RuntimeError(f"Il servizio di interrogazione ha risposto {risposta.status} a {metodo} {percorso}: "
+                           f"{json.loads(corpo)['errore']}")
+    return corpo
+
+
+def importa_log(sorgente, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    richiesta('POST', '/importa', citta=citta, sorgente=os.path.abspath(sorgente))
+
+
+def accoda_log(sorgente, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    giorni = richiesta('POST', '/accoda', citta=citta, sorgente=os.path.abspath(sorgente))
+    return [date.fromisoformat(giorno) for giorno in json.loads(giorni)]
+
+
+def aggregati_giornalieri(archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    return decodifica_aggregati(richiesta('GET', '/aggregati', citta=citta))
+
+
+def osservazioni_dei_giorni(giorni, archivio=PERCORSO_ARCHIVIO, ore=None, citta=CITTA):
+    return decodifica_osservazioni(richiesta('GET', '/osservazioni', citta=citta,
+                                             giorni=','.join(str(giorno) for giorno in giorni),
+                                             ore=None if ore is None else ','.join(str(secondi) for secondi in ore)))
+
+
+def serie_temporali(granularita, finestra=None, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    return decodifica_osservazioni(richiesta('GET', '/serie', citta=citta, granularita=granularita, finestra=finestra))
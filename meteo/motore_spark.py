@@ -0,0 +1,189 @@
+import os
+
+from pyspark.sql.functions import col
+
+from meteo.aggregati import aggregati_da_statistiche, aggregati_per_giorno, calcola_serie_orarie, \
+    calcola_sintesi_orarie, calcola_statistiche_giornaliere, fondi_serie, fondi_sintesi, fondi_statistiche, \
+    medie_serie, serie_giornaliere
+from meteo.archivio import percorso_aggregati, percorso_osservazioni, percorso_serie, percorso_sintesi, \
+    percorso_statistiche, prepara_archivio, segna_formato
+from meteo.climatologia import aggiorna_normali
+from meteo.configurazione import CITTA, PERCORSO_ARCHIVIO
+from meteo.preprocessing import SCHEMA_OSSERVAZIONI, crea_sessione_spark, deduplica, prepara_dati
+
+# Motore di calcolo basato su Spark, adatto ai log di grandi dimensioni
+
+
+def scrivi_osservazioni(df, archivio=PERCORSO_ARCHIVIO, modalita='overwrite', citta=CITTA):
+    # Scriviamo le rilevazioni pulite in formato Parquet partizionato per città e per giorno: ogni giorno finisce
+    # in una cartella 'Citta=<nome>/Date=AAAA-MM-GG' con le righe già ordinate per istante di rilevazione
+    df.repartition('Date').sortWithinPartitions('Date', 'Datetime') \
+        .write.mode(modalita).partitionBy('Date').parquet(percorso_osservazioni(archivio, citta))
+
+
+def scrivi_aggregati(aggregati, archivio=PERCORSO_ARCHIVIO, solo_giorni_presenti=False, citta=CITTA):
+    # Anche gli aggregati sono partizionati per giorno: con 'solo_giorni_presenti' vengono sostituite soltanto
+    # le partizioni dei giorni contenuti in 'aggregati', lasciando intatte tutte le altre
+    aggregati.repartition('Date').write.mode('overwrite') \
+        .option('partitionOverwriteMode', 'dynamic' if solo_giorni_presenti else 'static') \
+        .partitionBy('Date').parquet(percorso_aggregati(archivio, citta))
+
+
+def scrivi_sintesi(sintesi, archivio=PERCORSO_ARCHIVIO, solo_giorni_presenti=False, citta=CITTA):
+    # Sintesi orarie per le normali climatologiche, partizionate per giorno come gli aggregati
+    sintesi.repartition('Date').write.mode('overwrite') \
+        .option('partitionOverwriteMode', 'dynamic' if solo_giorni_presenti else 'static') \
+        .partitionBy('Date').parquet(percorso_sintesi(archivio, citta))
+
+
+def scrivi_statistiche(stati, archivio=PERCORSO_ARCHIVIO, solo_giorni_presenti=False, citta=CITTA):
+    # Statistiche incrementali di ogni giorno (vedi meteo.statistiche), partizionate per giorno come gli aggregati
+    stati.repartition('Date').write.mode('overwrite') \
+        .option('partitionOverwriteMode', 'dynamic' if solo_giorni_presenti else 'static') \
+        .partitionBy('Date').parquet(percorso_statistiche(archivio, citta))
+
+
+def scrivi_serie(serie, archivio=PERCORSO_ARCHIVIO, solo_giorni_presenti=False, citta=CITTA):
+    # Bucket orari per i grafici di tendenza (vedi meteo.serie), partizionati per giorno come gli aggregati
+    serie.repartition('Date').write.mode('overwrite') \
+        .option('partitionOverwriteMode', 'dynamic' if solo_giorni_presenti else 'static') \
+        .partitionBy('Date').parquet(percorso_serie(archivio, citta))
+
+
+def scrivi_archivio(spark, sorgente, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    # Ingestione batch: l'intero file di log viene pulito e riscritto nelle cartelle della città, senza toccare
+    # quelle delle altre città
+    prepara_archivio(archivio)
+    scrivi_osservazioni(prepara_dati(spark, sorgente), archivio, citta=citta)
+
+    # Le statistiche giornaliere, le sintesi orarie e i bucket orari vengono calcolati a partire dall'archivio appena
+    # scritto e salvati accanto ad esso; gli aggregati derivano dalle statistiche. Le normali climatologiche vengono
+    # ricalcolate prima di scrivere gli aggregati, il cui '_SUCCESS' segna la nuova versione dei dati
+    osservazioni = leggi_osservazioni(spark, archivio, citta=citta)
+    stati = calcola_statistiche_giornaliere(osservazioni)
+    scrivi_statistiche(stati, archivio, citta=citta)
+    scrivi_sintesi(calcola_sintesi_orarie(osservazioni), archivio, citta=citta)
+    scrivi_serie(calcola_serie_orarie(osservazioni), archivio, citta=citta)
+    aggiorna_normali(None, archivio, citta)
+    scrivi_aggregati(aggregati_da_statistiche(leggi_stati(spark, percorso_statistiche(archivio, citta), stati.schema)),
+                     archivio, citta=citta)
+    segna_formato(archivio)
+
+
+def istanti_presenti(spark, archivio=PERCORSO_ARCHIVIO, giorni=None, citta=CITTA):
+    # Chiavi ('Datetime') già presenti nell'archivio per i giorni indicati: viene letta soltanto la colonna
+    # 'Datetime' delle partizioni di quei giorni, per cui il costo non dipende dalla lunghezza dello storico
+    percorso = percorso_osservazioni(archivio, citta)
+    if not os.path.exists(percorso):
+        return None
+    return spark.read.schema(SCHEMA_OSSERVAZIONI).parquet(percorso) \
+        .filter(col('Date').isin(list(giorni))).select('Datetime')
+
+
+def fondi_con_archiviati(spark, nuovi, percorso, giorni, fondi):
+    # Stato dei giorni indicati calcolato dalle sole nuove rilevazioni, fuso con quello già archiviato per gli stessi
+    # giorni. Il risultato (poche righe per giorno) viene raccolto prima di sostituire le partizioni da cui è letto
+    if os.path.exists(percorso):
+        nuovi = fondi(nuovi.unionByName(leggi_stati(spark, percorso).filter(col('Date').isin(list(giorni)))))
+    return spark.createDataFrame(nuovi.collect(), nuovi.schema)
+
+
+def aggiorna_giorni(spark, nuove_osservazioni, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    # Ingestione incrementale: le nuove rilevazioni (già pulite) vengono accodate all'archivio e le statistiche,
+    # le sintesi, i bucket orari e gli aggregati dei soli giorni che le contengono vengono aggiornati con le sole
+    # righe nuove, senza rileggere quelle già archiviate
+    nuove_osservazioni = deduplica(nuove_osservazioni)
+    giorni = [riga['Date'] for riga in nuove_osservazioni.select('Date').distinct().collect()]
+    if not giorni:
+        return []
+
+    # Le rilevazioni già archiviate (ad esempio arrivate oltre il watermark dello stream o ripetute in un nuovo
+    # segmento del log) vengono scartate confrontandone l'istante con le chiavi dei soli giorni coinvolti
+    presenti = istanti_presenti(spark, archivio, giorni, citta)
+    if presenti is not None:
+        nuove_osservazioni = nuove_osservazioni.join(presenti, 'Datetime', 'left_anti').persist()
+        giorni = [riga['Date'] for riga in nuove_osservazioni.select('Date').distinct().collect()]
+        if not giorni:
+            nuove_osservazioni.unpersist()
+            return []
+
+    # Statistiche, sintesi e bucket vengono calcolati (e raccolti) prima di accodare le righe: dopo la scrittura il
+    # confronto con le chiavi già presenti scarterebbe anche le nuove rilevazioni, se Spark dovesse ricalcolarle
+    stati = fondi_con_archiviati(spark, calcola_statistiche_giornaliere(nuove_osservazioni),
+                                 percorso_statistiche(archivio, citta), giorni, fondi_statistiche)
+    sintesi = fondi_con_archiviati(spark, calcola_sintesi_orarie(nuove_osservazioni), percorso_sintesi(archivio, citta),
+                                   giorni, fondi_sintesi)
+    serie = fondi_con_archiviati(spark, calcola_serie_orarie(nuove_osservazioni), percorso_serie(archivio, citta),
+                                 giorni, fondi_serie)
+    scrivi_osservazioni(nuove_osservazioni, archivio, modalita='append', citta=citta)
+    scrivi_statistiche(stati, archivio, solo_giorni_presenti=True, citta=citta)
+    scrivi_sintesi(sintesi, archivio, solo_giorni_presenti=True, citta=citta)
+    scrivi_serie(serie, archivio, solo_giorni_presenti=True, citta=citta)
+    aggiorna_normali(giorni, archivio, citta)
+    scrivi_aggregati(aggregati_da_statistiche(stati), archivio, solo_giorni_presenti=True, citta=citta)
+    segna_formato(archivio)
+    nuove_osservazioni.unpersist()
+    return giorni
+
+
+def leggi_osservazioni(spark, archivio=PERCORSO_ARCHIVIO, giorni=None, ore=None, citta=CITTA):
+    # Con lo schema esplicito la colonna di partizione 'Date' viene letta come data senza inferenza dei tipi.
+    # Viene letta direttamente la cartella della città: le partizioni delle altre città non vengono nemmeno elencate
+    df = spark.read.schema(SCHEMA_OSSERVAZIONI).parquet(percorso_osservazioni(archivio, citta))
+
+    # Il filtro sulla colonna di partizione fa sì che Spark legga solo le cartelle dei giorni richiesti
+    if giorni is not None:
+        df = df.filter(col('Date').isin(list(giorni)))
+
+    # Fascia oraria (secondi dalla mezzanotte, estremi inclusi): il filtro viene passato al lettore Parquet, che
+    # usa i valori minimo e massimo di ogni blocco di righe (ordinate per istante) per saltare quelli esclusi
+    if ore is not None:
+        df = df.filter(col('Secondi').between(*ore))
+
+    # Spark sposta la colonna di partizione in fondo: ripristiniamo l'ordine delle colonne dichiarato nello schema
+    return df.select(*SCHEMA_OSSERVAZIONI.fieldNames()).orderBy('Datetime')
+
+
+def leggi_stati(spark, percorso, schema=None):
+    # Spark deduce il tipo della colonna di partizione 'Date': lo fissiamo a data anche con pochi giorni. Con lo
+    # schema indicato si legge anche una cartella senza partizioni (log vuoto o con la sola intestazione)
+    lettore = spark.read if schema is None else spark.read.schema(schema)
+    return lettore.parquet(percorso).withColumn('Date', col('Date').cast('date'))
+
+
+def leggi_aggregati(spark, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    return leggi_stati(spark, percorso_aggregati(archivio, citta))
+
+
+def leggi_serie(spark, granularita, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    # Bucket dell'intero storico della città (come meteo.motore_pandas.leggi_serie)
+    if granularita == 'ora':
+        return leggi_stati(spark, percorso_serie(archivio, citta))
+    if granularita == 'giorno':
+        return serie_giornaliere(leggi_stati(spark, percorso_statistiche(archivio, citta)))
+    raise ValueError(f"Granularità sconosciuta: '{granularita}'")
+
+
+# Interfaccia comune dei motori di calcolo (vedi meteo.motori)
+
+def importa_log(sorgente, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    scrivi_archivio(crea_sessione_spark(), sorgente, archivio, citta)
+
+
+def accoda_log(sorgente, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    spark = crea_sessione_spark()
+    prepara_archivio(archivio)
+    return aggiorna_giorni(spark, prepara_dati(spark, sorgente), archivio, citta)
+
+
+def aggregati_giornalieri(archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    return aggregati_per_giorno(leggi_aggregati(crea_sessione_spark(), archivio, citta))
+
+
+def osservazioni_dei_giorni(giorni, archivio=PERCORSO_ARCHIVIO, ore=None, citta=CITTA):
+    return leggi_osservazioni(crea_sessione_spark(), archivio, giorni, ore, citta).toPandas()
+
+
+def serie_temporali(granularita, finestra=None, archivio=PERCORSO_ARCHIVIO, citta=CITTA):
+    serie = medie_serie(leggi_serie(crea_sessione_spark(), granularita, archivio, citta), finestra)
+    return serie.toPandas().sort_values('Inizio', kind='stable', ignore_index=True)
@@ -0,0 +1,50 @@
+import os
+
+from meteo.archivio import dimensione_cartella
+from meteo.configurazione import LOG_CITTA, MOTORE, PERCORSO_ARCHIVIO, SOGLIA_MOTORE_PANDAS
+
+# Ogni motore di calcolo è un modulo che espone la stessa interfaccia:
+#   importa_log(sorgente, archivio, citta)                  -> pulisce il log della città e (ri)scrive le sue
+#                                                              partizioni dell'archivio Parquet
+#   accoda_log(sorgente, archivio, citta)                   -> accoda le rilevazioni del log non ancora archiviate
+#                                                              (confrontandone l'istante con quelle dei soli giorni
+#                                                              coinvolti) e restituisce i giorni aggiornati
+#   aggregati_giornalieri(archivio, citta)                  -> dizionario {data: aggregati del giorno}
+#   osservazioni_dei_giorni(giorni, archivio, ore, citta)   -> DataFrame pandas con le rilevazioni della città nei
+#                                                              giorni richiesti, ordinate per istante ed
+#                                                              eventualmente limitate alla fascia oraria 'ore'
+#                                                              (secondi dalla mezzanotte, estremi inclusi)
+#   serie_temporali(granularita, finestra, archivio, citta) -> DataFrame pandas con le medie dei campi numerici per
+#                                                              ogni ora o giorno ('ora'/'giorno') dello storico e,
+#                                                              con 'finestra' (in secondi), le medie mobili
+#                                                              'Mobile_<campo>' (vedi meteo.serie)
+# Il motore 'remoto' (meteo.motore_remoto) espone la stessa interfaccia inoltrando le chiamate al servizio di
+# interrogazione, che a sua volta usa uno dei motori locali elencati in MOTORI
+MOTORI = ['spark', 'pandas']
+
+
+def dimensione_dati(sorgenti=tuple(LOG_CITTA.values()), archivio=PERCORSO_ARCHIVIO):
+    # Dimensione dei dati da elaborare: la somma dei file di log presenti (per default quelli di tutte le città
+    # monitorate), altrimenti l'archivio già scritto
+    dimensioni = [os.path.getsize(sorgente) for sorgente in sorgenti if os.path.exists(sorgente)]
+    if dimensioni:
+        return sum(dimensioni)
+    return dimensione_cartella(archivio)
+
+
+def scegli_motore(nome=MOTORE, sorgenti=tuple(LOG_CITTA.values()), archivio=PERCORSO_ARCHIVIO):
+    # Con 'auto' i log piccoli e medi vengono elaborati con pandas/pyarrow, evitando l'avvio della JVM
+    if nome == 'auto':
+        nome = 'pandas' if dimensione_dati(sorgenti, archivio) < SOGLIA_MOTORE_PANDAS else 'spark'
+
+    # I moduli vengono importati solo quando servono, così il motore pandas non carica PySpark
+    if nome == 'pandas':
+        from meteo import motore_pandas as motore
+    elif nome == 'spark':
+        from meteo import motore_spark as motore
+    elif nome == 'remoto':
+        from meteo import motore_remoto as motore
+    else:
+        raise ValueError(f"Motore di calcolo sconosciuto: '{nome}' "
+                         f"(valori ammessi: auto, {', '.join(MOTORI)}, remoto)")
+    return motore
@@ -0,0 +1,26 @@
+import pandas as pd
+
+from meteo.configurazione import FUSO_ORARIO
+
+# Le rilevazioni conservano istanti (timestamp UNIX), giorni (date) e secondi dalla mezzanotte: le stringhe con gli
+# orari vengono prodotte solo al momento della visualizzazione, per le sole righe mostrate
+
+# Testo mostrato al posto di un orario o di una durata mancante
+NON_DISPONIBILE = 'n/d'
+
+
+def orari(secondi):
+    # Secondi dalla mezzanotte -> 'HH:MM:SS', per un'intera colonna
+    return pd.to_datetime(secondi, unit='s').dt.strftime('%H:%M:%S')
+
+
+def orario_locale(istante):
+    # Timestamp UNIX -> 'HH:MM:SS' nel fuso orario configurato ('n/d' se l'istante manca)
+    if istante is None:
+        return NON_DISPONIBILE
+    return pd.Timestamp(istante, unit='s', tz='UTC').tz_convert(FUSO_ORARIO).strftime('%H:%M:%S')
+
+
+def istanti_locali(istanti):
+    # Timestamp UNIX -> data e ora locali (senza fuso orario, per l'asse x dei grafici), per un'intera colonna
+    return pd.to_datetime(istanti, unit='s', utc=True).dt.tz_convert(FUSO_ORARIO).dt.tz_localize(None)
@@ -0,0 +1,45 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from meteo.configurazione import THREAD_LETTURE
+from meteo.diagnostica import contesto_spark
+
+# Esecuzione concorrente di operazioni indipendenti: invece di attendere una dopo l'altra, le richieste vengono
+# inviate insieme da un pool di thread e i risultati vengono raccolti alla fine, per cui il tempo complessivo si
+# avvicina a quello della più lenta. Nella dashboard riguarda solo i controlli e le ingestioni delle città
+# all'avvio: le pagine leggono gli aggregati della città e poi, in base ai giorni disponibili, al più un'altra
+# tabella dall'archivio, per cui non ci sono letture indipendenti da sovrapporre.
+# Con Spark, i thread ereditano le proprietà locali del chiamante (pool dello scheduler e job group) e i job di
+# ogni sessione utente vengono eseguiti nel pool FAIR della sessione
+
+
+def pool_spark(nome):
+    # Assegna i job lanciati dal thread corrente (e dai thread che ne ereditano le proprietà) al pool indicato
+    spark = contesto_spark()
+    if spark is not None:
+        spark.setLocalProperty('spark.scheduler.pool', re.sub(r'[^0-9A-Za-z_-]', '_', nome))
+
+
+def eredita(funzione):
+    # Con Spark, il thread che esegue la funzione eredita le proprietà locali del thread corrente
+    if contesto_spark() is None:
+        return funzione
+    from pyspark import inheritable_thread_target
+    return inheritable_thread_target(funzione)
+
+
+def in_parallelo(richieste, prepara_thread=None, massimo_thread=THREAD_LETTURE):
+    # 'richieste' associa un nome a una funzione senza argomenti; restituisce i risultati con gli stessi nomi.
+    # 'prepara_thread' viene eseguita in ogni thread prima della richiesta (ad esempio per collegarlo alla
+    # sessione Streamlit). Le eccezioni vengono propagate al chiamante
+    if len(richieste) <= 1 or massimo_thread <= 1:
+        return {nome: funzione() for nome, funzione in richieste.items()}
+
+    def esegui(funzione):
+        if prepara_thread is not None:
+            prepara_thread()
+        return funzione()
+
+    with ThreadPoolExecutor(max_workers=min(len(richieste), massimo_thread)) as esecutore:
+        futuri = {nome: esecutore.submit(eredita(esegui), funzione) for nome, funzione in richieste.items()}
+        return {nome: futuro.result() for nome, futuro in futuri.items()}
@@ -0,0 +1,87 @@
+from pyspark.sql import SparkSession
+from pyspark.sql.functions import col, hour, minute, round, second, to_date, trim
+from pyspark.sql.types import StructType, StructField, StringType, DoubleType, IntegerType, LongType, DateType
+
+from meteo.configurazione import CAMPI_TEMPERATURA, FUSO_ORARIO, PERCORSO_LOG
+
+# Schema del file di log grezzo: dichiararlo evita la scansione aggiuntiva richiesta da 'inferSchema'
+SCHEMA_LOG = StructType([
+    StructField('Weather', StringType()),
+    StructField('Description', StringType()),
+    StructField('Temperature', DoubleType()),
+    StructField('Feels_Like', DoubleType()),
+    StructField('Temp_Min', DoubleType()),
+    StructField('Temp_Max', DoubleType()),
+    StructField('Pressure', IntegerType()),
+    StructField('Humidity', IntegerType()),
+    StructField('Visibility', IntegerType()),
+    StructField('Wind_Speed', DoubleType()),
+    StructField('Wind_Gust', DoubleType()),
+    StructField('Wind_Deg', IntegerType()),
+    StructField('Clouds_Level', IntegerType()),
+    StructField('Datetime', LongType()),
+    StructField('Sunrise', LongType()),
+    StructField('Sunset', LongType())
+])
+
+# Schema dei dati puliti (temperature in Celsius) così come vengono memorizzati nell'archivio. Gli istanti restano
+# timestamp UNIX, affiancati dal giorno ('Date', di tipo data) e dai secondi trascorsi dalla mezzanotte ('Secondi')
+# nel fuso orario configurato: filtri e calcoli sono confronti e operazioni tra numeri, mentre le stringhe con
+# date e orari vengono prodotte solo al momento della visualizzazione
+SCHEMA_OSSERVAZIONI = StructType(
+    SCHEMA_LOG.fields + [
+        StructField('Secondi', IntegerType()),
+        StructField('Date', DateType())
+    ]
+)
+
+
+def crea_sessione_spark(configurazioni=None):
+    # Inizializziamo (o recuperiamo) la sessione Spark, con eventuali configurazioni aggiuntive.
+    # Il fuso orario della sessione determina la conversione dei timestamp UNIX in date e orari.
+    # Con lo scheduler FAIR i job lanciati da thread con pool diversi (ad esempio le sessioni della dashboard)
+    # si dividono le risorse invece di attendere in coda uno dopo l'altro
+    builder = SparkSession.builder.config('spark.sql.session.timeZone', FUSO_ORARIO) \
+        .config('spark.scheduler.mode', 'FAIR')
+    for chiave, valore in (configurazioni or {}).items():
+        builder = builder.config(chiave, valore)
+    return builder.getOrCreate()
+
+
+def prepara_dati(spark, percorso=PERCORSO_LOG):
+    # Carichiamo il file CSV con lo schema dichiarato, eliminando gli spazi che precedono ogni campo
+    df = spark.read.csv(percorso, header=True, schema=SCHEMA_LOG, sep=';', ignoreLeadingWhiteSpace=True,
+                        ignoreTrailingWhiteSpace=True)
+
+    # Rimozione delle istanze duplicate: il log ripete più volte la stessa rilevazione, identificata dall'istante
+    # 'Datetime'. Il confronto sulla sola chiave evita di calcolare l'hash di tutte le colonne di ogni riga
+    df = deduplica(df)
+
+    # Ordiniamo le righe in ordine crescente rispetto al campo 'Datetime'
+    df = df.orderBy(col('Datetime'))
+
+    return pulisci(df)
+
+
+def deduplica(df):
+    # Una sola rilevazione per istante; le righe senza istante non sono collocabili in alcun giorno e vengono scartate
+    return df.filter(col('Datetime').isNotNull()).dropDuplicates(['Datetime'])
+
+
+def pulisci(df):
+    # Trasformazioni applicate a ogni rilevazione, condivise dall'ingestione batch e da quella in streaming
+
+    # Rimozione degli spazi attorno ai campi testuali
+    df = df.withColumn('Weather', trim(col('Weather')))
+    df = df.withColumn('Description', trim(col('Description')))
+
+    # Conversione delle temperature da Kelvin a gradi Celsius
+    for campo in CAMPI_TEMPERATURA:
+        df = df.withColumn(campo, round(col(campo) - 273.15, 2))
+
+    # Giorno e secondi dalla mezzanotte della rilevazione, nel fuso orario della sessione
+    istante = col('Datetime').cast('timestamp')
+    df = df.withColumn('Date', to_date(istante))
+    df = df.withColumn('Secondi', hour(istante) * 3600 + minute(istante) * 60 + second(istante))
+
+    return df.select(*SCHEMA_OSSERVAZIONI.fieldNames())
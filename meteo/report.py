@@ -0,0 +1,178 @@
+import argparse
+import html
+import importlib.util
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from time import perf_counter
+
+import pandas as pd
+from plotly.offline import get_plotlyjs
+
+from meteo import motore_pandas
+from meteo.analitiche import VARIABILI, aerogrammi, grafico_direzioni, grafico_rosa, grafico_temporale, istogramma, \
+    tabella_ore_di_luce, tabella_scostamenti, tabella_valori_medi
+from meteo.climatologia import CAMPI_CLIMATOLOGIA, leggi_normali, normale
+from meteo.configurazione import CITTA, MOTORE, PERCORSO_ARCHIVIO
+from meteo.motori import MOTORI, scegli_motore
+from meteo.vento import media_circolare, punto_cardinale, rosa_dei_venti
+
+# Report statici delle tre analitiche, senza dashboard né browser: per ogni giorno dell'intervallo vengono prodotti
+# il grafico temporale di ogni variabile con la tabella dei valori medi (Analitica 1) e il grafico delle direzioni
+# con la rosa dei venti (Analitica 3); per ogni terna di giorni consecutivi il confronto tra le medie, gli
+# aerogrammi, lo scostamento dalle normali climatologiche e le ore di luce (Analitica 2). Grafici in HTML e/o PNG,
+# tabelle in Parquet o CSV.
+# Gli aggregati giornalieri e le normali vengono letti una sola volta dal processo principale (con il motore scelto)
+# e passati a tutti i processi del pool; ogni processo legge con pyarrow le sole partizioni dei giorni che gli vengono
+# assegnati, senza avviare una propria sessione Spark
+
+NOME_PLOTLY_JS = 'plotly.min.js'
+
+# Stato di ogni processo del pool, impostato da 'inizializza'
+STATO = {}
+
+
+def inizializza(aggregati, normali, archivio, citta, cartella, formati, formato_tabelle, numero_settori):
+    STATO.update(aggregati=aggregati, normali=normali, archivio=archivio, citta=citta, cartella=cartella,
+                 formati=formati, formato_tabelle=formato_tabelle, numero_settori=numero_settori)
+
+
+def scrivi_tabella(tabella, percorso):
+    # L'indice delle tabelle (campo, fase del giorno, settore) diventa la prima colonna
+    tabella = tabella.reset_index()
+    tabella.columns = [str(colonna) for colonna in tabella.columns]
+    if STATO['formato_tabelle'] == 'parquet':
+        tabella.to_parquet(percorso + '.parquet', index=False)
+    else:
+        tabella.to_csv(percorso + '.csv', index=False)
+
+
+def scrivi_pagina(cartella, nome, titolo, figure, tabelle, note=()):
+    # Una pagina HTML per analitica (che usa la copia di plotly.js nella cartella dei report) e/o un PNG per grafico,
+    # più un file per tabella
+    os.makedirs(cartella, exist_ok=True)
+    if 'html' in STATO['formati']:
+        plotly_js = os.path.relpath(os.path.join(STATO['cartella'], NOME_PLOTLY_JS), cartella)
+        parti = [f'<h1>{html.escape(titolo)}</h1>'] + [f'<p>{html.escape(nota)}</p>' for nota in note]
+        for titolo_figura, fig in figure:
+            parti.append(f'<h2>{html.escape(titolo_figura)}</h2>')
+            parti.append(fig.to_html(full_html=False, include_plotlyjs=False))
+        for titolo_tabella, tabella in tabelle:
+            parti.append(f'<h2>{html.escape(titolo_tabella)}</h2>')
+            parti.append(tabella.to_html())
+        with open(os.path.join(cartella, nome + '.html'), 'w', encoding='utf-8') as file:
+            file.write(f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{html.escape(titolo)}</title>'
+                       f'<script src="{plotly_js}"></script></head>\n<body>\n' + '\n'.join(parti) +
+                       '\n</body></html>\n')
+    if 'png' in STATO['formati']:
+        for indice, (_, fig) in enumerate(figure):
+            fig.write_image(os.path.join(cartella, f'{nome}_{indice + 1}.png'), width=1200, height=600)
+    for titolo_tabella, tabella in tabelle:
+        scrivi_tabella(tabella, os.path.join(cartella, f'{nome}_{titolo_tabella.lower().replace(" ", "_")}'))
+
+
+def report_giorno(giorno):
+    # Analitica 1 e Analitica 3 di un giorno, a partire da un'unica lettura delle sue rilevazioni
+    osservazioni = motore_pandas.osservazioni_dei_giorni([giorno], STATO['archivio'], citta=STATO['citta'])
+    cartella = os.path.join(STATO['cartella'], str(giorno))
+    scrivi_pagina(cartella, 'analitica1', f"{STATO['citta']}: analitiche del {giorno}",
+                  [(nome, grafico_temporale(osservazioni, variabile)) for nome, variabile in VARIABILI.items()],
+                  [('Valori medi', tabella_valori_medi(STATO['aggregati'][giorno]))])
+
+    numero_settori = STATO['numero_settori']
+    direzione, costanza = media_circolare(osservazioni['Wind_Deg'])
+    rosa = rosa_dei_venti(osservazioni, numero_settori)
+    nota = f"Il vento ha puntato prevalentemente verso {punto_cardinale(direzione, numero_settori)} " \
+           f"(direzione media {direzione:.1f}°, costanza {costanza:.2f})"
+    scrivi_pagina(cartella, 'analitica3', f"{STATO['citta']}: vento del {giorno}",
+                  [('Direzione del vento', grafico_direzioni(osservazioni)), ('Rosa dei venti', grafico_rosa(rosa))],
+                  [('Rosa dei venti', rosa)], [nota])
+    return len(osservazioni)
+
+
+def report_confronto(giorni):
+    # Analitica 2 di una terna di giorni, interamente dagli aggregati giornalieri
+    aggregati = [STATO['aggregati'][giorno] for giorno in giorni]
+    medie = pd.DataFrame([{nome: aggregati_giorno[variabile] for nome, variabile in VARIABILI.items()}
+                          for aggregati_giorno in aggregati], index=pd.Index(giorni, name='Giorno'))
+    ore_di_luce, differenza = tabella_ore_di_luce(giorni[0], giorni[-1], aggregati[0], aggregati[-1])
+    normali = [{variabile: normale(STATO['normali'], giorno, variabile) for variabile in CAMPI_CLIMATOLOGIA}
+               for giorno in giorni]
+    figure = [(nome, istogramma(giorni, aggregati, variabile, [normali_giorno.get(variabile)
+                                                               for normali_giorno in normali]))
+              for nome, variabile in VARIABILI.items()]
+    figure.append(('Condizioni meteorologiche', aerogrammi(giorni, aggregati)))
+    tabelle = [('Valori medi', medie), ('Ore di luce', ore_di_luce)]
+    if STATO['normali']:
+        tabelle.insert(1, ('Scostamento dalla norma', tabella_scostamenti(giorni, aggregati, normali)))
+    scrivi_pagina(os.path.join(STATO['cartella'], 'confronti', f'{giorni[0]}_{giorni[-1]}'), 'analitica2',
+                  f"{STATO['citta']}: confronto dal {giorni[0]} al {giorni[-1]}", figure, tabelle,
+                  [f"Differenza ore di luce tra il {giorni[0]} e il {giorni[-1]}: {differenza}"])
+
+
+def scrivi_indice(cartella, citta, giorni, terne):
+    collegamenti = [f'<li>{giorno}: <a href="{giorno}/analitica1.html">analitica 1</a>, '
+                    f'<a href="{giorno}/analitica3.html">analitica 3</a></li>' for giorno in giorni]
+    collegamenti += [f'<li>{terna[0]} - {terna[-1]}: <a href="confronti/{terna[0]}_{terna[-1]}/analitica2.html">'
+                     f'analitica 2</a></li>' for terna in terne]
+    with open(os.path.join(cartella, 'index.html'), 'w', encoding='utf-8') as file:
+        file.write(f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{html.escape(citta)}</title></head>\n'
+                   f'<body>\n<h1>Report meteo - {html.escape(citta)}</h1>\n<ul>\n' + '\n'.join(collegamenti) +
+                   '\n</ul>\n</body></html>\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report statici (HTML/PNG e Parquet/CSV) delle analitiche di una "
+                                                 "città per ogni giorno e per ogni terna di giorni consecutivi")
+    parser.add_argument('--archivio', default=PERCORSO_ARCHIVIO, help="cartella dell'archivio (default: %(default)s)")
+    parser.add_argument('--citta', default=CITTA, help="città delle rilevazioni (default: %(default)s)")
+    parser.add_argument('--dal', type=date.fromisoformat, help="primo giorno (AAAA-MM-GG, default: il primo "
+                                                               "disponibile)")
+    parser.add_argument('--al', type=date.fromisoformat, help="ultimo giorno (AAAA-MM-GG, default: l'ultimo "
+                                                              "disponibile)")
+    parser.add_argument('--uscita', default='report', help="cartella dei report (default: %(default)s)")
+    parser.add_argument('--formati', nargs='+', choices=['html', 'png'], default=['html'],
+                        help="formati dei grafici (default: html; png richiede il pacchetto kaleido)")
+    parser.add_argument('--tabelle', choices=['parquet', 'csv'], default='parquet',
+                        help="formato delle tabelle (default: %(default)s)")
+    parser.add_argument('--settori', type=int, choices=[8, 16], default=16,
+                        help="settori della rosa dei venti (default: %(default)s)")
+    parser.add_argument('--processi', type=int, default=os.cpu_count(),
+                        help="processi che producono i report (default: numero di CPU)")
+    parser.add_argument('--motore', choices=['auto'] + MOTORI, default=MOTORE,
+                        help="motore di calcolo degli aggregati (default: %(default)s)")
+    argomenti = parser.parse_args()
+    # La presenza di kaleido viene verificata senza importarlo
+    if 'png' in argomenti.formati and importlib.util.find_spec('kaleido') is None:
+        parser.error("l'esportazione dei grafici in PNG richiede il pacchetto 'kaleido'")
+
+    inizio = perf_counter()
+    motore = scegli_motore(argomenti.motore, (), argomenti.archivio)
+    aggregati = motore.aggregati_giornalieri(argomenti.archivio, argomenti.citta)
+    giorni = [giorno for giorno in sorted(aggregati) if (argomenti.dal is None or giorno >= argomenti.dal) and
+              (argomenti.al is None or giorno <= argomenti.al)]
+    terne = [tuple(giorni[indice:indice + 3]) for indice in range(len(giorni) - 2)]
+    if not giorni:
+        parser.error(f"nessuna rilevazione di {argomenti.citta} nell'intervallo richiesto")
+
+    cartella = os.path.join(argomenti.uscita, argomenti.citta)
+    os.makedirs(cartella, exist_ok=True)
+    with open(os.path.join(cartella, NOME_PLOTLY_JS), 'w', encoding='utf-8') as file:
+        file.write(get_plotlyjs())
+
+    # I processi vengono avviati con 'spawn': non ereditano lo stato (e l'eventuale JVM) del processo principale
+    stato = (aggregati, leggi_normali(argomenti.archivio, argomenti.citta), argomenti.archivio, argomenti.citta,
+             cartella, argomenti.formati, argomenti.tabelle, argomenti.settori)
+    processi = max(1, argomenti.processi)
+    with ProcessPoolExecutor(max_workers=processi, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=inizializza, initargs=stato) as esecutore:
+        righe = sum(esecutore.map(report_giorno, giorni, chunksize=max(1, len(giorni) // (processi * 4))))
+        list(esecutore.map(report_confronto, terne, chunksize=max(1, len(terne) // (processi * 4))))
+    scrivi_indice(cartella, argomenti.citta, giorni, terne)
+    print(f"Report di {len(giorni)} giorni ({righe} rilevazioni) e {len(terne)} confronti in "
+          f"{perf_counter() - inizio:.1f} s: {os.path.join(cartella, 'index.html')}")
+
+
+if __name__ == '__main__':
+    main()
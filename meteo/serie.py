@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from meteo.configurazione import CAMPI_NUMERICI
+
+# Serie temporali ricampionate e medie mobili per i grafici di tendenza su più giorni. Le rilevazioni vengono
+# ricondotte a bucket di ampiezza fissa (ore e giorni) di cui si conservano, per ogni campo numerico, il numero di
+# valori e la loro somma: i bucket orari vengono scritti nell'archivio insieme alle rilevazioni (e aggiornati con le
+# sole righe nuove, come le statistiche giornaliere), quelli giornalieri derivano dalle statistiche giornaliere di
+# meteo.statistiche. La media di un bucket è la somma divisa per il conteggio; la media mobile su una finestra di
+# ampiezza qualsiasi è la differenza tra due somme cumulate divisa per quella tra due conteggi cumulati, per cui
+# ogni finestra richiede un'unica scansione dei bucket, senza auto-join.
+# Gli stessi calcoli con Spark (con le funzioni finestra) sono in meteo.aggregati
+
+# Schema dei bucket: 'Inizio' è l'istante (timestamp UNIX) di inizio dell'ora locale oppure, per i bucket
+# giornalieri, la mezzanotte UTC del giorno, così che le finestre misurate in giorni contengano sempre giorni interi
+SCHEMA_SERIE = pa.schema(
+    [('Inizio', pa.int64())] +
+    [(f'{momento}_{campo}', pa.int64() if momento == 'conteggio' else pa.float64())
+     for campo in CAMPI_NUMERICI for momento in ('conteggio', 'somma')] +
+    [('Date', pa.date32())]
+)
+
+
+def calcola_serie_orarie(osservazioni):
+    # Bucket orari delle rilevazioni (come meteo.aggregati.calcola_serie_orarie): l'inizio dell'ora locale è
+    # l'istante della rilevazione meno i secondi trascorsi dall'inizio dell'ora
+    inizi = (osservazioni['Datetime'] - osservazioni['Secondi'] % 3600).rename('Inizio')
+    valori = osservazioni[CAMPI_NUMERICI].astype('float64').groupby([osservazioni['Date'], inizi])
+    serie = pd.concat({'conteggio': valori.count(), 'somma': valori.sum()}, axis=1)
+    serie.columns = [f'{momento}_{campo}' for momento, campo in serie.columns]
+    return serie.reset_index()[SCHEMA_SERIE.names]
+
+
+def fondi_serie(serie):
+    # Fonde i bucket con lo stesso inizio (ad esempio quelli archiviati e quelli delle nuove rilevazioni)
+    return serie.groupby(['Date', 'Inizio'], as_index=False).sum()[SCHEMA_SERIE.names]
+
+
+def aggiorna_serie_orarie(precedenti, nuove_osservazioni):
+    # Bucket dei giorni delle nuove rilevazioni, fusi con quelli già archiviati per gli stessi giorni (se presenti)
+    nuove = calcola_serie_orarie(nuove_osservazioni)
+    if precedenti is None or precedenti.empty:
+        return nuove
+    return fondi_serie(pd.concat([precedenti, nuove], ignore_index=True))
+
+
+def serie_giornaliere(stati):
+    # Bucket giornalieri a partire dalle statistiche giornaliere, che contengono già somme e conteggi di ogni campo
+    serie = stati.assign(Inizio=(pd.to_datetime(stati['Date']) - pd.Timestamp(0)) // pd.Timedelta(seconds=1))
+    return serie[SCHEMA_SERIE.names]
+
+
+def rapporto(somme, conteggi):
+    # Media dei bucket (o delle finestre): NaN dove non ci sono valori
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(conteggi > 0, somme / conteggi, np.nan)
+
+
+def medie_serie(serie, finestra=None):
+    # Media di ogni bucket e, con 'finestra' (in secondi), media mobile dei bucket con inizio in (t - finestra, t].
+    # Gli estremi delle finestre vengono individuati con una ricerca binaria sugli inizi ordinati, le somme e i
+    # conteggi delle finestre come differenze tra somme cumulate
+    serie = serie.sort_values('Inizio', kind='stable', ignore_index=True)
+    risultato = serie[['Inizio', 'Date']].copy()
+    somme = {campo: serie[f'somma_{campo}'].fillna(0).to_numpy(dtype='float64') for campo in CAMPI_NUMERICI}
+    conteggi = {campo: serie[f'conteggio_{campo}'].to_numpy(dtype='int64') for campo in CAMPI_NUMERICI}
+    for campo in CAMPI_NUMERICI:
+        risultato[campo] = rapporto(somme[campo], conteggi[campo])
+    if finestra is not None:
+        inizi = serie['Inizio'].to_numpy()
+        primi = np.searchsorted(inizi, inizi - finestra, side='right')
+        for campo in CAMPI_NUMERICI:
+            somme_cumulate = np.concatenate([[0.0], np.cumsum(somme[campo])])
+            conteggi_cumulati = np.concatenate([[0], np.cumsum(conteggi[campo])])
+            risultato[f'Mobile_{campo}'] = rapporto(somme_cumulate[1:] - somme_cumulate[primi],
+                                                    conteggi_cumulati[1:] - conteggi_cumulati[primi])
+    return risultato
@@ -0,0 +1,237 @@
+import argparse
+import json
+import os
+import socketserver
+import threading
+from datetime import date
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pyarrow as pa
+
+from meteo.archivio import blocco_citta, citta_disponibili, firma_archivio
+from meteo.configurazione import CARTELLA_INGESTIONE, INDIRIZZO_SERVIZIO, MOTORE, PERCORSO_ARCHIVIO, \
+    RISPOSTE_CACHE_SERVIZIO
+from meteo.diagnostica import formato_prometheus, misura, righe
+from meteo.motori import MOTORI, scegli_motore
+from meteo.parallelo import pool_spark
+
+# Servizio di interrogazione condiviso da più dashboard: un unico processo tiene aperta la sessione Spark (o il
+# motore pandas), conserva gli aggregati giornalieri e le risposte più recenti e risponde alle richieste delle
+# dashboard avviate con METEO_MOTORE=remoto (vedi meteo.motore_remoto) su HTTP o su un socket Unix:
+#   GET  /aggregati?citta=Napoli                              -> aggregati giornalieri (JSON)
+#   GET  /osservazioni?citta=Napoli&giorni=2023-05-31,...&ore=0,43199
+#                                                             -> rilevazioni (flusso IPC di Arrow)
+#   GET  /serie?citta=Napoli&granularita=ora&finestra=86400   -> medie dei bucket e medie mobili (flusso IPC di
+#                                                                Arrow)
+#   POST /importa?citta=Napoli&sorgente=Log.csv               -> ingestione del log della città
+#   POST /accoda?citta=Napoli&sorgente=segmento.csv           -> giorni aggiornati (JSON)
+#   GET  /metriche                                            -> misure delle operazioni e della cache (testo
+#                                                                Prometheus)
+# Le risposte sono in cache con la versione dei dati della città, per cui una nuova scrittura nell'archivio le
+# rende inutilizzabili. Le connessioni sono persistenti (HTTP/1.1): ogni dashboard riusa le proprie.
+# Le ingestioni della stessa città, anche se richieste da dashboard diverse, vengono eseguite una alla volta e
+# importano soltanto i file di log contenuti nella cartella di ingestione
+
+# Motore di calcolo, archivio e cartella di ingestione del servizio, impostati da 'avvia_servizio'
+SERVIZIO = {}
+
+
+def indirizzo(testo=INDIRIZZO_SERVIZIO):
+    # 'unix:<percorso>' -> ('unix', percorso); 'http://host:porta' -> ('tcp', (host, porta))
+    if testo.startswith('unix:'):
+        return 'unix', testo[len('unix:'):]
+    url = urlsplit(testo if '//' in testo else '//' + testo)
+    return 'tcp', (url.hostname or '127.0.0.1', url.port or 8765)
+
+
+def codifica_aggregati(aggregati):
+    return json.dumps({giorno.isoformat(): {**riga, 'Date': giorno.isoformat()}
+                       for giorno, riga in aggregati.items()}).encode()
+
+
+def decodifica_aggregati(corpo):
+    risultato = {}
+    for giorno, riga in json.loads(corpo).items():
+        riga['Date'] = date.fromisoformat(riga['Date'])
+        risultato[riga['Date']] = riga
+    return risultato
+
+
+def codifica_osservazioni(osservazioni):
+    tabella = pa.Table.from_pandas(osservazioni, preserve_index=False)
+    flusso = pa.BufferOutputStream()
+    with pa.ipc.new_stream(flusso, tabella.schema) as scrittore:
+        scrittore.write_table(tabella)
+    return flusso.getvalue().to_pybytes()
+
+
+def decodifica_osservazioni(corpo):
+    return pa.ipc.open_stream(corpo).read_all().to_pandas()
+
+
+@lru_cache(maxsize=64)
+def aggregati_giornalieri(citta, versione):
+    with misura('servizio: aggregati_giornalieri') as dettagli:
+        aggregati = SERVIZIO['motore'].aggregati_giornalieri(SERVIZIO['archivio'], citta)
+        dettagli['righe'] = righe(aggregati)
+    return codifica_aggregati(aggregati)
+
+
+@lru_cache(maxsize=RISPOSTE_CACHE_SERVIZIO)
+def osservazioni_dei_giorni(citta, giorni, ore, versione):
+    with misura('servizio: osservazioni_dei_giorni') as dettagli:
+        osservazioni = SERVIZIO['motore'].osservazioni_dei_giorni(list(giorni), SERVIZIO['archivio'], ore, citta)
+        dettagli['righe'] = righe(osservazioni)
+    return codifica_osservazioni(osservazioni)
+
+
+@lru_cache(maxsize=64)
+def serie_temporali(citta, granularita, finestra, versione):
+    with misura('servizio: serie_temporali') as dettagli:
+        serie = SERVIZIO['motore'].serie_temporali(granularita, finestra, SERVIZIO['archivio'], citta)
+        dettagli['righe'] = righe(serie)
+    return codifica_osservazioni(serie)
+
+
+def metriche():
+    # Misure delle operazioni più i successi e i fallimenti delle cache delle risposte
+    righe_testo = [formato_prometheus(), '# TYPE meteo_servizio_cache_successi_totali counter\n',
+                   '# TYPE meteo_servizio_cache_fallimenti_totali counter\n']
+    for nome, funzione in (('aggregati', aggregati_giornalieri), ('osservazioni', osservazioni_dei_giorni),
+                           ('serie', serie_temporali)):
+        statistiche = funzione.cache_info()
+        righe_testo.append(f'meteo_servizio_cache_successi_totali{{risposta="{nome}"}} {statistiche.hits}\n')
+        righe_testo.append(f'meteo_servizio_cache_fallimenti_totali{{risposta="{nome}"}} {statistiche.misses}\n')
+    return ''.join(righe_testo)
+
+
+def sorgente_ammessa(sorgente):
+    # Percorso del file di log da importare, che deve trovarsi nella cartella di ingestione (i percorsi relativi
+    # sono relativi a quella cartella)
+    cartella = os.path.realpath(SERVIZIO['ingestione'])
+    percorso = os.path.realpath(os.path.join(cartella, sorgente))
+    if os.path.commonpath([cartella, percorso]) != cartella:
+        raise ValueError(f"Il file di log '{sorgente}' non si trova nella cartella di ingestione '{cartella}'")
+    return percorso
+
+
+def esegui(metodo, percorso, parametri):
+    # Restituisce il tipo e il contenuto della risposta. I parametri mancanti o non validi sollevano
+    # KeyError o ValueError
+    motore, archivio = SERVIZIO['motore'], SERVIZIO['archivio']
+    if metodo == 'GET' and percorso == '/metriche':
+        return 'text/plain; version=0.0.4', metriche().encode()
+    citta = parametri['citta']
+    if metodo == 'GET' and percorso == '/aggregati':
+        return 'application/json', aggregati_giornalieri(citta, firma_archivio(archivio, citta))
+    if metodo == 'GET' and percorso == '/osservazioni':
+        # Senza giorni (parametro vuoto, che parse_qs scarta, oppure assente) il risultato è vuoto
+        giorni = tuple(sorted({date.fromisoformat(giorno) for giorno in parametri.get('giorni', '').split(',')
+                               if giorno}))
+        ore = tuple(int(secondi) for secondi in parametri['ore'].split(',')) if 'ore' in parametri else None
+        return 'application/vnd.apache.arrow.stream', \
+            osservazioni_dei_giorni(citta, giorni, ore, firma_archivio(archivio, citta))
+    if metodo == 'GET' and percorso == '/serie':
+        finestra = int(parametri['finestra']) if 'finestra' in parametri else None
+        return 'application/vnd.apache.arrow.stream', \
+            serie_temporali(citta, parametri['granularita'], finestra, firma_archivio(archivio, citta))
+    if metodo == 'POST' and percorso == '/importa':
+        sorgente = sorgente_ammessa(parametri['sorgente'])
+        with blocco_citta(citta), misura('servizio: importa_log'):
+            motore.importa_log(sorgente, archivio, citta)
+        return 'application/json', b'{}'
+    if metodo == 'POST' and percorso == '/accoda':
+        sorgente = sorgente_ammessa(parametri['sorgente'])
+        with blocco_citta(citta), misura('servizio: accoda_log'):
+            giorni = motore.accoda_log(sorgente, archivio, citta)
+        return 'application/json', json.dumps([giorno.isoformat() for giorno in sorted(giorni)]).encode()
+    raise ValueError(f"Richiesta sconosciuta: {metodo} {percorso}")
+
+
+class Richieste(BaseHTTPRequestHandler):
+    # HTTP/1.1: la connessione resta aperta tra una richiesta e l'altra
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # Con Spark, i job di ogni connessione (cioè di ogni dashboard) vengono eseguiti in un pool FAIR dedicato
+        pool_spark(f'connessione-{threading.get_ident()}')
+
+    def do_GET(self):
+        self.rispondi()
+
+    def do_POST(self):
+        self.rispondi()
+
+    def rispondi(self):
+        url = urlsplit(self.path)
+        parametri = {nome: valori[-1] for nome, valori in parse_qs(url.query).items()}
+        try:
+            stato, (tipo, corpo) = 200, esegui(self.command, url.path, parametri)
+        except (KeyError, ValueError) as errore:
+            stato, tipo, corpo = 400, 'application/json', json.dumps({'errore': repr(errore)}).encode()
+        except Exception as errore:
+            stato, tipo, corpo = 500, 'application/json', json.dumps({'errore': repr(errore)}).encode()
+        self.send_response(stato)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def address_string(self):
+        # Sui socket Unix il client non ha un indirizzo
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, formato, *argomenti):
+        pass
+
+
+class ServizioTcp(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class ServizioUnix(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def avvia_servizio(motore, archivio=PERCORSO_ARCHIVIO, indirizzo_servizio=INDIRIZZO_SERVIZIO,
+                   cartella_ingestione=CARTELLA_INGESTIONE):
+    SERVIZIO.update(motore=motore, archivio=archivio, ingestione=cartella_ingestione)
+
+    # Il motore viene avviato (e gli aggregati delle città già presenti caricati) prima di accettare richieste
+    for citta in citta_disponibili(archivio):
+        aggregati_giornalieri(citta, firma_archivio(archivio, citta))
+
+    famiglia, destinazione = indirizzo(indirizzo_servizio)
+    if famiglia == 'unix':
+        if os.path.exists(destinazione):
+            os.remove(destinazione)
+        server = ServizioUnix(destinazione, Richieste)
+    else:
+        server = ServizioTcp(destinazione, Richieste)
+    print(f"Servizio di interrogazione in ascolto su {indirizzo_servizio}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servizio di interrogazione dell'archivio condiviso dalle dashboard "
+                                                 "avviate con METEO_MOTORE=remoto")
+    parser.add_argument('--archivio', default=PERCORSO_ARCHIVIO, help="cartella dell'archivio (default: %(default)s)")
+    parser.add_argument('--indirizzo', default=INDIRIZZO_SERVIZIO,
+                        help="'http://host:porta' oppure 'unix:<percorso del socket>' (default: %(default)s)")
+    parser.add_argument('--motore', choices=['auto'] + MOTORI, default=MOTORE if MOTORE in MOTORI else 'auto',
+                        help="motore di calcolo (default: %(default)s)")
+    parser.add_argument('--ingestione', default=CARTELLA_INGESTIONE,
+                        help="cartella dei file di log che il servizio può importare (default: %(default)s)")
+    argomenti = parser.parse_args()
+    avvia_servizio(scegli_motore(argomenti.motore, (), argomenti.archivio), argomenti.archivio, argomenti.indirizzo,
+                   argomenti.ingestione)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from meteo.configurazione import CAMPI_NUMERICI
+
+# Statistiche incrementali di ogni giorno: per ogni campo numerico il numero di valori, la loro somma, la somma dei
+# quadrati degli scarti dalla media (M2, come nell'algoritmo di Welford), il minimo e il massimo, più le componenti
+# della direzione del vento, l'istogramma delle descrizioni e l'alba e il tramonto della prima rilevazione.
+# Lo stato di un giorno si fonde esattamente con quello delle nuove rilevazioni dello stesso giorno (formula di Chan
+# et al., scritta con le somme), per cui quando vengono accodate nuove rilevazioni lo stato viene aggiornato con le
+# sole righe nuove, senza rileggere quelle già archiviate, e gli aggregati giornalieri (medie, deviazioni standard,
+# estremi, descrizioni, ore di luce) ne derivano con un costo che non dipende dalle rilevazioni del giorno.
+# Gli stessi calcoli con Spark sono in meteo.aggregati
+
+# Momenti memorizzati per ogni campo numerico, nelle colonne '<momento>_<campo>'
+MOMENTI = ['conteggio', 'somma', 'm2', 'minimo', 'massimo']
+
+# Schema dello stato giornaliero, partizionato per giorno come le rilevazioni
+SCHEMA_STATISTICHE = pa.schema(
+    [(f'{momento}_{campo}', pa.int64() if momento == 'conteggio' else pa.float64())
+     for campo in CAMPI_NUMERICI for momento in MOMENTI] + [
+        ('somma_sin_vento', pa.float64()),
+        ('somma_cos_vento', pa.float64()),
+        ('conteggio_vento', pa.int64()),
+        ('Rilevazioni', pa.int64()),
+        ('Descrizioni', pa.map_(pa.string(), pa.int64())),
+        ('Prima_Rilevazione', pa.int64()),
+        ('Sunrise', pa.int64()),
+        ('Sunset', pa.int64()),
+        ('Date', pa.date32())
+    ]
+)
+
+
+def istogrammi(conteggi, giorni):
+    # Conteggi indicizzati per (giorno, descrizione) -> lista di coppie per ogni giorno, vuota per i giorni senza
+    # descrizioni
+    coppie = {giorno: [(descrizione, int(conteggio)) for descrizione, conteggio in gruppo.droplevel(0).items()]
+              for giorno, gruppo in conteggi.groupby(level=0)}
+    return pd.Series([coppie.get(giorno, []) for giorno in giorni], index=giorni, dtype=object)
+
+
+def calcola_statistiche_giornaliere(osservazioni):
+    # Stato di ogni giorno delle rilevazioni indicate (come meteo.aggregati.calcola_statistiche_giornaliere)
+    giorni = osservazioni['Date']
+    valori = osservazioni[CAMPI_NUMERICI].astype('float64').groupby(giorni)
+    conteggi = valori.count()
+    stati = pd.concat({'conteggio': conteggi, 'somma': valori.sum(), 'm2': valori.var(ddof=0).fillna(0) * conteggi,
+                       'minimo': valori.min(), 'massimo': valori.max()}, axis=1)
+    stati.columns = [f'{momento}_{campo}' for momento, campo in stati.columns]
+
+    # La direzione del vento viene sommata come versore (seno e coseno), per la media circolare
+    radianti = np.radians(osservazioni['Wind_Deg'].astype('float64'))
+    stati['somma_sin_vento'] = np.sin(radianti).groupby(giorni).sum()
+    stati['somma_cos_vento'] = np.cos(radianti).groupby(giorni).sum()
+    stati['conteggio_vento'] = radianti.groupby(giorni).count()
+    stati['Rilevazioni'] = giorni.groupby(giorni).size()
+
+    # Descrizioni come lista ordinata di coppie (descrizione, conteggio), la forma delle mappe in pyarrow. Le
+    # rilevazioni senza descrizione contano tra le rilevazioni del giorno ma non nell'istogramma (come in Spark)
+    stati['Descrizioni'] = istogrammi(osservazioni.groupby(['Date', 'Description']).size(), stati.index)
+
+    # Alba e tramonto vengono presi dalla prima rilevazione di ogni giorno
+    prime_rilevazioni = osservazioni.sort_values('Datetime', kind='stable').drop_duplicates('Date').set_index('Date')
+    stati['Prima_Rilevazione'] = prime_rilevazioni['Datetime']
+    stati['Sunrise'] = prime_rilevazioni['Sunrise']
+    stati['Sunset'] = prime_rilevazioni['Sunset']
+    return stati.rename_axis('Date').reset_index()[SCHEMA_STATISTICHE.names]
+
+
+def fondi_statistiche(stati):
+    # Fonde gli stati con lo stesso giorno (ad esempio quello archiviato e quello delle nuove rilevazioni).
+    # Per ogni campo: M2 = somma degli M2 + somma di S_i^2 / n_i - S^2 / N, dove S e N sono somme e conteggi
+    gruppi = stati.groupby('Date')
+    fusi = gruppi[[f'{momento}_{campo}' for campo in CAMPI_NUMERICI for momento in ('conteggio', 'somma', 'm2')] +
+                  ['somma_sin_vento', 'somma_cos_vento', 'conteggio_vento', 'Rilevazioni']].sum()
+    for campo in CAMPI_NUMERICI:
+        conteggio, somma = stati[f'conteggio_{campo}'], stati[f'somma_{campo}']
+        parziali = (somma ** 2 / conteggio).where(conteggio > 0, 0.0).groupby(stati['Date']).sum()
+        totale = (fusi[f'somma_{campo}'] ** 2 / fusi[f'conteggio_{campo}']).where(fusi[f'conteggio_{campo}'] > 0, 0.0)
+        fusi[f'm2_{campo}'] = (fusi[f'm2_{campo}'] + parziali - totale).clip(lower=0)
+        fusi[f'minimo_{campo}'] = gruppi[f'minimo_{campo}'].min()
+        fusi[f'massimo_{campo}'] = gruppi[f'massimo_{campo}'].max()
+
+    # Istogrammi delle descrizioni: somma dei conteggi di ogni descrizione
+    coppie = stati[['Date', 'Descrizioni']].explode('Descrizioni').dropna()
+    coppie = pd.DataFrame(coppie['Descrizioni'].tolist(), columns=['Description', 'count'], index=coppie['Date'])
+    fusi['Descrizioni'] = istogrammi(coppie.groupby(['Date', 'Description'])['count'].sum(), fusi.index)
+
+    # Alba e tramonto restano quelli della prima rilevazione tra tutti gli stati del giorno
+    prime = stati.loc[gruppi['Prima_Rilevazione'].idxmin()].set_index('Date')
+    for colonna in ('Prima_Rilevazione', 'Sunrise', 'Sunset'):
+        fusi[colonna] = prime[colonna]
+    return fusi.reset_index()[SCHEMA_STATISTICHE.names]
+
+
+def aggiorna_statistiche(precedenti, nuove_osservazioni):
+    # Stato dei giorni delle nuove rilevazioni, fuso con quello già archiviato per gli stessi giorni (se presente)
+    nuove = calcola_statistiche_giornaliere(nuove_osservazioni)
+    if precedenti is None or precedenti.empty:
+        return nuove
+    return fondi_statistiche(pd.concat([precedenti, nuove], ignore_index=True))
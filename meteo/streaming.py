@@ -0,0 +1,100 @@
+import argparse
+import os
+
+import pyspark
+from pyspark.sql.functions import col, from_csv
+
+from meteo.configurazione import CITTA, PERCORSO_ARCHIVIO
+from meteo.motore_spark import aggiorna_giorni
+from meteo.preprocessing import SCHEMA_LOG, crea_sessione_spark, pulisci
+
+# Opzioni di lettura del formato del log (separatore ';' e campi preceduti da spazi)
+OPZIONI_CSV = {'sep': ';', 'ignoreLeadingWhiteSpace': 'true', 'ignoreTrailingWhiteSpace': 'true'}
+
+# Connettore Kafka compatibile con la versione di PySpark installata (sovrascrivibile per altre versioni di Scala)
+PACCHETTO_KAFKA = os.environ.get("METEO_PACCHETTO_KAFKA",
+                                 f"org.apache.spark:spark-sql-kafka-0-10_2.12:{pyspark.__version__}")
+
+
+def stream_da_cartella(spark, cartella):
+    # Sorgente di test: ogni nuovo file CSV (con intestazione, nello stesso formato di Log.csv) depositato
+    # nella cartella viene letto come un nuovo blocco di rilevazioni
+    return spark.readStream.schema(SCHEMA_LOG).options(header='true', **OPZIONI_CSV).csv(cartella)
+
+
+def stream_da_kafka(spark, server, topic):
+    # Ogni messaggio del topic contiene una riga del log nel formato 'Weather;Description;...;Sunset'
+    messaggi = spark.readStream.format('kafka') \
+        .option('kafka.bootstrap.servers', server) \
+        .option('subscribe', topic) \
+        .option('startingOffsets', 'earliest') \
+        .load()
+    return messaggi.select(from_csv(col('value').cast('string'), SCHEMA_LOG.simpleString(), OPZIONI_CSV)
+                           .alias('rilevazione')).select('rilevazione.*')
+
+
+def deduplica(stream, ritardo_massimo):
+    # Le rilevazioni duplicate hanno lo stesso 'Datetime'. Il watermark sull'istante di rilevazione limita lo
+    # stato mantenuto da Spark: i duplicati che arrivano con più di 'ritardo_massimo' di ritardo vengono scartati
+    return stream.filter(col('Datetime').isNotNull()) \
+        .withColumn('Istante', col('Datetime').cast('timestamp')) \
+        .withWatermark('Istante', ritardo_massimo) \
+        .dropDuplicates(['Datetime', 'Istante']) \
+        .drop('Istante')
+
+
+def avvia_ingestione(spark, stream, archivio=PERCORSO_ARCHIVIO, checkpoint=None, ritardo_massimo='1 hour',
+                     intervallo='1 minute', una_volta=False, citta=CITTA):
+    def elabora_blocco(blocco, id_blocco):
+        # Ogni micro-batch viene pulito come nell'ingestione batch, accodato all'archivio e usato per
+        # aggiornare gli aggregati dei soli giorni coinvolti
+        nuove_osservazioni = pulisci(blocco).persist()
+        aggiorna_giorni(spark, nuove_osservazioni, archivio, citta)
+        nuove_osservazioni.unpersist()
+
+    scrittura = deduplica(stream, ritardo_massimo).writeStream \
+        .foreachBatch(elabora_blocco) \
+        .option('checkpointLocation', checkpoint or os.path.join(archivio, '_checkpoint', citta))
+
+    # Con 'una_volta' vengono elaborati i dati disponibili e poi il job termina (utile per esecuzioni pianificate)
+    if una_volta:
+        scrittura = scrittura.trigger(availableNow=True)
+    else:
+        scrittura = scrittura.trigger(processingTime=intervallo)
+
+    return scrittura.start()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ingestione in streaming delle rilevazioni meteo nell'archivio Parquet partizionato per città "
+                    "e per giorno")
+    parser.add_argument('--sorgente', choices=['kafka', 'cartella'], default='kafka',
+                        help="sorgente delle rilevazioni (default: %(default)s)")
+    parser.add_argument('--server', default='localhost:9092', help="bootstrap server Kafka (default: %(default)s)")
+    parser.add_argument('--topic', default='meteo', help="topic Kafka (default: %(default)s)")
+    parser.add_argument('--cartella', default='ingresso',
+                        help="cartella osservata con la sorgente 'cartella' (default: %(default)s)")
+    parser.add_argument('--archivio', default=PERCORSO_ARCHIVIO, help="cartella dell'archivio (default: %(default)s)")
+    parser.add_argument('--citta', default=CITTA, help="città delle rilevazioni (default: %(default)s)")
+    parser.add_argument('--checkpoint', default=None,
+                        help="cartella dei checkpoint dello stream (default: <archivio>/_checkpoint/<citta>)")
+    parser.add_argument('--ritardo-massimo', default='1 hour',
+                        help="watermark per la deduplicazione su 'Datetime' (default: %(default)s)")
+    parser.add_argument('--intervallo', default='1 minute', help="intervallo tra i micro-batch (default: %(default)s)")
+    parser.add_argument('--una-volta', action='store_true', help="elabora i dati disponibili e termina")
+    argomenti = parser.parse_args()
+
+    if argomenti.sorgente == 'kafka':
+        spark = crea_sessione_spark({'spark.jars.packages': PACCHETTO_KAFKA})
+        stream = stream_da_kafka(spark, argomenti.server, argomenti.topic)
+    else:
+        spark = crea_sessione_spark()
+        stream = stream_da_cartella(spark, argomenti.cartella)
+
+    avvia_ingestione(spark, stream, argomenti.archivio, argomenti.checkpoint, argomenti.ritardo_massimo,
+                     argomenti.intervallo, argomenti.una_volta, argomenti.citta).awaitTermination()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+# Analitiche vettoriali sulla direzione del vento, indipendenti dal motore di calcolo: lavorano sulle
+# rilevazioni restituite da osservazioni_dei_giorni, sia per un singolo giorno sia per intervalli lunghi
+
+# Punti cardinali della rosa dei venti a 8 e a 16 settori, in senso orario a partire dal Nord
+PUNTI_CARDINALI = {
+    8: ["Nord", "Nord-Est", "Est", "Sud-Est", "Sud", "Sud-Ovest", "Ovest", "Nord-Ovest"],
+    16: ["Nord", "Nord-Nord-Est", "Nord-Est", "Est-Nord-Est", "Est", "Est-Sud-Est", "Sud-Est", "Sud-Sud-Est",
+         "Sud", "Sud-Sud-Ovest", "Sud-Ovest", "Ovest-Sud-Ovest", "Ovest", "Ovest-Nord-Ovest", "Nord-Ovest",
+         "Nord-Nord-Ovest"]
+}
+
+# Estremi delle fasce di velocità del vento (m/s) usate dalla rosa dei venti
+FASCE_VELOCITA = [0, 2, 4, 6, 8, 10, np.inf]
+
+
+def componenti(gradi):
+    # Ogni direzione viene trattata come un versore: restituisce le somme di seno e coseno e il numero di
+    # direzioni valide, che possono essere sommate tra giorni diversi prima di calcolare la media
+    radianti = np.radians(np.asarray(gradi, dtype='float64'))
+    validi = ~np.isnan(radianti)
+    return np.sin(radianti[validi]).sum(), np.cos(radianti[validi]).sum(), int(validi.sum())
+
+
+def media_da_componenti(somma_sin, somma_cos, conteggio):
+    # Direzione media (gradi in [0, 360)) e lunghezza del vettore risultante medio (tra 0 e 1): una lunghezza
+    # vicina a 1 indica un vento dalla direzione costante, vicina a 0 una direzione variabile o indefinita
+    if conteggio == 0:
+        return float('nan'), float('nan')
+    direzione = np.degrees(np.arctan2(somma_sin, somma_cos)) % 360
+    return float(direzione), float(np.hypot(somma_sin, somma_cos) / conteggio)
+
+
+def media_circolare(gradi):
+    # A differenza della media aritmetica, la media di 350° e 10° è 0° e non 180°
+    return media_da_componenti(*componenti(gradi))
+
+
+def settori(gradi, numero_settori=8):
+    # Indice del settore di ciascuna direzione: ogni settore è centrato sul proprio punto cardinale, per cui
+    # le direzioni a ridosso dei 360° ricadono nel settore del Nord
+    ampiezza = 360 / numero_settori
+    return (np.floor((np.asarray(gradi, dtype='float64') % 360 + ampiezza / 2) / ampiezza) % numero_settori) \
+        .astype('int64')
+
+
+def punto_cardinale(angolo, numero_settori=8):
+    return PUNTI_CARDINALI[numero_settori][int(settori([angolo], numero_settori)[0])]
+
+
+def rosa_dei_venti(osservazioni, numero_settori=16, fasce=FASCE_VELOCITA):
+    # Istogramma bidimensionale direzione x velocità, in percentuale sul totale delle rilevazioni valide
+    valide = osservazioni[['Wind_Deg', 'Wind_Speed']].dropna()
+    indici_settore = settori(valide['Wind_Deg'], numero_settori)
+    indici_fascia = np.clip(np.digitize(valide['Wind_Speed'], fasce[1:-1]), 0, len(fasce) - 2)
+
+    # Un'unica bincount sugli indici combinati (settore, fascia) sostituisce i cicli sui gruppi
+    conteggi = np.bincount(indici_settore * (len(fasce) - 1) + indici_fascia,
+                           minlength=numero_settori * (len(fasce) - 1)).reshape(numero_settori, len(fasce) - 1)
+    percentuali = conteggi * 100 / max(len(valide), 1)
+
+    etichette_fasce = [f"{inizio}-{fine} m/s" if np.isfinite(fine) else f"> {inizio} m/s"
+                       for inizio, fine in zip(fasce[:-1], fasce[1:])]
+    return pd.DataFrame(percentuali, index=PUNTI_CARDINALI[numero_settori], columns=etichette_fasce)
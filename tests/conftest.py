@@ -0,0 +1,41 @@
+import os
+import shutil
+
+import pytest
+
+from meteo.motori import scegli_motore
+
+# Log.csv del repository, importato una sola volta per motore e condiviso dai test di confronto tra motori
+LOG_REPOSITORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Log.csv')
+
+
+def motore_disponibile(nome):
+    # Il motore Spark richiede PySpark e una JVM
+    if nome == 'spark':
+        pytest.importorskip('pyspark')
+        if not (os.environ.get('JAVA_HOME') or shutil.which('java')):
+            pytest.skip('Java non disponibile')
+    return scegli_motore(nome)
+
+
+@pytest.fixture(scope='session')
+def spark():
+    # Sessione Spark condivisa dai test che usano direttamente le funzioni di meteo.preprocessing e meteo.aggregati
+    motore_disponibile('spark')
+    from meteo.preprocessing import crea_sessione_spark
+    return crea_sessione_spark()
+
+
+@pytest.fixture(scope='session')
+def archivi_log(tmp_path_factory):
+    # Funzione nome del motore -> (motore, archivio con Log.csv importato come città 'Napoli')
+    archivi = {}
+
+    def archivio(nome):
+        if nome not in archivi:
+            motore = motore_disponibile(nome)
+            percorso = str(tmp_path_factory.mktemp(f'archivio_{nome}'))
+            motore.importa_log(LOG_REPOSITORY, percorso, 'Napoli')
+            archivi[nome] = motore, percorso
+        return archivi[nome]
+    return archivio
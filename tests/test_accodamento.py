@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from conftest import LOG_REPOSITORY, motore_disponibile
+
+
+def scrivi_segmento(percorso, righe, inizio, fine):
+    # Segmento del log con la propria intestazione, come quelli consegnati dal servizio di ingestione
+    percorso.write_text(righe[0] + ''.join(righe[1 + inizio:1 + fine]), encoding='utf-8')
+    return str(percorso)
+
+
+@pytest.mark.parametrize('nome', ['pandas', 'spark'])
+def test_segmenti_sovrapposti(archivi_log, tmp_path, nome):
+    # Importare il primo segmento e accodare gli altri (che si sovrappongono e ripetono rilevazioni già archiviate)
+    # produce lo stesso archivio dell'importazione dell'intero log
+    motore, archivio_completo = archivi_log(nome)
+    with open(LOG_REPOSITORY, encoding='utf-8') as file:
+        righe = file.readlines()
+    n = len(righe) - 1
+    segmenti = [scrivi_segmento(tmp_path / f'segmento_{i}.csv', righe, inizio, fine)
+                for i, (inizio, fine) in enumerate([(0, n // 3), (n // 4, 2 * n // 3), (n // 2, n)])]
+
+    archivio = str(tmp_path / 'archivio')
+    motore.importa_log(segmenti[0], archivio, 'Napoli')
+    assert motore.accoda_log(segmenti[1], archivio, 'Napoli')
+    assert motore.accoda_log(segmenti[2], archivio, 'Napoli')
+    # Un segmento già accodato non contiene rilevazioni nuove e non modifica nessun giorno
+    assert motore.accoda_log(segmenti[1], archivio, 'Napoli') == []
+
+    atteso = motore.aggregati_giornalieri(archivio_completo, 'Napoli')
+    ottenuto = motore.aggregati_giornalieri(archivio, 'Napoli')
+    assert ottenuto == atteso
+
+    giorni = sorted(atteso)
+    osservazioni = motore.osservazioni_dei_giorni(giorni, archivio, None, 'Napoli')
+    assert osservazioni['Datetime'].is_unique
+    assert osservazioni.equals(motore.osservazioni_dei_giorni(giorni, archivio_completo, None, 'Napoli'))
+    # Le somme orarie fuse possono differire da quelle calcolate in un solo passo per l'ordine delle addizioni
+    pd.testing.assert_frame_equal(motore.serie_temporali('ora', 3 * 3600, archivio, 'Napoli'),
+                                  motore.serie_temporali('ora', 3 * 3600, archivio_completo, 'Napoli'))
+
+
+def test_duplicati_nello_stesso_segmento(tmp_path):
+    # Le righe ripetute con lo stesso istante vengono conservate una sola volta, anche se accodate insieme
+    motore = motore_disponibile('pandas')
+    with open(LOG_REPOSITORY, encoding='utf-8') as file:
+        righe = file.readlines()
+    sorgente = tmp_path / 'log.csv'
+    sorgente.write_text(righe[0] + righe[1] * 3 + ''.join(righe[2:50]), encoding='utf-8')
+    archivio = str(tmp_path / 'archivio')
+    motore.accoda_log(str(sorgente), archivio, 'Napoli')
+    osservazioni = motore.osservazioni_dei_giorni(sorted(motore.aggregati_giornalieri(archivio, 'Napoli')), archivio,
+                                                  None, 'Napoli')
+    assert osservazioni['Datetime'].is_unique
+    assert sum(riga['Rilevazioni'] for riga in motore.aggregati_giornalieri(archivio, 'Napoli').values()) == \
+        len(osservazioni)
@@ -0,0 +1,22 @@
+import pytest
+
+from meteo.configurazione import CAMPI_NUMERICI
+
+
+@pytest.mark.parametrize('nome', ['pandas', 'spark'])
+def test_aggregati_dalle_rilevazioni(archivi_log, nome):
+    # Ogni riga della tabella degli aggregati riassume le rilevazioni del proprio giorno
+    motore, archivio = archivi_log(nome)
+    aggregati = motore.aggregati_giornalieri(archivio, 'Napoli')
+    for giorno, riga in aggregati.items():
+        osservazioni = motore.osservazioni_dei_giorni([giorno], archivio, None, 'Napoli')
+        assert riga['Rilevazioni'] == len(osservazioni)
+        for campo in CAMPI_NUMERICI:
+            assert riga[campo] == pytest.approx(osservazioni[campo].mean(), abs=0.01)
+            assert riga[f'Minimo_{campo}'] == osservazioni[campo].min()
+            assert riga[f'Massimo_{campo}'] == osservazioni[campo].max()
+            assert riga[f'Deviazione_{campo}'] == pytest.approx(osservazioni[campo].std(ddof=0), abs=0.01)
+        assert riga['Descrizioni'] == osservazioni['Description'].value_counts().to_dict()
+        prima = osservazioni.loc[osservazioni['Datetime'].idxmin()]
+        assert (riga['Sunrise'], riga['Sunset']) == (prima['Sunrise'], prima['Sunset'])
+        assert riga['Durata_Luce'] == riga['Sunset'] - riga['Sunrise']
@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+from meteo.analitiche import VARIABILI, aerogrammi, istogramma, tabella_ore_di_luce
+
+GIORNI = [date(2023, 6, 1) + timedelta(days=indice) for indice in range(6)]
+
+
+def aggregato(indice):
+    # Aggregati sintetici del giorno 'indice': le medie crescono con il giorno, le ore di luce di un minuto al giorno
+    return {**{campo: 20.0 + indice for campo in VARIABILI.values()},
+            'Descrizioni': {'clear sky': 10 + indice, 'few clouds': 5},
+            'Sunrise': 1685590000 + indice * 86400, 'Sunset': 1685643000 + indice * 86400 + indice * 60,
+            'Durata_Luce': 53000 + indice * 60}
+
+
+AGGREGATI = [aggregato(indice) for indice in range(len(GIORNI))]
+
+
+def test_istogramma_di_piu_giorni():
+    # Una barra per ogni giorno selezionato, qualunque sia il loro numero
+    fig = istogramma(GIORNI, AGGREGATI, 'Temperature')
+    (barre,) = fig.data
+    assert list(barre.x) == [giorno.strftime('%d/%m/%Y') for giorno in GIORNI]
+    assert list(barre.y) == [20.0 + indice for indice in range(len(GIORNI))]
+
+
+def test_aerogrammi_quattro_per_riga():
+    # Sei giorni: due righe di aerogrammi, al più quattro per riga
+    fig = aerogrammi(GIORNI, AGGREGATI)
+    assert len(fig.data) == len(GIORNI)
+    righe = [tuple(traccia.domain.y) for traccia in fig.data]
+    assert len(set(righe[:4])) == 1 and len(set(righe[4:])) == 1 and righe[0] != righe[4]
+    assert len({tuple(traccia.domain.x) for traccia in fig.data}) == 4
+    assert list(fig.data[5].values) == [15, 5]
+
+
+def test_ore_di_luce_tra_primo_e_ultimo_giorno():
+    tabella, differenza = tabella_ore_di_luce(GIORNI[0], GIORNI[-1], AGGREGATI[0], AGGREGATI[-1])
+    assert differenza == '0:05:00'
+    assert list(tabella.loc['Ore di Sole']) == ['14:43:20', '14:48:20']
@@ -0,0 +1,38 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import LOG_REPOSITORY, motore_disponibile
+from meteo.archivio import archivio_aggiornato, percorso_osservazioni, segna_formato
+
+
+@pytest.mark.parametrize('nome', ['pandas', 'spark'])
+def test_partizioni_giornaliere(archivi_log, nome):
+    # Una cartella 'Date=AAAA-MM-GG' per ogni giorno del log, con le sole rilevazioni di quel giorno
+    motore, archivio = archivi_log(nome)
+    giorni = sorted(motore.aggregati_giornalieri(archivio, 'Napoli'))
+    partizioni = sorted(nome for nome in os.listdir(percorso_osservazioni(archivio, 'Napoli'))
+                        if nome.startswith('Date='))
+    assert partizioni == [f'Date={giorno}' for giorno in giorni]
+    osservazioni = motore.osservazioni_dei_giorni(giorni[1:2], archivio, None, 'Napoli')
+    assert not osservazioni.empty and set(osservazioni['Date']) == {giorni[1]}
+
+
+def test_archivio_aggiornato(tmp_path):
+    # L'archivio va rigenerato se il log è più recente oppure se è stato scritto in un altro formato
+    sorgente, archivio = str(tmp_path / 'Log.csv'), str(tmp_path / 'archivio')
+    shutil.copy(LOG_REPOSITORY, sorgente)
+    assert not archivio_aggiornato(sorgente, archivio, 'Napoli')
+
+    motore_disponibile('pandas').importa_log(sorgente, archivio, 'Napoli')
+    assert archivio_aggiornato(sorgente, archivio, 'Napoli')
+
+    with open(os.path.join(archivio, '_FORMATO'), 'w') as file:
+        file.write('2')
+    assert not archivio_aggiornato(sorgente, archivio, 'Napoli')
+    segna_formato(archivio)
+
+    futuro = os.stat(sorgente).st_mtime + 60
+    os.utime(sorgente, (futuro, futuro))
+    assert not archivio_aggiornato(sorgente, archivio, 'Napoli')
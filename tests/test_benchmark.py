@@ -0,0 +1,37 @@
+import pandas as pd
+
+from meteo import benchmark
+from meteo.benchmark import genera_log, misura
+from meteo.motore_pandas import prepara_dati
+
+
+def test_genera_log(tmp_path):
+    # Esattamente 'righe' righe, metà rilevazioni duplicate in righe consecutive, contenuto indipendente dai blocchi
+    percorso = str(tmp_path / 'log.csv')
+    genera_log(percorso, 1000, giorni=3)
+    log = pd.read_csv(percorso, sep=';', encoding='utf-8-sig')
+    assert list(log.columns) == benchmark.CAMPI_LOG and len(log) == 1000
+    assert log['Datetime'].nunique() == 500 and log['Datetime'].is_monotonic_increasing
+    assert (log['Datetime'].max() - log['Datetime'].min()) < 3 * 86400
+    assert len(prepara_dati(percorso)) == 500
+
+    benchmark.RIGHE_PER_BLOCCO = 7
+    try:
+        genera_log(str(tmp_path / 'blocchi.csv'), 1000, giorni=3)
+    finally:
+        benchmark.RIGHE_PER_BLOCCO = 10 ** 6
+    assert pd.read_csv(tmp_path / 'blocchi.csv', sep=';', encoding='utf-8-sig')['Datetime'].equals(log['Datetime'])
+
+
+def test_misura_pandas(tmp_path):
+    # Ogni fase riporta la durata e la memoria residente, senza contatori Spark
+    sorgente = str(tmp_path / 'log.csv')
+    genera_log(sorgente, 2000, giorni=2)
+    fasi = misura('pandas', sorgente, str(tmp_path / 'archivio'))
+    assert [fase['fase'] for fase in fasi] == ['lettura_schema_inferito', 'lettura', 'deduplica_ordina', 'conversioni',
+                                               'importazione', 'analitica_1', 'analitica_2', 'analitica_3']
+    for fase in fasi:
+        assert fase['secondi'] >= 0 and fase['rss_mb'] > 0 and 'job_spark' not in fase
+    # Il picco è misurato dall'inizio del processo e non può diminuire da una fase all'altra
+    picchi = [fase['rss_picco_finora_mb'] for fase in fasi]
+    assert picchi == sorted(picchi)
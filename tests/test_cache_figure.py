@@ -0,0 +1,52 @@
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from meteo import cache_figure
+
+
+@pytest.fixture(autouse=True)
+def cache_vuota(monkeypatch):
+    monkeypatch.setattr(cache_figure, 'VOCI', OrderedDict())
+    monkeypatch.setattr(cache_figure, 'OCCUPAZIONE', {'byte': 0})
+
+
+def test_scarto_per_byte():
+    # Oltre il limite vengono scartate le voci usate meno di recente, quante ne servono per rientrare
+    for chiave in 'abc':
+        cache_figure.memorizza(chiave, chiave * 100, limite=350)
+    assert cache_figure.recupera('a') == 'a' * 100
+    cache_figure.memorizza('d', 'd' * 100, limite=350)
+    assert list(cache_figure.VOCI) == ['c', 'a', 'd'] and cache_figure.OCCUPAZIONE['byte'] == 300
+
+    # Una voce grande può scartarne più di una; una più grande del limite non viene conservata
+    cache_figure.memorizza('e', 'e' * 250, limite=350)
+    assert list(cache_figure.VOCI) == ['d', 'e'] and cache_figure.OCCUPAZIONE['byte'] == 350
+    cache_figure.memorizza('f', 'f' * 400, limite=350)
+    assert cache_figure.recupera('f') is None and cache_figure.OCCUPAZIONE['byte'] == 350
+
+
+def test_sostituzione_della_stessa_chiave():
+    cache_figure.memorizza('a', 'x' * 100, limite=1000)
+    cache_figure.memorizza('a', 'y' * 30, limite=1000)
+    assert cache_figure.recupera('a') == 'y' * 30 and cache_figure.OCCUPAZIONE['byte'] == 30
+
+
+def test_dimensione():
+    tabella = pd.DataFrame({'Descrizione': ['clear sky'] * 10, 'Valore': range(10)})
+    assert cache_figure.dimensione('àb') == 3
+    assert cache_figure.dimensione((tabella, 'ab')) == int(tabella.memory_usage(deep=True).sum()) + 2
+
+
+def test_figura_costruita_una_volta():
+    costruzioni = []
+
+    def costruisci():
+        costruzioni.append(1)
+        return go.Figure(go.Scatter(x=[1, 2, 3], y=[3, 1, 2]))
+
+    grafico = cache_figure.figura(('Analitica 1', 'Napoli'), costruisci)
+    assert cache_figure.figura(('Analitica 1', 'Napoli'), costruisci) is grafico
+    assert len(costruzioni) == 1 and grafico['punti'] == 3 and '"y":[3,1,2]' in grafico['spec']
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from meteo.campionamento import indici_etichette, lttb, riduci
+
+
+def test_lttb_estremi_e_dimensione():
+    # Primo e ultimo punto sempre mantenuti, esattamente 'punti' indici crescenti, picco e minimo conservati
+    valori = np.sin(np.linspace(0, 20, 5000))
+    valori[1234], valori[3210] = 10.0, -10.0
+    indici = lttb(valori, 200)
+    assert len(indici) == 200 and indici[0] == 0 and indici[-1] == len(valori) - 1
+    assert np.all(np.diff(indici) > 0)
+    assert 1234 in indici and 3210 in indici
+
+
+def test_lttb_serie_corte_e_valori_mancanti():
+    # Le serie con al più 'punti' valori restano intere; i valori mancanti non impediscono la scelta dei punti
+    assert list(lttb([1.0, 2.0, 3.0], 10)) == [0, 1, 2]
+    valori = np.arange(100, dtype='float64')
+    valori[10:20] = np.nan
+    assert len(lttb(valori, 10)) == 10
+
+
+def test_riduci_stesse_ascisse_per_tutte_le_tracce():
+    df = pd.DataFrame({'a': np.random.default_rng(0).normal(size=3000),
+                       'b': np.random.default_rng(1).normal(size=3000), 'Secondi': np.arange(3000)})
+    ridotto = riduci(df, ['a', 'b'], 500)
+    assert len(ridotto) <= 500
+    assert ridotto['Secondi'].is_monotonic_increasing
+    assert riduci(df.head(100), ['a', 'b'], 500).equals(df.head(100))
+
+
+def test_indici_etichette():
+    assert list(indici_etichette(0, 6)) == []
+    assert list(indici_etichette(13, 6)) == [0, 2, 4, 6, 8, 10, 12]
+    assert list(indici_etichette(3, 6)) == [0, 1, 2]
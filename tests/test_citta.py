@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from conftest import LOG_REPOSITORY, motore_disponibile
+from meteo.archivio import cartella_citta, citta_disponibili, firma_archivio
+
+
+@pytest.mark.parametrize('nome', ['pandas', 'spark'])
+def test_citta_indipendenti(tmp_path, nome):
+    # Due città nello stesso archivio: ciascuna ha le proprie partizioni e la reimportazione di una non tocca l'altra
+    motore = motore_disponibile(nome)
+    with open(LOG_REPOSITORY, encoding='utf-8') as file:
+        righe = file.readlines()
+    sorgente_roma = tmp_path / 'Roma.csv'
+    sorgente_roma.write_text(''.join(righe[:200]), encoding='utf-8')
+    vuoto = tmp_path / 'Vuoto.csv'
+    vuoto.write_text(righe[0], encoding='utf-8')
+    archivio = str(tmp_path / 'archivio')
+
+    motore.importa_log(LOG_REPOSITORY, archivio, 'Napoli')
+    motore.importa_log(str(sorgente_roma), archivio, 'Roma')
+    motore.importa_log(str(vuoto), archivio, 'Vuoto')
+    assert citta_disponibili(archivio) == ['Napoli', 'Roma']
+
+    napoli = motore.aggregati_giornalieri(archivio, 'Napoli')
+    roma = motore.aggregati_giornalieri(archivio, 'Roma')
+    assert set(roma) < set(napoli)
+    giorno = min(roma)
+    assert len(motore.osservazioni_dei_giorni([giorno], archivio, None, 'Roma')) < \
+        len(motore.osservazioni_dei_giorni([giorno], archivio, None, 'Napoli'))
+
+    versione_napoli = firma_archivio(archivio, 'Napoli')
+    motore.importa_log(str(sorgente_roma), archivio, 'Roma')
+    assert firma_archivio(archivio, 'Napoli') == versione_napoli
+    assert motore.aggregati_giornalieri(archivio, 'Napoli') == napoli
+
+
+@pytest.mark.parametrize('citta', ['', '../Napoli', 'Napoli/Centro', 'Citta=Roma', '.nascosta'])
+def test_nome_citta_non_valido(citta):
+    # I nomi che uscirebbero dalla cartella 'Citta=<nome>' o ne altererebbero il partizionamento vengono rifiutati
+    with pytest.raises(ValueError):
+        cartella_citta('dati', citta)
+
+
+def test_nome_citta_valido():
+    assert cartella_citta('dati', "Reggio nell'Emilia") == os.path.join('dati', "Citta=Reggio nell'Emilia")
@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from meteo.climatologia import CAMPI_CLIMATOLOGIA, INTERA_GIORNATA, calcola_normali, calcola_sintesi_orarie, \
+    fondi_sintesi, giorni_vicini, giorno_anno, leggi_normali, normale
+
+
+def osservazioni_sintetiche(giorni, per_giorno=96, seme=0):
+    # Rilevazioni ogni 15 minuti dei campi delle normali, con un valore mancante ogni tanto
+    generatore = np.random.default_rng(seme)
+    n = len(giorni) * per_giorno
+    osservazioni = pd.DataFrame({
+        'Date': np.repeat(np.array(giorni, dtype=object), per_giorno),
+        'Secondi': np.tile(np.arange(per_giorno) * (86400 // per_giorno), len(giorni)),
+        'Temperature': generatore.normal(20, 4, n).round(2),
+        'Pressure': generatore.normal(1013, 3, n).round(),
+        'Humidity': generatore.integers(30, 100, n).astype('float64'),
+        'Wind_Speed': generatore.gamma(2, 1.5, n).round(2)
+    })
+    osservazioni.loc[::17, 'Humidity'] = np.nan
+    return osservazioni
+
+
+def test_fusione_delle_sintesi():
+    # Le sintesi di due gruppi di rilevazioni dello stesso giorno, fuse, coincidono con quelle calcolate insieme
+    osservazioni = osservazioni_sintetiche([date(2023, 5, 31), date(2023, 6, 1)])
+    parti = [osservazioni.iloc[::2], osservazioni.iloc[1::2]]
+    fuse = fondi_sintesi(pd.concat([calcola_sintesi_orarie(parte) for parte in parti], ignore_index=True))
+    complete = calcola_sintesi_orarie(osservazioni)
+    chiavi = ['Date', 'Campo', 'Ora']
+    fuse, complete = (sintesi.sort_values(chiavi, ignore_index=True) for sintesi in (fuse, complete))
+    for campo in chiavi + ['Conteggio', 'Minimo', 'Massimo']:
+        assert fuse[campo].tolist() == complete[campo].tolist()
+    np.testing.assert_allclose(fuse['Media'], complete['Media'])
+    np.testing.assert_allclose(fuse['M2'], complete['M2'], atol=1e-9)
+    assert [list(classi) for classi in fuse['Classi']] == [list(classi) for classi in complete['Classi']]
+    assert [list(frequenze) for frequenze in fuse['Frequenze']] == [list(frequenze) for frequenze in
+                                                                      complete['Frequenze']]
+
+
+def test_normali_dalla_finestra():
+    # La normale di un giorno dell'anno riassume le rilevazioni dei giorni entro la finestra, di tutti gli anni
+    giorni = [date(anno, 6, 1) + timedelta(days=spostamento) for anno in (2021, 2022, 2023)
+              for spostamento in range(-4, 5)]
+    osservazioni = osservazioni_sintetiche(giorni)
+    normali = calcola_normali(calcola_sintesi_orarie(osservazioni), {giorno_anno(date(2023, 6, 1))}, finestra=2)
+    riga = normali[(normali['Campo'] == 'Temperature') & (normali['Ora'] == INTERA_GIORNATA)].iloc[0]
+
+    valori = osservazioni.loc[[abs((giorno - date(giorno.year, 6, 1)).days) <= 2 for giorno in osservazioni['Date']],
+                              'Temperature']
+    assert riga['Giorni'] == 15 and riga['Conteggio'] == len(valori) == 15 * 96
+    assert riga['Media'] == pytest.approx(valori.mean())
+    assert riga['Deviazione'] == pytest.approx(valori.std(ddof=0))
+    assert (riga['Minimo'], riga['Massimo']) == (valori.min(), valori.max())
+    # I quantili sono stimati dall'istogramma, con classi di 0,1 gradi
+    assert riga['P50'] == pytest.approx(valori.median(), abs=0.1)
+    assert riga['P05'] == pytest.approx(valori.quantile(0.05), abs=0.1)
+    assert riga['P95'] == pytest.approx(valori.quantile(0.95), abs=0.1)
+    assert set(normali['Campo']) == set(CAMPI_CLIMATOLOGIA)
+
+
+def test_finestra_circolare():
+    assert giorni_vicini({1}, 2) == {365, 366, 1, 2, 3}
+    assert giorno_anno(date(2023, 3, 1)) == giorno_anno(date(2024, 3, 1)) == 61
+
+
+def test_normali_dei_motori(archivi_log):
+    # Le sintesi calcolate dai due motori producono le stesse normali
+    _, archivio_pandas = archivi_log('pandas')
+    _, archivio_spark = archivi_log('spark')
+    normali_pandas, normali_spark = leggi_normali(archivio_pandas, 'Napoli'), leggi_normali(archivio_spark, 'Napoli')
+    assert sorted(normali_pandas) == sorted(normali_spark)
+    for chiave, riga in normali_pandas.items():
+        assert normali_spark[chiave] == pytest.approx(riga)
+    assert normale(normali_pandas, date(2023, 6, 1), 'Temperature')['Giorni'] == 3
+    assert normale(normali_pandas, date(2023, 6, 1), 'Visibility') is None
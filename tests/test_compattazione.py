@@ -0,0 +1,33 @@
+import pytest
+
+from meteo.compattazione import byte_occupati, compatta, espandi
+
+
+@pytest.mark.parametrize('nome', ['pandas', 'spark'])
+def test_andata_e_ritorno(archivi_log, nome):
+    # 'espandi' ricostruisce esattamente le rilevazioni restituite dal motore, occupando molta meno memoria
+    motore, archivio = archivi_log(nome)
+    osservazioni = motore.osservazioni_dei_giorni(sorted(motore.aggregati_giornalieri(archivio, 'Napoli')), archivio,
+                                                  None, 'Napoli')
+    compatte = compatta(osservazioni)
+    assert 'Sunrise' not in compatte['righe'] and len(compatte['giornaliere']) == osservazioni['Date'].nunique()
+    assert compatte['righe']['Humidity'].dtype == 'int8' and compatte['righe']['Temperature'].dtype == 'float32'
+    assert espandi(compatte).equals(osservazioni)
+    assert byte_occupati(compatte) < byte_occupati(osservazioni) / 3
+
+
+def test_valori_non_compattabili(archivi_log):
+    # Valori mancanti, fuori dall'intervallo del tipo compatto o con più cifre decimali restano nel tipo originale;
+    # alba e tramonto diversi nello stesso giorno restano per ogni riga
+    motore, archivio = archivi_log('pandas')
+    osservazioni = motore.osservazioni_dei_giorni([min(motore.aggregati_giornalieri(archivio, 'Napoli'))], archivio,
+                                                  None, 'Napoli')
+    osservazioni['Pressure'] = osservazioni['Pressure'].astype('float64')
+    osservazioni.loc[0, 'Pressure'] = None
+    osservazioni.loc[1, 'Visibility'] = 100000
+    osservazioni.loc[2, 'Temperature'] = 21.123456789
+    osservazioni.loc[3, 'Sunrise'] += 60
+    compatte = compatta(osservazioni)
+    for campo in ['Pressure', 'Visibility', 'Temperature', 'Sunrise']:
+        assert compatte['righe'][campo].dtype == osservazioni[campo].dtype
+    assert espandi(compatte).equals(osservazioni)
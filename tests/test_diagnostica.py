@@ -0,0 +1,52 @@
+from meteo import diagnostica
+
+
+def test_esportazione_limitata(tmp_path, monkeypatch):
+    # Il file viene riscritto alla prima misura e poi al più una volta per intervallo, non a ogni misura
+    percorso = tmp_path / 'metriche.prom'
+    monkeypatch.setattr(diagnostica, 'FILE_DIAGNOSTICA', str(percorso))
+    monkeypatch.setattr(diagnostica, 'INTERVALLO_DIAGNOSTICA', 3600)
+    monkeypatch.setattr(diagnostica, 'ULTIMA_ESPORTAZIONE', {'istante': 0.0})
+    monkeypatch.setattr(diagnostica, 'TOTALI', {})
+
+    diagnostica.registra('lettura', 'azione', 0.5, righe=10)
+    assert 'meteo_operazione_esecuzioni_totali{operazione="lettura",tipo="azione"} 1' in percorso.read_text()
+    diagnostica.registra('lettura', 'azione', 0.5, righe=10)
+    assert 'meteo_operazione_esecuzioni_totali{operazione="lettura",tipo="azione"} 1' in percorso.read_text()
+
+    diagnostica.esporta(str(percorso))
+    assert 'meteo_operazione_esecuzioni_totali{operazione="lettura",tipo="azione"} 2' in percorso.read_text()
+    assert [file.name for file in tmp_path.iterdir()] == ['metriche.prom']
+
+
+def test_misura_senza_spark():
+    with diagnostica.misura('prova') as dettagli:
+        dettagli['righe'] = 3
+    assert diagnostica.ultime_misure()[-1]['job_spark'] == []
+
+
+def test_misura_con_spark(spark):
+    # Vengono riportati soltanto i job lanciati all'interno del blocco, non quelli precedenti della sessione
+    spark.range(10).count()
+    with diagnostica.misura('conteggio') as dettagli:
+        dettagli['righe'] = spark.range(100).count()
+    misura = diagnostica.ultime_misure()[-1]
+    assert misura['operazione'] == 'conteggio' and misura['righe'] == 100
+    assert len(misura['job_spark']) >= 1
+    assert spark.sparkContext.getLocalProperty('spark.jobGroup.id') is None
+
+
+def test_formato_prometheus(monkeypatch):
+    monkeypatch.setattr(diagnostica, 'TOTALI', {})
+    monkeypatch.setattr(diagnostica, 'CONTATORI', {})
+    diagnostica.registra('grafico "vento"', 'grafico', 0.25, righe=40)
+    diagnostica.conta('cache_successi', 2)
+    testo = diagnostica.formato_prometheus()
+    assert 'meteo_operazione_righe_totali{operazione="grafico \\"vento\\"",tipo="grafico"} 40' in testo
+    assert 'meteo_cache_successi_totali 2' in testo
+
+
+def test_punti_figura():
+    import plotly.graph_objects as go
+    fig = go.Figure([go.Scatter(x=[1, 2, 3], y=[4, 5, 6]), go.Barpolar(r=[1, 2], theta=[0, 90])])
+    assert diagnostica.punti_figura(fig) == 5
@@ -0,0 +1,57 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from meteo.indice import FINE_GIORNO, INIZIO_GIORNO, finestra_oraria, istanti_finestra
+from meteo.orari import istanti_locali
+
+
+def rilevazioni_del_giorno(giorno):
+    # Una rilevazione ogni 5 minuti tra le mezzanotti locali (Europe/Rome) del giorno e del successivo
+    mezzanotti = pd.DatetimeIndex([pd.Timestamp(giorno), pd.Timestamp(giorno) + pd.Timedelta(days=1)]) \
+        .tz_localize('Europe/Rome')
+    inizio, fine = (mezzanotti - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+    istanti = np.arange(inizio, fine, 300)
+    locali = istanti_locali(pd.Series(istanti))
+    return pd.DataFrame({'Datetime': istanti,
+                         'Secondi': locali.dt.hour * 3600 + locali.dt.minute * 60 + locali.dt.second})
+
+
+def filtro_lineare(osservazioni, inizio, fine):
+    return osservazioni[osservazioni['Secondi'].between(inizio, fine)]
+
+
+# Giorno normale, passaggio all'ora legale (23 ore) e ritorno all'ora solare (25 ore)
+GIORNI = [date(2023, 5, 31), date(2023, 3, 26), date(2023, 10, 29)]
+
+
+@pytest.mark.parametrize('giorno', GIORNI)
+@pytest.mark.parametrize('inizio, fine', [(0, 3599), (6 * 3600, 12 * 3600), (3600, 4 * 3600), (20 * 3600, FINE_GIORNO)])
+def test_finestra_come_filtro_lineare(giorno, inizio, fine):
+    # Le fasce che comprendono per intero l'ora del cambio coincidono con il filtro sui secondi dalla mezzanotte
+    osservazioni = rilevazioni_del_giorno(giorno)
+    assert finestra_oraria(osservazioni, giorno, inizio, fine).equals(filtro_lineare(osservazioni, inizio, fine))
+
+
+def test_giornata_intera():
+    osservazioni = rilevazioni_del_giorno(GIORNI[2])
+    assert len(osservazioni) == 25 * 12
+    assert finestra_oraria(osservazioni, GIORNI[2], INIZIO_GIORNO, FINE_GIORNO) is osservazioni
+
+
+def test_orari_ambigui_e_inesistenti():
+    # Il 29/10/2023 le 02:30 ricorrono due volte: la fascia parte dalla prima occorrenza (ora legale, UTC+2) e
+    # termina all'ultima (ora solare, UTC+1)
+    inizio, fine = istanti_finestra(GIORNI[2], 2 * 3600 + 1800, 2 * 3600 + 1800)
+    assert fine - inizio == 3600
+    assert pd.Timestamp(inizio, unit='s') == pd.Timestamp('2023-10-29 00:30')
+    assert len(finestra_oraria(rilevazioni_del_giorno(GIORNI[2]), GIORNI[2], 2 * 3600 + 1800, 2 * 3600 + 1800)) == 13
+
+    # Il 26/03/2023 le 02:30 non esistono: l'estremo viene spostato alle 03:00 (ora legale)
+    inizio, fine = istanti_finestra(GIORNI[1], 2 * 3600 + 1800, 3 * 3600)
+    assert inizio == fine == pd.Timestamp('2023-03-26 01:00').value // 10 ** 9
+    osservazioni = rilevazioni_del_giorno(GIORNI[1])
+    assert finestra_oraria(osservazioni, GIORNI[1], 2 * 3600, 3 * 3600 + 1800).equals(
+        filtro_lineare(osservazioni, 3 * 3600, 3 * 3600 + 1800))
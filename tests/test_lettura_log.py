@@ -0,0 +1,46 @@
+from functools import partial
+
+import pyarrow as pa
+
+from conftest import LOG_REPOSITORY
+from meteo import motore_pandas
+from meteo.lettura_log import blocchi_log, leggi_log
+
+INTESTAZIONE = 'Weather;Description;Temperature;Feels_Like;Temp_Min;Temp_Max;Pressure;Humidity;Visibility;' \
+               'Wind_Speed;Wind_Gust;Wind_Deg;Clouds_Level;Datetime;Sunrise;Sunset\n'
+RIGA = ' Clear; clear sky; 295.85; 295.72; 293.18; 297.38;1014;59;10000; 2.06;{raffica};{direzione};0;1685516096;' \
+       '1685504074;1685557622\n'
+
+
+def test_campi_numerici_vuoti_diventano_nulli(tmp_path):
+    # Una raffica vuota e una direzione con un solo spazio non interrompono l'importazione
+    percorso = tmp_path / 'Log.csv'
+    righe = RIGA.format(raffica='', direzione=' ') + RIGA.format(raffica='3', direzione='90')
+    percorso.write_text(INTESTAZIONE + righe, encoding='utf-8')
+    log = leggi_log(str(percorso))
+    assert log.num_rows == 2
+    assert log.column('Wind_Gust').to_pylist() == [None, 3]
+    assert log.column('Wind_Deg').to_pylist() == [None, 90]
+    assert log.column('Description').to_pylist() == ['clear sky', 'clear sky']
+
+
+def test_blocchi_piccoli_come_lettura_intera():
+    # Con blocchi di pochi KB il log viene letto in molti RecordBatch che, concatenati, coincidono con la lettura
+    # in un unico blocco
+    blocchi = list(blocchi_log(LOG_REPOSITORY, 8 * 1024))
+    assert len(blocchi) > 10
+    assert max(blocco.nbytes for blocco in blocchi) < 64 * 1024
+    assert pa.Table.from_batches(blocchi).equals(leggi_log(LOG_REPOSITORY, 64 * 1024 * 1024))
+
+
+def test_importazione_a_blocchi_piccoli(archivi_log, tmp_path, monkeypatch):
+    # I giorni e i duplicati a cavallo di due blocchi vengono ricomposti: l'archivio non dipende dalla dimensione
+    # dei blocchi
+    motore, archivio_atteso = archivi_log('pandas')
+    monkeypatch.setattr(motore_pandas, 'blocchi_log', partial(blocchi_log, dimensione_blocco=8 * 1024))
+    archivio = str(tmp_path / 'archivio')
+    motore.importa_log(LOG_REPOSITORY, archivio, 'Napoli')
+    giorni = sorted(motore.aggregati_giornalieri(archivio_atteso, 'Napoli'))
+    assert motore.aggregati_giornalieri(archivio, 'Napoli') == motore.aggregati_giornalieri(archivio_atteso, 'Napoli')
+    assert motore.osservazioni_dei_giorni(giorni, archivio, None, 'Napoli').equals(
+        motore.osservazioni_dei_giorni(giorni, archivio_atteso, None, 'Napoli'))
@@ -0,0 +1,106 @@
+import pandas as pd
+import pytest
+
+from meteo.motori import dimensione_dati
+from conftest import motore_disponibile
+
+INTESTAZIONE = 'Weather;Description;Temperature;Feels_Like;Temp_Min;Temp_Max;Pressure;Humidity;Visibility;' \
+               'Wind_Speed;Wind_Gust;Wind_Deg;Clouds_Level;Datetime;Sunrise;Sunset\n'
+RIGA = ' Clear;{descrizione}; {temperatura}; 295.72; 293.18; 297.38;1014;59;10000; 2.06;0;{direzione};0;{istante};' \
+       '{alba};1685557622\n'
+ISTANTE = 1685516096
+
+
+def scrivi_log(percorso, descrizioni, primo_istante, direzione='0', alba='1685504074', temperatura='295.85'):
+    righe = [RIGA.format(descrizione=descrizione, istante=primo_istante + 60 * indice, direzione=direzione, alba=alba,
+                         temperatura=temperatura) for indice, descrizione in enumerate(descrizioni)]
+    percorso.write_text(INTESTAZIONE + ''.join(righe), encoding='utf-8')
+
+
+@pytest.mark.parametrize('nome', ['pandas', 'spark'])
+def test_descrizioni_nulle(tmp_path, nome):
+    # Le rilevazioni senza descrizione contano tra le rilevazioni del giorno ma non nell'istogramma, anche quando
+    # mancano tutte le descrizioni del giorno e quando il giorno viene aggiornato con nuove rilevazioni
+    motore = motore_disponibile(nome)
+    archivio, sorgente = str(tmp_path / 'archivio'), tmp_path / 'Log.csv'
+    scrivi_log(sorgente, [' clear sky', '', ' clear sky'], ISTANTE)
+    motore.importa_log(str(sorgente), archivio, 'Napoli')
+    scrivi_log(sorgente, ['', ' few clouds'], ISTANTE + 3600)
+    motore.accoda_log(str(sorgente), archivio, 'Napoli')
+    scrivi_log(sorgente, [' ', ''], ISTANTE + 86400)
+    motore.accoda_log(str(sorgente), archivio, 'Napoli')
+
+    aggregati = motore.aggregati_giornalieri(archivio, 'Napoli')
+    primo, secondo = sorted(aggregati)
+    assert aggregati[primo]['Rilevazioni'] == 5
+    assert aggregati[primo]['Descrizioni'] == {'clear sky': 2, 'few clouds': 1}
+    assert aggregati[secondo]['Rilevazioni'] == 2
+    assert aggregati[secondo]['Descrizioni'] == {}
+
+
+
+@pytest.mark.parametrize('nome', ['pandas', 'spark'])
+def test_alba_mancante(tmp_path, nome):
+    # Senza l'alba della prima rilevazione del giorno mancano anche le ore di luce, non gli aggregati della città
+    motore = motore_disponibile(nome)
+    archivio, sorgente = str(tmp_path / 'archivio'), tmp_path / 'Log.csv'
+    scrivi_log(sorgente, [' clear sky', ' clear sky'], ISTANTE, alba='')
+    motore.importa_log(str(sorgente), archivio, 'Napoli')
+
+    (aggregati,) = motore.aggregati_giornalieri(archivio, 'Napoli').values()
+    assert aggregati['Sunrise'] is None and aggregati['Durata_Luce'] is None
+    assert aggregati['Sunset'] == 1685557622
+    assert aggregati['Rilevazioni'] == 2
+
+
+
+@pytest.mark.parametrize('nome', ['pandas', 'spark'])
+def test_direzioni_del_vento_mancanti(tmp_path, nome):
+    # Senza direzioni valide nel giorno la direzione media e la costanza del vento mancano (None, non NaN)
+    motore = motore_disponibile(nome)
+    archivio, sorgente = str(tmp_path / 'archivio'), tmp_path / 'Log.csv'
+    scrivi_log(sorgente, [' clear sky', ' clear sky'], ISTANTE, direzione='')
+    motore.importa_log(str(sorgente), archivio, 'Napoli')
+
+    (aggregati,) = motore.aggregati_giornalieri(archivio, 'Napoli').values()
+    assert aggregati['Wind_Deg'] is None and aggregati['Costanza_Vento'] is None
+    assert aggregati['Rilevazioni'] == 2
+
+
+
+@pytest.mark.parametrize('nome', ['pandas', 'spark'])
+def test_temperature_arrotondate_come_in_spark(tmp_path, nome):
+    # 290.275 K = 17.125 °C: entrambi i motori arrotondano HALF_UP (17.13), non al pari più vicino (17.12)
+    motore = motore_disponibile(nome)
+    archivio, sorgente = str(tmp_path / 'archivio'), tmp_path / 'Log.csv'
+    scrivi_log(sorgente, [' clear sky'], ISTANTE, temperatura='290.275')
+    motore.importa_log(str(sorgente), archivio, 'Napoli')
+
+    (giorno,) = motore.aggregati_giornalieri(archivio, 'Napoli')
+    assert motore.osservazioni_dei_giorni([giorno], archivio, None, 'Napoli')['Temperature'].tolist() == [17.13]
+
+
+def test_dimensione_dati_somma_i_log_delle_citta(tmp_path):
+    # Con 'auto' conta la somma dei log presenti di tutte le città; senza log, la dimensione dell'archivio
+    napoli, roma, archivio = tmp_path / 'napoli.csv', tmp_path / 'roma.csv', tmp_path / 'archivio'
+    napoli.write_bytes(b'x' * 100)
+    roma.write_bytes(b'x' * 50)
+    archivio.mkdir()
+    (archivio / 'parte.parquet').write_bytes(b'x' * 10)
+    assert dimensione_dati([str(napoli), str(roma), str(tmp_path / 'assente.csv')], str(archivio)) == 150
+    assert dimensione_dati([], str(archivio)) == 10
+
+
+def test_motori_equivalenti(archivi_log):
+    # Aggregati giornalieri e rilevazioni di Log.csv identici con i due motori
+    motore_pandas, archivio_pandas = archivi_log('pandas')
+    motore_spark, archivio_spark = archivi_log('spark')
+    aggregati = motore_pandas.aggregati_giornalieri(archivio_pandas, 'Napoli')
+    assert len(aggregati) == 3
+    assert aggregati == motore_spark.aggregati_giornalieri(archivio_spark, 'Napoli')
+
+    giorni = sorted(aggregati)
+    osservazioni_pandas = motore_pandas.osservazioni_dei_giorni(giorni, archivio_pandas, None, 'Napoli')
+    osservazioni_spark = motore_spark.osservazioni_dei_giorni(giorni, archivio_spark, None, 'Napoli')
+    assert len(osservazioni_pandas) == sum(riga['Rilevazioni'] for riga in aggregati.values())
+    pd.testing.assert_frame_equal(osservazioni_pandas, osservazioni_spark, check_dtype=False)
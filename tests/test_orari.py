@@ -0,0 +1,50 @@
+import os
+import shutil
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from meteo.archivio import FORMATO_ARCHIVIO, archivio_aggiornato, formato_archivio
+from meteo.orari import istanti_locali, orari, orario_locale
+
+
+@pytest.mark.parametrize('nome', ['pandas', 'spark'])
+def test_tipi_nell_archivio(archivi_log, nome):
+    # Giorni come date e istanti come timestamp UNIX: gli orari derivano dagli istanti nel fuso configurato
+    motore, archivio = archivi_log(nome)
+    aggregati = motore.aggregati_giornalieri(archivio, 'Napoli')
+    assert all(type(giorno) is date and aggregati[giorno]['Date'] == giorno for giorno in aggregati)
+    assert isinstance(aggregati[date(2023, 5, 31)]['Sunrise'], int)
+
+    osservazioni = motore.osservazioni_dei_giorni([date(2023, 5, 31)], archivio, citta='Napoli')
+    for campo in ['Datetime', 'Sunrise', 'Sunset', 'Secondi']:
+        assert pd.api.types.is_integer_dtype(osservazioni[campo])
+    assert set(osservazioni['Date']) == {date(2023, 5, 31)}
+    locali = istanti_locali(osservazioni['Datetime'])
+    assert (locali.dt.hour * 3600 + locali.dt.minute * 60 + locali.dt.second).tolist() == \
+        osservazioni['Secondi'].tolist()
+
+
+def test_formattazione_orari():
+    # 1685516096 è il 31/05/2023 alle 08:54:56 a Roma (ora legale, UTC+2)
+    assert orario_locale(1685516096) == '08:54:56'
+    assert orari(pd.Series([0, 32096, 86399])).tolist() == ['00:00:00', '08:54:56', '23:59:59']
+    assert istanti_locali(pd.Series([1685516096])).iloc[0] == pd.Timestamp('2023-05-31 08:54:56')
+
+
+def test_formato_archivio_precedente(archivi_log, tmp_path):
+    # Un archivio senza il file '_FORMATO' o con un formato diverso non è aggiornato, anche se più recente del log
+    _, archivio = archivi_log('pandas')
+    copia = str(tmp_path / 'archivio')
+    shutil.copytree(archivio, copia)
+    sorgente = tmp_path / 'log.csv'
+    sorgente.write_text('')
+    os.utime(sorgente, ns=(0, 0))
+    assert formato_archivio(copia) == FORMATO_ARCHIVIO and archivio_aggiornato(str(sorgente), copia, 'Napoli')
+
+    with open(os.path.join(copia, '_FORMATO'), 'w') as file:
+        file.write('2')
+    assert formato_archivio(copia) == 2 and not archivio_aggiornato(str(sorgente), copia, 'Napoli')
+    os.remove(os.path.join(copia, '_FORMATO'))
+    assert formato_archivio(copia) == 1 and not archivio_aggiornato(str(sorgente), copia, 'Napoli')
@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+
+from meteo.parallelo import in_parallelo, pool_spark
+
+
+def test_richieste_concorrenti():
+    # Le tre richieste si attendono a vicenda: terminano solo se vengono eseguite contemporaneamente
+    barriera = threading.Barrier(3, timeout=10)
+    preparati = []
+
+    def richiesta(valore):
+        def esegui():
+            barriera.wait()
+            return valore, threading.current_thread().name
+        return esegui
+
+    risultati = in_parallelo({nome: richiesta(nome) for nome in ['a', 'b', 'c']},
+                             prepara_thread=lambda: preparati.append(threading.current_thread().name),
+                             massimo_thread=3)
+    assert list(risultati) == ['a', 'b', 'c'] and [valore for valore, _ in risultati.values()] == ['a', 'b', 'c']
+    assert sorted(preparati) == sorted(thread for _, thread in risultati.values())
+
+
+def test_richiesta_singola_nel_thread_corrente():
+    assert in_parallelo({'a': lambda: threading.current_thread()}) == {'a': threading.current_thread()}
+    assert in_parallelo({'a': lambda: 1, 'b': lambda: 2}, massimo_thread=1) == {'a': 1, 'b': 2}
+
+
+def test_eccezioni_propagate():
+    def fallisce():
+        raise ValueError('lettura non riuscita')
+
+    with pytest.raises(ValueError, match='lettura non riuscita'):
+        in_parallelo({'a': lambda: 1, 'b': fallisce}, massimo_thread=2)
+
+
+def test_pool_spark_ereditato(spark):
+    # I thread del pool eseguono i job nel pool FAIR della sessione che li ha avviati
+    contesto = spark.sparkContext
+    pool_spark('sessione 1')
+    try:
+        risultati = in_parallelo({nome: lambda: (contesto.getLocalProperty('spark.scheduler.pool'),
+                                                 spark.range(10).count()) for nome in ['a', 'b']}, massimo_thread=2)
+    finally:
+        contesto.setLocalProperty('spark.scheduler.pool', None)
+    assert risultati == {'a': ('sessione_1', 10), 'b': ('sessione_1', 10)}
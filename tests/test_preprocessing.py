@@ -0,0 +1,21 @@
+from datetime import date
+
+INTESTAZIONE = 'Weather;Description;Temperature;Feels_Like;Temp_Min;Temp_Max;Pressure;Humidity;Visibility;' \
+               'Wind_Speed;Wind_Gust;Wind_Deg;Clouds_Level;Datetime;Sunrise;Sunset\n'
+RIGA = ' Clear; clear sky; 295.85; 295.72; 293.18; 297.38;1014;59;10000; 2.06;0;0;0;{istante};1685504074;1685557622\n'
+
+
+def test_prepara_dati(spark, tmp_path):
+    # Le righe ripetute (stesso istante) compaiono una sola volta, in ordine di istante, con i campi testuali senza
+    # spazi, le temperature in gradi Celsius e giorno e secondi dalla mezzanotte nel fuso orario configurato
+    from meteo.preprocessing import prepara_dati
+    sorgente = tmp_path / 'Log.csv'
+    sorgente.write_text(INTESTAZIONE + ''.join(RIGA.format(istante=istante) for istante in
+                                               (1685516696, 1685516096, 1685516096, 1685516696)), encoding='utf-8')
+
+    righe = [riga.asDict() for riga in prepara_dati(spark, str(sorgente)).collect()]
+    assert [riga['Datetime'] for riga in righe] == [1685516096, 1685516696]
+    assert righe[0]['Weather'] == 'Clear' and righe[0]['Description'] == 'clear sky'
+    assert righe[0]['Temperature'] == 22.7
+    # 1685516096 è il 31/05/2023 alle 08:54:56 ora di Roma
+    assert righe[0]['Date'] == date(2023, 5, 31) and righe[0]['Secondi'] == 8 * 3600 + 54 * 60 + 56
@@ -0,0 +1,53 @@
+import importlib.util
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+from meteo import report
+
+
+def esegui_report(monkeypatch, *argomenti):
+    monkeypatch.setattr(sys, 'argv', ['meteo.report', *argomenti])
+    report.main()
+
+
+def test_report_di_un_archivio(archivi_log, tmp_path, monkeypatch, capsys):
+    # Una pagina per analitica e per giorno, una per ogni terna di giorni consecutivi e l'indice che le collega
+    motore, archivio = archivi_log('pandas')
+    giorni = sorted(motore.aggregati_giornalieri(archivio, 'Napoli'))
+    uscita = str(tmp_path / 'report')
+    esegui_report(monkeypatch, '--archivio', archivio, '--citta', 'Napoli', '--uscita', uscita, '--tabelle', 'csv',
+                  '--processi', '2', '--motore', 'pandas')
+    assert f'Report di {len(giorni)} giorni' in capsys.readouterr().out
+
+    cartella = os.path.join(uscita, 'Napoli')
+    indice = open(os.path.join(cartella, 'index.html'), encoding='utf-8').read()
+    for giorno in giorni:
+        for nome in ['analitica1.html', 'analitica3.html', 'analitica1_valori_medi.csv',
+                     'analitica3_rosa_dei_venti.csv']:
+            assert os.path.exists(os.path.join(cartella, str(giorno), nome))
+        assert f'{giorno}/analitica1.html' in indice
+    pagina = open(os.path.join(cartella, str(giorni[0]), 'analitica1.html'), encoding='utf-8').read()
+    assert '<script src="../plotly.min.js"></script>' in pagina
+    assert os.path.getsize(os.path.join(cartella, report.NOME_PLOTLY_JS)) > 1024 ** 2
+
+    confronto = os.path.join(cartella, 'confronti', f'{giorni[0]}_{giorni[2]}')
+    assert os.path.exists(os.path.join(confronto, 'analitica2.html'))
+    medie = pd.read_csv(os.path.join(confronto, 'analitica2_valori_medi.csv'))
+    assert medie['Giorno'].tolist() == [str(giorno) for giorno in giorni[:3]]
+
+
+def test_intervallo_senza_giorni(archivi_log, tmp_path, monkeypatch):
+    _, archivio = archivi_log('pandas')
+    with pytest.raises(SystemExit):
+        esegui_report(monkeypatch, '--archivio', archivio, '--citta', 'Napoli', '--uscita', str(tmp_path),
+                      '--dal', '2030-01-01', '--motore', 'pandas')
+
+
+@pytest.mark.skipif(importlib.util.find_spec('kaleido') is not None, reason='kaleido installato')
+def test_png_senza_kaleido(tmp_path, monkeypatch, capsys):
+    with pytest.raises(SystemExit):
+        esegui_report(monkeypatch, '--uscita', str(tmp_path), '--formati', 'png')
+    assert 'kaleido' in capsys.readouterr().err
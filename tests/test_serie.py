@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from meteo.configurazione import CAMPI_NUMERICI
+from meteo.serie import calcola_serie_orarie, fondi_serie, medie_serie
+
+
+def media_mobile_ingenua(osservazioni, inizi, finestra, campo):
+    # Per ogni bucket, media dei valori delle rilevazioni con inizio dell'ora in (t - finestra, t]
+    ore = osservazioni['Datetime'] - osservazioni['Secondi'] % 3600
+    return [osservazioni.loc[(ore > inizio - finestra) & (ore <= inizio), campo].mean() for inizio in inizi]
+
+
+@pytest.mark.parametrize('finestra', [3600, 3 * 3600, 24 * 3600])
+def test_media_mobile_come_calcolo_ingenuo(archivi_log, finestra):
+    # Le ore senza rilevazioni non sono bucket: la finestra è misurata sugli istanti, non sul numero di bucket
+    motore, archivio = archivi_log('pandas')
+    osservazioni = motore.osservazioni_dei_giorni(sorted(motore.aggregati_giornalieri(archivio, 'Napoli')), archivio,
+                                                  None, 'Napoli')
+    osservazioni = osservazioni[(osservazioni['Secondi'] // 3600) % 5 != 2].reset_index(drop=True)
+    osservazioni.loc[::7, 'Wind_Gust'] = np.nan
+    medie = medie_serie(calcola_serie_orarie(osservazioni), finestra)
+    assert medie['Inizio'].is_monotonic_increasing
+    for campo in ['Temperature', 'Wind_Gust']:
+        np.testing.assert_allclose(medie[f'Mobile_{campo}'],
+                                   media_mobile_ingenua(osservazioni, medie['Inizio'], finestra, campo))
+    if finestra == 3600:
+        np.testing.assert_allclose(medie['Mobile_Temperature'], medie['Temperature'])
+
+
+def test_bucket_senza_valori():
+    # Un bucket senza valori di un campo ha media mancante; la media mobile usa gli altri bucket della finestra
+    serie = pd.DataFrame({'Inizio': [0, 3600, 7200], 'Date': [pd.Timestamp(0).date()] * 3})
+    for campo in CAMPI_NUMERICI:
+        serie[f'conteggio_{campo}'] = [2, 0, 1]
+        serie[f'somma_{campo}'] = [10.0, np.nan, 8.0]
+    medie = medie_serie(serie, 7200)
+    assert np.isnan(medie['Temperature'][1])
+    assert medie['Mobile_Temperature'].tolist() == [5.0, 5.0, 8.0]
+    assert list(medie_serie(serie).columns) == ['Inizio', 'Date'] + CAMPI_NUMERICI
+
+
+def test_fusione_dei_bucket(archivi_log):
+    motore, archivio = archivi_log('pandas')
+    osservazioni = motore.osservazioni_dei_giorni(sorted(motore.aggregati_giornalieri(archivio, 'Napoli')), archivio,
+                                                  None, 'Napoli')
+    parti = [calcola_serie_orarie(osservazioni.iloc[resto::3]) for resto in range(3)]
+    fusi = fondi_serie(pd.concat(parti, ignore_index=True))
+    pd.testing.assert_frame_equal(fusi, calcola_serie_orarie(osservazioni), check_dtype=False)
+
+
+@pytest.mark.parametrize('granularita, finestra', [('ora', 6 * 3600), ('giorno', 2 * 86400), ('giorno', None)])
+def test_motori_concordi(archivi_log, granularita, finestra):
+    # Stesse serie (a meno degli errori di arrotondamento delle somme) con la funzione finestra di Spark
+    motore_pandas, archivio_pandas = archivi_log('pandas')
+    motore_spark, archivio_spark = archivi_log('spark')
+    pd.testing.assert_frame_equal(motore_spark.serie_temporali(granularita, finestra, archivio_spark, 'Napoli'),
+                                  motore_pandas.serie_temporali(granularita, finestra, archivio_pandas, 'Napoli'))
@@ -0,0 +1,106 @@
+import shutil
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import LOG_REPOSITORY
+from meteo import motore_remoto
+from meteo.motori import scegli_motore
+from meteo.servizio import SERVIZIO, avvia_servizio, decodifica_osservazioni, esegui
+
+INTESTAZIONE = 'Weather;Description;Temperature;Feels_Like;Temp_Min;Temp_Max;Pressure;Humidity;Visibility;' \
+               'Wind_Speed;Wind_Gust;Wind_Deg;Clouds_Level;Datetime;Sunrise;Sunset\n'
+RIGA = ' Clear; clear sky; 295.85; 295.72; 293.18; 297.38;1014;59;10000; 2.06;0;0;0;1685516096;1685504074;1685557622\n'
+
+
+@pytest.fixture
+def servizio(tmp_path):
+    sorgente, archivio = tmp_path / 'Log.csv', str(tmp_path / 'archivio')
+    sorgente.write_text(INTESTAZIONE + RIGA, encoding='utf-8')
+    motore = scegli_motore('pandas')
+    motore.importa_log(str(sorgente), archivio, 'Napoli')
+    SERVIZIO.update(motore=motore, archivio=archivio, ingestione=str(tmp_path))
+    yield
+    SERVIZIO.clear()
+
+
+@pytest.mark.parametrize('parametri', [{'citta': 'Napoli'}, {'citta': 'Napoli', 'giorni': ''}])
+def test_osservazioni_senza_giorni(servizio, parametri):
+    # Senza giorni la risposta è un flusso Arrow vuoto, non un errore
+    tipo, corpo = esegui('GET', '/osservazioni', parametri)
+    osservazioni = decodifica_osservazioni(corpo)
+    assert tipo == 'application/vnd.apache.arrow.stream'
+    assert osservazioni.empty and 'Temperature' in osservazioni.columns
+
+
+def test_osservazioni_dei_giorni(servizio):
+    tipo, corpo = esegui('GET', '/osservazioni', {'citta': 'Napoli', 'giorni': '2023-05-31'})
+    assert len(decodifica_osservazioni(corpo)) == 1
+
+
+def test_importa_solo_dalla_cartella_di_ingestione(servizio, tmp_path):
+    with pytest.raises(ValueError, match='cartella di ingestione'):
+        esegui('POST', '/importa', {'citta': 'Napoli', 'sorgente': '/etc/passwd'})
+    with pytest.raises(ValueError, match='cartella di ingestione'):
+        esegui('POST', '/accoda', {'citta': 'Napoli', 'sorgente': '../Log.csv'})
+    # I percorsi relativi sono relativi alla cartella di ingestione
+    assert esegui('POST', '/accoda', {'citta': 'Napoli', 'sorgente': 'Log.csv'}) == ('application/json', b'[]')
+
+
+def test_scritture_della_stessa_citta_in_sequenza(tmp_path):
+    # Due ingestioni concorrenti della stessa città non si sovrappongono
+    in_corso, sovrapposte = [], []
+
+    def importa_log(sorgente, archivio, citta):
+        in_corso.append(citta)
+        sovrapposte.append(in_corso.count(citta) > 1)
+        time.sleep(0.05)
+        in_corso.remove(citta)
+
+    (tmp_path / 'Log.csv').write_text(INTESTAZIONE, encoding='utf-8')
+    SERVIZIO.update(motore=SimpleNamespace(importa_log=importa_log), archivio=str(tmp_path / 'archivio'),
+                    ingestione=str(tmp_path))
+    try:
+        thread = [threading.Thread(target=esegui, args=('POST', '/importa', {'citta': 'Napoli', 'sorgente': 'Log.csv'}))
+                  for _ in range(4)]
+        for singolo in thread:
+            singolo.start()
+        for singolo in thread:
+            singolo.join()
+    finally:
+        SERVIZIO.clear()
+    assert len(sovrapposte) == 4 and not any(sovrapposte)
+
+
+def test_motore_remoto(tmp_path, monkeypatch):
+    # Le interrogazioni inoltrate al servizio (su un socket Unix) restituiscono gli stessi risultati del motore locale
+    locale = scegli_motore('pandas')
+    sorgente = tmp_path / 'Log.csv'
+    shutil.copy(LOG_REPOSITORY, sorgente)
+    indirizzo_servizio = f"unix:{tmp_path / 'servizio.sock'}"
+    monkeypatch.setattr(motore_remoto, 'INDIRIZZO_SERVIZIO', indirizzo_servizio)
+    monkeypatch.setattr(motore_remoto.CONNESSIONI, 'connessione', None, raising=False)
+    archivio = str(tmp_path / 'archivio')
+    threading.Thread(target=avvia_servizio, args=(locale, archivio, indirizzo_servizio, str(tmp_path)),
+                     daemon=True).start()
+    for _ in range(100):
+        if (tmp_path / 'servizio.sock').exists():
+            break
+        time.sleep(0.05)
+
+    try:
+        motore_remoto.importa_log(str(sorgente), citta='Napoli')
+        aggregati = motore_remoto.aggregati_giornalieri(citta='Napoli')
+        assert aggregati == locale.aggregati_giornalieri(archivio, 'Napoli')
+        giorni = sorted(aggregati)[:2]
+        assert motore_remoto.osservazioni_dei_giorni(giorni, ore=(3600, 43200), citta='Napoli').equals(
+            locale.osservazioni_dei_giorni(giorni, archivio, (3600, 43200), 'Napoli'))
+        assert motore_remoto.serie_temporali('giorno', 2 * 86400, citta='Napoli').equals(
+            locale.serie_temporali('giorno', 2 * 86400, archivio, 'Napoli'))
+        assert motore_remoto.accoda_log(str(sorgente), citta='Napoli') == []
+        with pytest.raises(RuntimeError, match='cartella di ingestione'):
+            motore_remoto.importa_log(LOG_REPOSITORY, citta='Roma')
+    finally:
+        SERVIZIO.clear()
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from meteo.configurazione import CAMPI_NUMERICI
+from meteo.motore_pandas import aggregati_da_statistiche
+from meteo.statistiche import SCHEMA_STATISTICHE, aggiorna_statistiche, calcola_statistiche_giornaliere, \
+    fondi_statistiche
+
+
+def osservazioni_log(archivi_log):
+    motore, archivio = archivi_log('pandas')
+    return motore.osservazioni_dei_giorni(sorted(motore.aggregati_giornalieri(archivio, 'Napoli')), archivio, None,
+                                          'Napoli')
+
+
+def confronta_stati(fusi, completi):
+    # Conteggi, estremi, descrizioni, alba e tramonto coincidono; somme e M2 a meno degli errori di arrotondamento
+    fusi, completi = (stati.sort_values('Date', ignore_index=True) for stati in (fusi, completi))
+    for colonna in SCHEMA_STATISTICHE.names:
+        if colonna.startswith(('somma', 'm2')):
+            np.testing.assert_allclose(fusi[colonna], completi[colonna], rtol=1e-9, atol=1e-6)
+        else:
+            assert fusi[colonna].tolist() == completi[colonna].tolist(), colonna
+
+
+@pytest.mark.parametrize('parti', [2, 3, 7])
+def test_fusione_come_calcolo_completo(archivi_log, parti):
+    # Lo stato fuso delle rilevazioni divise in più gruppi (la prima rilevazione di ogni giorno non sempre nel primo)
+    # coincide con quello calcolato su tutte le rilevazioni, e così gli aggregati che ne derivano
+    osservazioni = osservazioni_log(archivi_log)
+    gruppi = np.random.default_rng(parti).integers(0, parti, len(osservazioni))
+    stati = [calcola_statistiche_giornaliere(osservazioni[gruppi == gruppo]) for gruppo in range(parti)]
+    fusi = fondi_statistiche(pd.concat(stati, ignore_index=True))
+    completi = calcola_statistiche_giornaliere(osservazioni)
+    confronta_stati(fusi, completi)
+    assert aggregati_da_statistiche(fusi) == aggregati_da_statistiche(completi)
+
+
+def test_aggiornamento_incrementale(archivi_log):
+    # Accodare le rilevazioni una metà alla volta equivale a calcolare lo stato su tutte
+    osservazioni = osservazioni_log(archivi_log)
+    meta = len(osservazioni) // 2
+    stati = aggiorna_statistiche(None, osservazioni.iloc[:meta])
+    stati = aggiorna_statistiche(stati, osservazioni.iloc[meta:])
+    confronta_stati(stati, calcola_statistiche_giornaliere(osservazioni))
+
+
+def test_campi_senza_valori(archivi_log):
+    # Un gruppo senza valori di un campo (né descrizioni) non altera lo stato fuso
+    osservazioni = osservazioni_log(archivi_log)
+    vuote = osservazioni.iloc[::5].copy()
+    for campo in CAMPI_NUMERICI + ['Wind_Deg']:
+        vuote[campo] = np.nan
+    vuote['Description'] = None
+    vuote['Datetime'] += 1
+    stati = fondi_statistiche(pd.concat([calcola_statistiche_giornaliere(osservazioni),
+                                         calcola_statistiche_giornaliere(vuote)], ignore_index=True))
+    completi = calcola_statistiche_giornaliere(osservazioni)
+    for campo in CAMPI_NUMERICI:
+        np.testing.assert_allclose(stati[f'm2_{campo}'], completi[f'm2_{campo}'], rtol=1e-9, atol=1e-6)
+        assert stati[f'conteggio_{campo}'].tolist() == completi[f'conteggio_{campo}'].tolist()
+    assert stati['Descrizioni'].tolist() == completi['Descrizioni'].tolist()
+    assert stati['Rilevazioni'].tolist() == (completi['Rilevazioni'] +
+                                             vuote.groupby('Date').size().reindex(completi['Date']).to_numpy()).tolist()
+
+
+def test_fusione_spark(spark, archivi_log):
+    # Lo stesso con le funzioni Spark di meteo.aggregati
+    from meteo.aggregati import aggregati_da_statistiche as aggregati_spark, aggregati_per_giorno, \
+        calcola_statistiche_giornaliere as statistiche_spark, fondi_statistiche as fondi_spark
+    from meteo.motore_spark import leggi_osservazioni
+
+    _, archivio = archivi_log('spark')
+    osservazioni = leggi_osservazioni(spark, archivio, citta='Napoli')
+    parti = [osservazioni.filter(osservazioni['Datetime'] % 3 == resto) for resto in range(3)]
+    stati = statistiche_spark(parti[0])
+    for parte in parti[1:]:
+        stati = stati.unionByName(statistiche_spark(parte))
+    fusi = aggregati_per_giorno(aggregati_spark(fondi_spark(stati)))
+    completi = aggregati_per_giorno(aggregati_spark(statistiche_spark(osservazioni)))
+    assert sorted(fusi) == sorted(completi)
+    for giorno in completi:
+        assert fusi[giorno] == completi[giorno]
@@ -0,0 +1,37 @@
+from conftest import LOG_REPOSITORY
+from meteo.archivio import citta_disponibili
+
+
+def esegui_una_volta(spark, ingresso, archivio, checkpoint):
+    from meteo.streaming import avvia_ingestione, stream_da_cartella
+    avvia_ingestione(spark, stream_da_cartella(spark, str(ingresso)), str(archivio), str(checkpoint),
+                     una_volta=True, citta='Napoli').awaitTermination()
+
+
+def test_ingestione_incrementale(spark, archivi_log, tmp_path):
+    # Il log diviso in due file, consegnati in due esecuzioni successive e con righe ripetute a cavallo, produce
+    # gli stessi aggregati dell'ingestione batch
+    motore, archivio_batch = archivi_log('spark')
+    with open(LOG_REPOSITORY, encoding='utf-8-sig') as file:
+        intestazione, *righe = file.readlines()
+    meta = len(righe) // 2
+    ingresso, archivio, checkpoint = tmp_path / 'ingresso', tmp_path / 'archivio', tmp_path / 'checkpoint'
+    ingresso.mkdir()
+
+    (ingresso / 'parte_1.csv').write_text(intestazione + ''.join(righe[:meta]), encoding='utf-8')
+    esegui_una_volta(spark, ingresso, archivio, checkpoint)
+    (ingresso / 'parte_2.csv').write_text(intestazione + ''.join(righe[meta - 20:]), encoding='utf-8')
+    esegui_una_volta(spark, ingresso, archivio, checkpoint)
+
+    assert motore.aggregati_giornalieri(str(archivio), 'Napoli') == \
+        motore.aggregati_giornalieri(archivio_batch, 'Napoli')
+
+
+def test_citta_senza_rilevazioni(spark, tmp_path):
+    # Un file con la sola intestazione non rende disponibile la città nella dashboard
+    ingresso, archivio = tmp_path / 'ingresso', tmp_path / 'archivio'
+    ingresso.mkdir()
+    with open(LOG_REPOSITORY, encoding='utf-8-sig') as file:
+        (ingresso / 'vuoto.csv').write_text(file.readline(), encoding='utf-8')
+    esegui_una_volta(spark, ingresso, archivio, tmp_path / 'checkpoint')
+    assert citta_disponibili(str(archivio)) == []
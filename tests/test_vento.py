@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from meteo.vento import componenti, media_circolare, media_da_componenti, punto_cardinale, rosa_dei_venti, settori
+
+
+def test_media_circolare_attorno_al_nord():
+    # La media di 350° e 10° è 0° (non 180° come la media aritmetica), con una direzione quasi costante
+    direzione, costanza = media_circolare([350, 10])
+    assert min(direzione, 360 - direzione) == pytest.approx(0, abs=1e-9)
+    assert costanza == pytest.approx(np.cos(np.radians(10)))
+
+    direzione, _ = media_circolare([340, 350, 20])
+    assert direzione == pytest.approx(356.6, abs=0.1)
+
+
+def test_direzioni_opposte_e_mancanti():
+    # Direzioni opposte si annullano; senza direzioni valide la media non è definita
+    assert media_circolare([90, 270])[1] == pytest.approx(0, abs=1e-12)
+    direzione, costanza = media_circolare([np.nan])
+    assert np.isnan(direzione) and np.isnan(costanza)
+
+
+def test_componenti_sommabili():
+    # Le componenti di due gruppi di rilevazioni, sommate, danno la media di tutte le rilevazioni
+    primo, secondo = componenti([350, 355, np.nan]), componenti([5, 20])
+    unite = media_da_componenti(*(a + b for a, b in zip(primo, secondo)))
+    assert unite == pytest.approx(media_circolare([350, 355, 5, 20]))
+
+
+def test_settori_centrati_sui_punti_cardinali():
+    assert list(settori([0, 22.4, 22.5, 350, 359.9, 360], 8)) == [0, 0, 1, 0, 0, 0]
+    assert punto_cardinale(350, 8) == 'Nord' and punto_cardinale(180, 16) == 'Sud'
+
+
+def test_rosa_dei_venti():
+    osservazioni = pd.DataFrame({'Wind_Deg': [0, 90, 90, 180, np.nan], 'Wind_Speed': [1, 3, 11, 5, 2]})
+    rosa = rosa_dei_venti(osservazioni, numero_settori=8)
+    assert rosa.values.sum() == pytest.approx(100)
+    assert rosa.loc['Est', '2-4 m/s'] == pytest.approx(25) and rosa.loc['Est', '> 10 m/s'] == pytest.approx(25)
+    assert rosa.loc['Nord', '0-2 m/s'] == pytest.approx(25)